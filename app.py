@@ -56,6 +56,95 @@ def display_error_for_missing_inputs(required_inputs):
     return False
 
 
+def show_deck_overview(uploaded_file):
+    """Show the slides of an uploaded deck; the inspection is cached per upload"""
+    if uploaded_file is None:
+        return None
+    inspections = st.session_state.setdefault("deck_inspections", {})
+    key = (getattr(uploaded_file, "file_id", uploaded_file.name), uploaded_file.size)
+    if key not in inspections:
+        try:
+            inspections[key] = inspect_ppt(uploaded_file)
+        except Exception as e:
+            st.warning(f"Could not read {uploaded_file.name}: {str(e)}")
+            return None
+    summary = inspections[key]
+    with st.expander(f"{uploaded_file.name}: {summary['slide_count']} slides"):
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "Slide": slide["number"],
+                        "Title": slide["title"],
+                        "Layout": slide["layout"],
+                        "Hidden": slide["hidden"],
+                        "Media (MB)": round(slide["media_bytes"] / 1024 / 1024, 2),
+                    }
+                    for slide in summary["slides"]
+                ]
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+    return summary
+
+
+def show_slide_thumbnails(uploaded_file, summary=None, columns=6):
+    """Show a grid of slide thumbnails that fills in while they render in the background"""
+    if uploaded_file is None:
+        return
+    jobs = st.session_state.setdefault("thumbnail_jobs", {})
+    errors = st.session_state.setdefault("thumbnail_errors", {})
+    saved = st.session_state.setdefault("thumbnail_uploads", {})
+    key = (getattr(uploaded_file, "file_id", uploaded_file.name), uploaded_file.size)
+    job = jobs.get(key)
+    error = errors.get(key) or (job.error if job else None)
+    if error:
+        # A failed upload is only tried again on request, not on every rerun
+        st.info(f"Slide thumbnails are not available: {error}")
+        if not st.button("Retry Thumbnails", key=f"thumb_retry_{uploaded_file.name}"):
+            return
+        errors.pop(key, None)
+        job = None
+    if job is None or job.error:
+        try:
+            if key not in saved:
+                saved[key] = save_uploaded_file(uploaded_file)
+            job = ppt_thumbnails(saved[key])
+        except Exception as e:
+            errors[key] = str(e)
+            st.info(f"Slide thumbnails are not available: {str(e)}")
+            return
+        jobs[key] = job
+    titles = [slide["title"] for slide in summary["slides"]] if summary else []
+
+    def render_grid():
+        if job.error:
+            st.info(f"Slide thumbnails are not available: {job.error}")
+            return
+        paths = job.paths()
+        rendered = sum(path is not None for path in paths)
+        if rendered < len(paths):
+            st.progress(rendered / max(len(paths), 1), text=f"Rendering thumbnails... {rendered}/{len(paths)}")
+        grid = st.columns(columns)
+        for index, path in enumerate(paths):
+            caption = f"{index + 1}" + (f" - {titles[index]}" if index < len(titles) and titles[index] else "")
+            with grid[index % columns]:
+                if path:
+                    st.image(path, caption=caption, use_container_width=True)
+                else:
+                    st.caption(f"{caption} (rendering)")
+
+    with st.expander(f"{uploaded_file.name}: Slide Thumbnails", expanded=True):
+        if hasattr(st, "fragment") and not job.done:
+            # Re-run only the grid every second so the rest of the page stays responsive
+            st.fragment(render_grid, run_every=1.0)()
+        else:
+            render_grid()
+            if not job.done:
+                st.button("Refresh Thumbnails", key=f"thumb_refresh_{uploaded_file.name}")
+
+
 def main():
     st.title("🔄 Automation Hub")
     st.subheader("Run automation tasks on your Excel and PowerPoint files")
@@ -71,6 +160,8 @@ def main():
                 "PPT to PDF",
                 "Update PPT",
                 "Merge PPT",
+                "Assemble PPT",
+                "Optimize PPT",
                 "Power Query",
                 "Validation",
                 "Consolidation",
@@ -80,42 +171,151 @@ def main():
             ],
         )
 
+        # Any task producing a deck can shrink its media before download
+        optimize_output = False
+        if automation_task in ["Excel to PPT", "Update PPT", "Merge PPT", "Assemble PPT"]:
+            optimize_output = st.checkbox(
+                "Optimize Media in Output PPT",
+                help="Downsample images to their displayed size, re-encode them and drop duplicate or unused media.",
+                key="optimize_output",
+            )
+
     # Main area for task-specific inputs
     with st.container():
         st.write(f"## {automation_task}")
 
         # Initialize output_file to None
         output_file = None
+        highlighted_file = None
 
         # Different input fields based on selected task
         if automation_task == "Day Movement":
-            file1 = st.file_uploader(
-                "Upload Excel File 1", type=["xls", "xlsx"], key="dm_file1"
-            )
-            file2 = st.file_uploader(
-                "Upload Excel File 2", type=["xls", "xlsx"], key="dm_file2"
-            )
-            sheet_name = st.text_input("Enter Sheet Name", key="dm_sheet")
-            cell_range = st.text_input(
-                "Enter Cell Range(ex., A1: B10)", key="dm_range"
+            dm_mode = st.radio(
+                "Mode",
+                ["Two Files", "Multiple Snapshots", "Key-Aligned", "Multiple Ranges"],
+                horizontal=True,
+                key="dm_mode",
             )
 
-            required = {
-                "Excel File 1": file1,
-                "Excel File 2": file2,
-                "Sheet Name": sheet_name,
-                "Cell Range": cell_range,
-            }
+            if dm_mode in ["Two Files", "Key-Aligned", "Multiple Ranges"]:
+                file1 = st.file_uploader(
+                    "Upload Excel File 1", type=["xlsx"], key="dm_file1"
+                )
+                file2 = st.file_uploader(
+                    "Upload Excel File 2", type=["xlsx"], key="dm_file2"
+                )
+            else:
+                snapshots = st.file_uploader(
+                    "Upload Excel Snapshots (Oldest First)",
+                    type=["xlsx"],
+                    accept_multiple_files=True,
+                    key="dm_snapshots",
+                )
+                sort_by_name = st.checkbox(
+                    "Order snapshots by file name", value=True, key="dm_sort"
+                )
+                if snapshots and sort_by_name:
+                    snapshots = sorted(snapshots, key=lambda f: f.name)
+                base_name = st.selectbox(
+                    "Base Snapshot (Optional)",
+                    ["None"] + [f.name for f in snapshots or []],
+                    key="dm_base",
+                )
+            if dm_mode == "Multiple Ranges":
+                range_list = st.text_area(
+                    "Enter Sheet Ranges (One Per Line, ex., Sheet1!A1:D10)",
+                    key="dm_ranges",
+                )
+            else:
+                sheet_name = st.text_input("Enter Sheet Name", key="dm_sheet")
+            if dm_mode == "Key-Aligned":
+                key_columns = st.text_input(
+                    "Enter Key Columns (Comma Separated Headers)", key="dm_keys"
+                )
+                col1, col2 = st.columns(2)
+                with col1:
+                    abs_threshold = st.number_input(
+                        "Absolute Threshold", min_value=0.0, value=0.0, key="dm_abs"
+                    )
+                with col2:
+                    rel_threshold = st.number_input(
+                        "Relative Threshold % (0 = Off)",
+                        min_value=0.0,
+                        value=0.0,
+                        key="dm_rel",
+                    )
+            elif dm_mode != "Multiple Ranges":
+                cell_range = st.text_input(
+                    "Enter Cell Range(ex., A1: B10)", key="dm_range"
+                )
+
+            if dm_mode == "Two Files":
+                required = {
+                    "Excel File 1": file1,
+                    "Excel File 2": file2,
+                    "Sheet Name": sheet_name,
+                    "Cell Range": cell_range,
+                }
+            elif dm_mode == "Multiple Ranges":
+                required = {
+                    "Excel File 1": file1,
+                    "Excel File 2": file2,
+                    "Sheet Ranges": range_list,
+                }
+            elif dm_mode == "Key-Aligned":
+                required = {
+                    "Excel File 1": file1,
+                    "Excel File 2": file2,
+                    "Sheet Name": sheet_name,
+                    "Key Columns": key_columns,
+                }
+            else:
+                required = {
+                    "Excel Snapshots": snapshots,
+                    "Sheet Name": sheet_name,
+                    "Cell Range": cell_range,
+                }
 
             if st.button("Run Day Movement") and not display_error_for_missing_inputs(
                 required
             ):
                 with st.spinner("Processing Day Movement..."):
-                    file1_path = save_uploaded_file(file1)
-                    file2_path = save_uploaded_file(file2)
-                    output_file = day_movement(
-                        file1_path, file2_path, sheet_name, cell_range
-                    )
+                    if dm_mode == "Two Files":
+                        file1_path = save_uploaded_file(file1)
+                        file2_path = save_uploaded_file(file2)
+                        output_file = day_movement(
+                            file1_path, file2_path, sheet_name, cell_range
+                        )
+                    elif dm_mode == "Multiple Ranges":
+                        file1_path = save_uploaded_file(file1)
+                        file2_path = save_uploaded_file(file2)
+                        try:
+                            ranges = parse_range_list(range_list)
+                            output_file = day_movement_multi(
+                                file1_path, file2_path, ranges
+                            )
+                        except ValueError as e:
+                            output_file = f"Error: {e}"
+                    elif dm_mode == "Key-Aligned":
+                        file1_path = save_uploaded_file(file1)
+                        file2_path = save_uploaded_file(file2)
+                        output_file = day_movement_keyed(
+                            file1_path,
+                            file2_path,
+                            sheet_name,
+                            [k.strip() for k in key_columns.split(",") if k.strip()],
+                            abs_threshold,
+                            rel_threshold / 100 if rel_threshold else None,
+                        )
+                    else:
+                        snapshot_paths = [save_uploaded_file(f) for f in snapshots]
+                        names = [f.name for f in snapshots]
+                        base_index = (
+                            names.index(base_name) if base_name != "None" else None
+                        )
+                        output_file = day_movement_batch(
+                            snapshot_paths, sheet_name, cell_range, base_index
+                        )
                     if (
                         not isinstance(output_file, str)
                         or os.path.exists(output_file)
@@ -128,35 +328,76 @@ def main():
                 "Upload PPT File (Optional)", type=["pptx"], key="ep_ppt"
             )
             excel_file = st.file_uploader(
-                "Upload Excel File", type=["xls", "xlsx"], key="ep_excel"
+                "Upload Excel File", type=["xlsx"], key="ep_excel"
             )
-            sheet_name = st.text_input("Enter Sheet Name", key="ep_sheet")
-            cell_range = st.text_input("Enter Cell Range", key="ep_range")
-
-            col1, col2 = st.columns(2)
-            with col1:
-                slide_number = st.number_input(
-                    "Slide Number", min_value=1, value=1, key="ep_slide"
+            ep_mode = st.radio(
+                "Mode",
+                ["Single Range", "Manifest Batch", "Refresh Deck"],
+                horizontal=True,
+                key="ep_mode",
+            )
+            if ep_mode == "Single Range":
+                sheet_name = st.text_input("Enter Sheet Name", key="ep_sheet")
+                cell_range = st.text_input("Enter Cell Range", key="ep_range")
+            elif ep_mode == "Manifest Batch":
+                manifest_file = st.file_uploader(
+                    "Upload Placement Manifest (sheet, range, slide, left, top, width, height)",
+                    type=["csv", "xlsx", "json"],
+                    key="ep_manifest",
                 )
-                height = st.number_input(
-                    "Slide Height", min_value=1, value=400, key="ep_height"
+            else:
+                match_workbook = st.checkbox(
+                    "Only refresh ranges recorded from a workbook with this file name",
+                    value=True,
+                    key="ep_match",
                 )
-                width = st.number_input(
-                    "Slide Width", min_value=1, value=600, key="ep_width"
+            if ep_mode != "Refresh Deck":
+                insert_as = st.radio(
+                    "Insert As",
+                    ["Image", "Native Table"],
+                    horizontal=True,
+                    key="ep_insert_as",
                 )
 
+            col1, col2 = st.columns(2)
+            if ep_mode == "Single Range":
+                with col1:
+                    slide_number = st.number_input(
+                        "Slide Number", min_value=1, value=1, key="ep_slide"
+                    )
+                    height = st.number_input(
+                        "Slide Height", min_value=1, value=400, key="ep_height"
+                    )
+                    width = st.number_input(
+                        "Slide Width", min_value=1, value=600, key="ep_width"
+                    )
+
             with col2:
-                left = st.number_input("Image Left Position", value=50, key="ep_left")
-                top = st.number_input("Image Top Position", value=50, key="ep_top")
+                if ep_mode == "Single Range":
+                    left = st.number_input(
+                        "Image Left Position", value=50, key="ep_left"
+                    )
+                    top = st.number_input("Image Top Position", value=50, key="ep_top")
                 password = st.text_input(
                     "Excel Password (Optional)", type="password", key="ep_pass"
                 )
 
-            required = {
-                "Excel File": excel_file,
-                "Sheet Name": sheet_name,
-                "Cell Range": cell_range,
-            }
+            if ep_mode == "Single Range":
+                required = {
+                    "Excel File": excel_file,
+                    "Sheet Name": sheet_name,
+                    "Cell Range": cell_range,
+                }
+            elif ep_mode == "Manifest Batch":
+                required = {
+                    "Excel File": excel_file,
+                    "Placement Manifest": manifest_file,
+                }
+            else:
+                required = {
+                    "PPT File": ppt_file,
+                    "Excel File": excel_file,
+                }
 
             if st.button("Run Excel to PPT") and not display_error_for_missing_inputs(
                 required
@@ -164,18 +405,34 @@ def main():
                 with st.spinner("Converting Excel to PPT..."):
                     ppt_path = save_uploaded_file(ppt_file) if ppt_file else None
                     excel_path = save_uploaded_file(excel_file)
-                    output_file = excel_to_ppt(
-                        ppt_path,
-                        excel_path,
-                        sheet_name,
-                        cell_range,
-                        slide_number,
-                        height,
-                        width,
-                        left,
-                        top,
-                        password,
+                    insert_mode = (
+                        "table"
+                        if ep_mode != "Refresh Deck" and insert_as == "Native Table"
+                        else "image"
                     )
+                    if ep_mode == "Refresh Deck":
+                        output_file = excel_to_ppt_refresh(
+                            ppt_path, excel_path, password, match_workbook
+                        )
+                    elif ep_mode == "Single Range":
+                        output_file = excel_to_ppt(
+                            ppt_path,
+                            excel_path,
+                            sheet_name,
+                            cell_range,
+                            slide_number,
+                            height,
+                            width,
+                            left,
+                            top,
+                            password,
+                            insert_mode,
+                        )
+                    else:
+                        manifest_path = save_uploaded_file(manifest_file)
+                        output_file = excel_to_ppt_batch(
+                            ppt_path, excel_path, manifest_path, password, insert_mode
+                        )
                     if (
                         not isinstance(output_file, str)
                         or os.path.exists(output_file)
@@ -185,6 +442,14 @@ def main():
 
         elif automation_task == "PPT to PDF":
             ppt_file = st.file_uploader("Upload PPT File", type=["pptx"], key="p2p_ppt")
+            incremental = st.checkbox(
+                "Only Re-render Changed Slides", value=True, key="p2p_incremental"
+            )
+            cache_stats = pdf_cache_stats()
+            st.caption(
+                f"Conversion cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+                f"{cache_stats['entries']} files ({cache_stats['bytes'] / 1024 / 1024:.1f} MB)"
+            )
 
             required = {"PPT File": ppt_file}
 
@@ -193,7 +458,7 @@ def main():
             ):
                 with st.spinner("Converting PPT to PDF..."):
                     ppt_path = save_uploaded_file(ppt_file)
-                    output_file = ppt_to_pdf(ppt_path)
+                    output_file = ppt_to_pdf(ppt_path, incremental)
                     if (
                         not isinstance(output_file, str)
                         or os.path.exists(output_file)
@@ -203,18 +468,33 @@ def main():
 
         elif automation_task == "Update PPT":
             ppt_file = st.file_uploader("Upload PPT File", type=["pptx"], key="up_ppt")
-            slides = st.text_input(
-                "Enter Slides to Update (Comma Separated)", key="up_slides"
-            )
-            new_order = st.text_input(
-                "Enter New Slide Order (Comma Separated)", key="up_order"
+            show_slide_thumbnails(ppt_file, show_deck_overview(ppt_file))
+            up_mode = st.radio(
+                "Mode", ["Move Slides", "Full Order"], horizontal=True, key="up_mode"
             )
 
-            required = {
-                "PPT File": ppt_file,
-                "Slides to Update": slides,
-                "New Slide Order": new_order,
-            }
+            if up_mode == "Move Slides":
+                slides = st.text_input(
+                    "Enter Slides to Update (Comma Separated)", key="up_slides"
+                )
+                new_order = st.text_input(
+                    "Enter New Slide Order (Comma Separated)", key="up_order"
+                )
+
+                required = {
+                    "PPT File": ppt_file,
+                    "Slides to Update": slides,
+                    "New Slide Order": new_order,
+                }
+            else:
+                slides = ""
+                new_order = st.text_input(
+                    "Enter Full Slide Order (e.g. 3,1,2,2,5-8)",
+                    key="up_full_order",
+                    help="Slides left out are deleted; slides listed twice are duplicated.",
+                )
+
+                required = {"PPT File": ppt_file, "Full Slide Order": new_order}
 
             if st.button("Update PPT") and not display_error_for_missing_inputs(
                 required
@@ -232,18 +512,27 @@ def main():
         elif automation_task == "Merge PPT":
             ppt_a = st.file_uploader("Upload First PPT", type=["pptx"], key="mp_ppt_a")
             ppt_b = st.file_uploader("Upload Second PPT", type=["pptx"], key="mp_ppt_b")
+            show_slide_thumbnails(ppt_a, show_deck_overview(ppt_a))
+            show_slide_thumbnails(ppt_b, show_deck_overview(ppt_b))
 
             col1, col2 = st.columns(2)
             with col1:
-                slide_index = st.number_input(
-                    "Slide Number from PPT A", min_value=1, value=1, key="mp_slide"
+                slide_index = st.text_input(
+                    "Slide Numbers from PPT A (e.g. 2, 5-7)", value="1", key="mp_slide"
                 )
             with col2:
-                merge_index = st.number_input(
-                    "Merge at Index in PPT B", min_value=1, value=1, key="mp_merge"
+                merge_index = st.text_input(
+                    "Positions in Merged PPT (One Per Slide, or First Position)",
+                    value="1",
+                    key="mp_merge",
                 )
 
-            required = {"First PPT": ppt_a, "Second PPT": ppt_b}
+            required = {
+                "First PPT": ppt_a,
+                "Second PPT": ppt_b,
+                "Slide Numbers": slide_index,
+                "Positions": merge_index,
+            }
 
             if st.button("Merge PPTs") and not display_error_for_missing_inputs(
                 required
@@ -261,15 +550,77 @@ def main():
                     ):
                         st.success("PPTs Merged Successfully!")
 
+        elif automation_task == "Assemble PPT":
+            decks = st.file_uploader(
+                "Upload Source Decks",
+                type=["pptx"],
+                accept_multiple_files=True,
+                key="ap_decks",
+            )
+            for deck in decks or []:
+                show_deck_overview(deck)
+            plan_file = st.file_uploader(
+                "Upload Assembly Plan (deck, slides) - Optional, Uses All Decks in Upload Order Otherwise",
+                type=["csv", "xlsx", "json"],
+                key="ap_plan",
+            )
+
+            required = {"Source Decks": decks}
+
+            if st.button("Assemble PPT") and not display_error_for_missing_inputs(
+                required
+            ):
+                with st.spinner("Assembling PPT..."):
+                    deck_paths = [save_uploaded_file(deck) for deck in decks]
+                    plan_path = save_uploaded_file(plan_file) if plan_file else None
+                    output_file = assemble_ppt(deck_paths, plan_path)
+                    if (
+                        not isinstance(output_file, str)
+                        or os.path.exists(output_file)
+                        or isinstance(output_file, bytes)
+                    ):
+                        st.success("PPT Assembled Successfully!")
+
+        elif automation_task == "Optimize PPT":
+            ppt_file = st.file_uploader("Upload PPT File", type=["pptx"], key="op_ppt")
+            col1, col2 = st.columns(2)
+            with col1:
+                target_dpi = st.number_input(
+                    "Target Image DPI", min_value=72, max_value=600, value=150, key="op_dpi"
+                )
+            with col2:
+                jpeg_quality = st.slider(
+                    "JPEG Quality for Photos", min_value=50, max_value=95, value=85, key="op_quality"
+                )
+
+            required = {"PPT File": ppt_file}
+
+            if st.button("Optimize PPT") and not display_error_for_missing_inputs(
+                required
+            ):
+                with st.spinner("Optimizing PPT..."):
+                    ppt_path = save_uploaded_file(ppt_file)
+                    output_file = optimize_ppt(ppt_path, target_dpi, jpeg_quality)
+                    if isinstance(output_file, tuple):
+                        output_file, report = output_file
+                        st.success(f"PPT Optimized: {format_optimize_report(report)}")
+
         elif automation_task == "Power Query":
             source_file = st.file_uploader(
-                "Upload Source File", type=["xls", "xlsx"], key="pq_source"
+                "Upload Source File", type=["xlsx"], key="pq_source"
             )
             stripped_data = st.file_uploader(
-                "Upload Stripped Data", type=["xls", "xlsx"], key="pq_stripped"
+                "Upload Stripped Data", type=["xlsx"], key="pq_stripped"
             )
             setup_file = st.file_uploader(
-                "Upload Setup File", type=["xls", "xlsx"], key="pq_setup"
+                "Upload Setup File", type=["xlsx"], key="pq_setup"
+            )
+            pipeline_file = st.file_uploader(
+                "Upload Query Pipeline (Optional)",
+                type=["json", "yaml", "yml"],
+                key="pq_pipeline",
+                help="Runs the queries in-process instead of refreshing them in Excel. "
+                "A 'Pipeline' sheet in the setup file is used when no file is given.",
             )
 
             required = {
@@ -285,7 +636,8 @@ def main():
                     source_path = save_uploaded_file(source_file)
                     stripped_path = save_uploaded_file(stripped_data)
                     setup_path = save_uploaded_file(setup_file)
-                    output_file = power_query(source_path, stripped_path, setup_path)
+                    pipeline_path = save_uploaded_file(pipeline_file) if pipeline_file else None
+                    output_file = power_query(source_path, stripped_path, setup_path, pipeline_path)
                     if (
                         not isinstance(output_file, str)
                         or os.path.exists(output_file)
@@ -295,7 +647,14 @@ def main():
 
         elif automation_task == "Validation":
             validation_file = st.file_uploader(
-                "Upload Validation File", type=["xls", "xlsx"], key="val_file"
+                "Upload Validation File", type=["xlsx"], key="val_file"
+            )
+            rules_file = st.file_uploader(
+                "Upload Validation Rules (Optional)",
+                type=["yaml", "yml", "json", "xlsx"],
+                key="val_rules",
+                help="Checks per column (type, not null, min/max, regex, allowed values, unique, "
+                "references) and cross-column expressions. A 'Rules' sheet in the validation file is used when no file is given.",
             )
 
             required = {"Validation File": validation_file}
@@ -305,13 +664,19 @@ def main():
             ):
                 with st.spinner("Running Validation..."):
                     validation_path = save_uploaded_file(validation_file)
-                    output_file = validation(validation_path)
+                    rules_path = save_uploaded_file(rules_file) if rules_file else None
+                    output_file = validation(validation_path, rules_path)
                     if (
                         not isinstance(output_file, str)
                         or os.path.exists(output_file)
                         or isinstance(output_file, bytes)
                     ):
                         st.success("Validation Completed!")
+                        highlighted_file = os.path.join(
+                            os.path.dirname(output_file), "validation_highlighted.xlsx"
+                        )
+                        if not os.path.exists(highlighted_file):
+                            highlighted_file = None
 
         elif automation_task == "Consolidation":
             excel_file = st.file_uploader(
@@ -404,6 +769,20 @@ def main():
                     ):
                         st.success("Trend Check Completed!")
 
+        if (
+            optimize_output
+            and isinstance(output_file, str)
+            and output_file.endswith(".pptx")
+            and os.path.exists(output_file)
+        ):
+            with st.spinner("Optimizing media..."):
+                optimized_file = optimize_ppt(output_file)
+                if isinstance(optimized_file, tuple):
+                    output_file, report = optimized_file
+                    st.info(f"Media optimized: {format_optimize_report(report)}")
+                else:
+                    st.warning(optimized_file)
+
         # Provide download button if there's an output file
         if output_file:
             if output_file:
@@ -412,11 +791,15 @@ def main():
                 print(f"Output file value: {output_file}") #Add this
                 if automation_task in ["Day Movement", "Power Query", "Validation", "Consolidation", "Roll Over", "Staging", "Trend Check"]:
                     provide_download_button(output_file, file_name="output.xlsx")
+                    if highlighted_file:
+                        provide_download_button(
+                            highlighted_file, label="Download Highlighted File"
+                        )
                 elif automation_task == "Excel to PPT":
                     provide_download_button(output_file, file_name="output.pptx")
                 elif automation_task == "PPT to PDF":
                     provide_download_button(output_file, file_name="output.pdf")
-                elif automation_task in ["Update PPT", "Merge PPT"]:
+                elif automation_task in ["Update PPT", "Merge PPT", "Assemble PPT", "Optimize PPT"]:
                     provide_download_button(output_file, file_name="output.pptx")
 
 
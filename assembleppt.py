@@ -0,0 +1,157 @@
+import logging
+import os
+import tempfile
+import pandas as pd
+from opcpackage import NS, PRESENTATION, OpcPackage
+from mergeppt import SlideImporter
+from updateppt_ppt2ppt import apply_order, parse_slide_list, update_sections
+
+logger = logging.getLogger(__name__)
+
+PLAN_COLUMNS = ["deck", "slides"]
+
+def process(deck_files, plan_file=None):
+    """
+    Builds one deck from slides of several source decks in a single pass.
+
+    The first deck in the plan is the base: its slide size, masters and
+    sections carry over, and its slides are kept in the order selected.
+    Slides of the other decks are appended entry by entry. Every source is
+    opened once, layouts/masters and media are shared across all of them
+    (see mergeppt.SlideImporter), and the output is written once with
+    untouched parts streamed straight from the source files.
+
+    Parameters:
+        deck_files (list): Opened PowerPoint files (file objects with a name, or paths).
+        plan_file (BytesIO): Optional plan (CSV, XLSX or JSON) with "deck" and "slides"
+            columns, one row per entry in order. "deck" is a file name of one of the
+            decks; "slides" is a selection like "1-3, 7" (blank for the whole deck).
+            Without a plan every deck is used in full, in the order given.
+
+    Returns:
+        str: Path to the assembled PowerPoint file or error message.
+    """
+    try:
+        decks = {}
+        for deck_file in deck_files:
+            name = os.path.basename(deck_file if isinstance(deck_file, str) else getattr(deck_file, "name", ""))
+            if not name:
+                raise ValueError("Every deck needs a file name")
+            if name.lower() in decks:
+                raise ValueError(f"Deck '{name}' was given more than once")
+            decks[name.lower()] = deck_file
+
+        if plan_file is not None:
+            plan = load_plan(plan_file)
+        else:
+            plan = [{"deck": name, "slides": None} for name in decks]
+        if not plan:
+            raise ValueError("The plan has no entries")
+        unknown = sorted({entry["deck"] for entry in plan if entry["deck"].lower() not in decks})
+        if unknown:
+            raise ValueError(f"Plan refers to deck(s) that were not uploaded: {', '.join(unknown)}")
+
+        output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pptx").name
+        assemble([(decks[entry["deck"].lower()], entry["slides"]) for entry in plan], output_path)
+        logger.debug("Assembled deck saved at: %s", output_path)
+        return output_path
+
+    except Exception as e:
+        error_msg = f"Error: {str(e)}"
+        print(error_msg)
+        return error_msg
+
+def assemble(plan, output_path):
+    """
+    Writes the deck described by plan to output_path.
+
+    Parameters:
+    - plan: List of (deck, slides) entries; deck is a path or file object and
+      slides a list of 1-based slide numbers, a selection string, or None for all
+    - output_path: Path of the assembled .pptx
+
+    Returns:
+    - Number of slides in the assembled deck
+    """
+    sources = {}  # deck -> (OpcPackage, SlideImporter)
+    base_deck, base_slides = plan[0]
+    target = OpcPackage(base_deck)
+    try:
+        base_count = _slide_count(target)
+        apply_order(target, _selection(base_slides, base_count))
+        presentation = target.xml(PRESENTATION)
+        base_entries = list(presentation.find("p:sldIdLst", NS))
+
+        for deck, slides in plan[1:]:
+            key = deck if isinstance(deck, str) else id(deck)
+            if key not in sources:
+                # The base deck is read again as a separate source so its pruned slides stay available
+                source = OpcPackage(deck)
+                sources[key] = (source, SlideImporter(target, source))
+            source, importer = sources[key]
+            selection = _selection(slides, _slide_count(source))
+            logger.debug("Adding %d slides from %s", len(selection), getattr(deck, "name", deck))
+            for number in selection:
+                importer.import_slide(number)
+
+        for _, importer in sources.values():
+            importer.finish()
+        # Appended slides join the last section of the base deck
+        entries = list(presentation.find("p:sldIdLst", NS))
+        update_sections(presentation, [(entry, entry.get("id") if entry in base_entries else None) for entry in entries])
+        target.save(output_path)
+        return len(entries)
+    finally:
+        target.close()
+        for source, _ in sources.values():
+            source.close()
+
+def load_plan(plan_file):
+    """
+    Reads an assembly plan (CSV, XLSX or JSON records) into a list of {"deck", "slides"} dicts.
+    """
+    name = plan_file if isinstance(plan_file, str) else getattr(plan_file, "name", "")
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        df = pd.read_csv(plan_file, dtype=str)
+    elif extension in (".xlsx", ".xlsm", ".xls"):
+        df = pd.read_excel(plan_file, dtype=str)
+    elif extension == ".json":
+        df = pd.read_json(plan_file, orient="records", dtype=str)
+    else:
+        raise ValueError("Plan must be a .csv, .xlsx or .json file")
+
+    df.columns = [str(col).strip().lower() for col in df.columns]
+    if "deck" not in df.columns:
+        raise ValueError("Plan is missing column: deck")
+    if "slides" not in df.columns:
+        df["slides"] = None
+
+    plan = []
+    for row_number, row in enumerate(df.to_dict("records"), start=1):
+        deck = row["deck"]
+        if pd.isna(deck) or not str(deck).strip():
+            raise ValueError(f"Invalid plan row {row_number}: deck is empty")
+        slides = row["slides"]
+        try:
+            slides = None if pd.isna(slides) or not str(slides).strip() else parse_slide_list(slides)
+        except ValueError as e:
+            raise ValueError(f"Invalid plan row {row_number}: {str(e)}")
+        plan.append({"deck": os.path.basename(str(deck).strip()), "slides": slides})
+    return plan
+
+def _slide_count(package):
+    sldIdLst = package.xml(PRESENTATION).find("p:sldIdLst", NS)
+    return len(sldIdLst) if sldIdLst is not None else 0
+
+def _selection(slides, slide_count):
+    """
+    Resolves a slide selection against a deck and validates it.
+    """
+    if slides is None:
+        return list(range(1, slide_count + 1))
+    selection = parse_slide_list(slides)
+    out_of_range = sorted({number for number in selection if number < 1 or number > slide_count})
+    if out_of_range:
+        raise ValueError(f"Slides {out_of_range} are out of range for a deck with {slide_count} slides")
+    return selection
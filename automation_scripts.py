@@ -3,11 +3,24 @@
 # automation_scripts.py
 import os
 import tempfile
+from contextlib import ExitStack
 from daymovement import process as day_movement_process
+from daymovement import process_batch as day_movement_batch_process
+from daymovement import process_keyed as day_movement_keyed_process
+from daymovement import process_multi as day_movement_multi_process
+from daymovement import parse_range_list
 from exceltoppt import process as excel_to_ppt_process
+from exceltoppt import process_batch as excel_to_ppt_batch_process
+from exceltoppt import refresh as excel_to_ppt_refresh_process
 from ppttopdf import process as ppt_to_pdf_process
+from pdfcache import get_cache as get_pdf_cache
 from updateppt_ppt2ppt import process as update_ppt_process
 from mergeppt import process as merge_ppt_process
+from assembleppt import process as assemble_ppt_process
+from pptinspect import inspect_deck
+from thumbnails import request_thumbnails
+from optimizeppt import process as optimize_ppt_process
+from optimizeppt import format_report as format_optimize_report
 from powerquery import process as power_query_process
 from validation import process as validation_process
 from consolidation import process as consolidation_process
@@ -35,17 +48,71 @@ def day_movement(file1, file2, sheet_name, cell_range):
     else:
         return result
 
-def excel_to_ppt(ppt_file, excel_file, sheet_name, cell_range, slide_number, height, width, left, top, password):
+def day_movement_batch(files, sheet_name, cell_range, base_index=None):
+    result = day_movement_batch_process(files, sheet_name, cell_range, base_index)
+    if isinstance(result, bytes):
+        temp_dir = tempfile.mkdtemp()
+        output_file_path = os.path.join(temp_dir, "day_movement_batch_output.xlsx")
+        with open(output_file_path, "wb") as f:
+            f.write(result)
+        return output_file_path
+    else:
+        return result
+
+def day_movement_keyed(file1, file2, sheet_name, key_columns, abs_threshold=0.0, rel_threshold=None):
+    result = day_movement_keyed_process(file1, file2, sheet_name, key_columns, abs_threshold, rel_threshold)
+    if isinstance(result, bytes):
+        temp_dir = tempfile.mkdtemp()
+        output_file_path = os.path.join(temp_dir, "day_movement_keyed_output.xlsx")
+        with open(output_file_path, "wb") as f:
+            f.write(result)
+        return output_file_path
+    else:
+        return result
+
+def day_movement_multi(file1, file2, ranges):
+    result = day_movement_multi_process(file1, file2, ranges)
+    if isinstance(result, bytes):
+        temp_dir = tempfile.mkdtemp()
+        output_file_path = os.path.join(temp_dir, "day_movement_multi_output.xlsx")
+        with open(output_file_path, "wb") as f:
+            f.write(result)
+        return output_file_path
+    else:
+        return result
+
+def excel_to_ppt(ppt_file, excel_file, sheet_name, cell_range, slide_number, height, width, left, top, password, insert_mode="image"):
     with open(excel_file, "rb") as excel_obj:
         if ppt_file:
             with open(ppt_file, "rb") as ppt_obj:
-                return excel_to_ppt_process(ppt_obj, excel_obj, sheet_name, cell_range, slide_number, height, width, left, top, password)
+                return excel_to_ppt_process(ppt_obj, excel_obj, sheet_name, cell_range, slide_number, height, width, left, top, password, insert_mode)
+        else:
+            return excel_to_ppt_process(None, excel_obj, sheet_name, cell_range, slide_number, height, width, left, top, password, insert_mode)
+
+def excel_to_ppt_batch(ppt_file, excel_file, manifest_file, password, insert_mode="image"):
+    with open(excel_file, "rb") as excel_obj, open(manifest_file, "rb") as manifest_obj:
+        if ppt_file:
+            with open(ppt_file, "rb") as ppt_obj:
+                return excel_to_ppt_batch_process(ppt_obj, excel_obj, manifest_obj, password, insert_mode)
         else:
-            return excel_to_ppt_process(None, excel_obj, sheet_name, cell_range, slide_number, height, width, left, top, password)
+            return excel_to_ppt_batch_process(None, excel_obj, manifest_obj, password, insert_mode)
 
-def ppt_to_pdf(ppt_file_path):
+def excel_to_ppt_refresh(ppt_file, excel_file, password, match_workbook=True):
+    with open(excel_file, "rb") as excel_obj, open(ppt_file, "rb") as ppt_obj:
+        return excel_to_ppt_refresh_process(ppt_obj, excel_obj, password, match_workbook)
+
+def ppt_to_pdf(ppt_file_path, incremental=False):
     with open(ppt_file_path, 'rb') as file_object:
-        return ppt_to_pdf_process(file_object)
+        return ppt_to_pdf_process(file_object, incremental)
+
+def pdf_cache_stats():
+    return get_pdf_cache().stats()
+
+def inspect_ppt(ppt_file):
+    return inspect_deck(ppt_file)
+
+def ppt_thumbnails(ppt_file_path):
+    return request_thumbnails(ppt_file_path)
 
 def update_ppt(ppt_file_path, slides, new_order):
     with open(ppt_file_path, "rb") as ppt_obj:
@@ -55,8 +122,18 @@ def merge_ppt(ppt_a_path, ppt_b_path, slide_index, merge_index):
     with open(ppt_a_path, "rb") as ppt_a_obj, open(ppt_b_path, "rb") as ppt_b_obj:
         return merge_ppt_process(ppt_a_obj, ppt_b_obj, slide_index, merge_index)
 
-def power_query(source_file, stripped_data, setup_file):
-    result = power_query_process(source_file, stripped_data, setup_file)
+def assemble_ppt(deck_paths, plan_path=None):
+    with ExitStack() as stack:
+        decks = [stack.enter_context(open(path, "rb")) for path in deck_paths]
+        plan_obj = stack.enter_context(open(plan_path, "rb")) if plan_path else None
+        return assemble_ppt_process(decks, plan_obj)
+
+def optimize_ppt(ppt_file_path, target_dpi=150, jpeg_quality=85):
+    with open(ppt_file_path, "rb") as ppt_obj:
+        return optimize_ppt_process(ppt_obj, target_dpi, jpeg_quality)
+
+def power_query(source_file, stripped_data, setup_file, pipeline_file=None):
+    result = power_query_process(source_file, stripped_data, setup_file, pipeline_file)
     if isinstance(result, bytes):
         temp_dir = tempfile.mkdtemp()
         output_file_path = os.path.join(temp_dir, "power_query_output.xlsx")
@@ -66,9 +143,20 @@ def power_query(source_file, stripped_data, setup_file):
     else:
         return result
 
-def validation(input_file):
-    result = validation_process(input_file)
-    if isinstance(result, bytes):
+def validation(input_file, rules_file=None):
+    with open(input_file, "rb") as input_obj:
+        result = validation_process(input_obj, rules_file)
+    if isinstance(result, tuple):
+        # The highlighted copy of the input is saved next to the report
+        report, highlighted = result
+        temp_dir = tempfile.mkdtemp()
+        output_file_path = os.path.join(temp_dir, "validation_output.xlsx")
+        with open(output_file_path, "wb") as f:
+            f.write(report)
+        with open(os.path.join(temp_dir, "validation_highlighted.xlsx"), "wb") as f:
+            f.write(highlighted)
+        return output_file_path
+    elif isinstance(result, bytes):
         temp_dir = tempfile.mkdtemp()
         output_file_path = os.path.join(temp_dir, "validation_output.xlsx")
         with open(output_file_path, "wb") as f:
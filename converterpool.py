@@ -0,0 +1,307 @@
+import os
+import sys
+import time
+import queue
+import shutil
+import socket
+import atexit
+import logging
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from concurrent.futures import Future
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:  # LibreOffice's Python bridge is optional
+    uno = None
+
+logger = logging.getLogger(__name__)
+
+SOFFICE_CANDIDATES = [
+    "soffice",
+    "libreoffice",
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+]
+
+# Export filters by target extension
+EXPORT_FILTERS = {"pdf": "impress_pdf_Export"}
+
+DEFAULT_POOL_SIZE = int(os.environ.get("CONVERTER_POOL_SIZE", "2"))
+DEFAULT_TIMEOUT = float(os.environ.get("CONVERTER_TIMEOUT", "300"))
+DEFAULT_MAX_JOBS = int(os.environ.get("CONVERTER_MAX_JOBS", "50"))
+STARTUP_TIMEOUT = 60
+
+
+class ConversionError(Exception):
+    """Raised when a document could not be converted."""
+
+
+def find_soffice():
+    """
+    Returns the path of the LibreOffice executable, or None if it is not installed.
+    """
+    configured = os.environ.get("SOFFICE_PATH")
+    if configured:
+        return configured
+    for candidate in SOFFICE_CANDIDATES:
+        found = shutil.which(candidate) or (candidate if os.path.isfile(candidate) else None)
+        if found:
+            return found
+    return None
+
+
+class _Worker:
+    """
+    One headless LibreOffice instance with its own user profile.
+
+    With the UNO bridge available the instance is started once and kept warm,
+    and documents are converted over a socket connection. Without it each job
+    runs "soffice --convert-to" against the worker's (already initialised)
+    profile, which still lets several conversions run side by side.
+    """
+
+    def __init__(self, soffice, index):
+        self.soffice = soffice
+        self.index = index
+        self.jobs = 0
+        self.process = None
+        self.desktop = None
+        self.profile_dir = tempfile.mkdtemp(prefix=f"soffice_worker_{index}_")
+
+    def _base_args(self):
+        return [
+            self.soffice,
+            "--headless",
+            "--invisible",
+            "--nologo",
+            "--norestore",
+            "--nodefault",
+            "--nolockcheck",
+            f"-env:UserInstallation={Path(self.profile_dir).as_uri()}",
+        ]
+
+    def start(self):
+        if uno is None:
+            return
+        port = _free_port()
+        self.process = subprocess.Popen(
+            self._base_args() + [f"--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext("com.sun.star.bridge.UnoUrlResolver", local_context)
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f"uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext")
+                break
+            except NoConnectException:
+                if self.process.poll() is not None or time.monotonic() > deadline:
+                    self.stop()
+                    raise ConversionError(f"LibreOffice worker {self.index} failed to start")
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext("com.sun.star.frame.Desktop", context)
+        logger.info(f"Started LibreOffice worker {self.index} on port {port}")
+
+    def alive(self):
+        return uno is None or (self.process is not None and self.process.poll() is None)
+
+    def convert(self, source_path, target_path, target_format, timeout):
+        self.jobs += 1
+        if uno is None:
+            self._convert_cli(source_path, target_path, target_format, timeout)
+        else:
+            self._convert_uno(source_path, target_path, target_format, timeout)
+
+    def _convert_uno(self, source_path, target_path, target_format, timeout):
+        outcome = {}
+
+        def run():
+            try:
+                hidden = PropertyValue()
+                hidden.Name, hidden.Value = "Hidden", True
+                document = self.desktop.loadComponentFromURL(uno.systemPathToFileUrl(os.path.abspath(source_path)), "_blank", 0, (hidden,))
+                try:
+                    export_filter = PropertyValue()
+                    export_filter.Name, export_filter.Value = "FilterName", EXPORT_FILTERS[target_format]
+                    document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(target_path)), (export_filter,))
+                finally:
+                    document.close(True)
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout)
+        if thread.is_alive():
+            # Killing the instance unblocks the UNO call; the pool then recycles this worker
+            self.desktop = None
+            self.process.kill()
+            self.stop()
+            raise TimeoutError(f"Conversion timed out after {timeout} seconds")
+        if "error" in outcome:
+            raise ConversionError(str(outcome["error"]))
+
+    def _convert_cli(self, source_path, target_path, target_format, timeout):
+        out_dir = tempfile.mkdtemp(prefix="soffice_out_")
+        try:
+            subprocess.run(
+                self._base_args() + ["--convert-to", target_format, "--outdir", out_dir, os.path.abspath(source_path)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=timeout,
+                check=True,
+            )
+            produced = os.path.join(out_dir, f"{Path(source_path).stem}.{target_format}")
+            if not os.path.exists(produced):
+                raise ConversionError("LibreOffice did not produce an output file")
+            shutil.move(produced, target_path)
+        except subprocess.TimeoutExpired:
+            raise TimeoutError(f"Conversion timed out after {timeout} seconds")
+        except subprocess.CalledProcessError as e:
+            raise ConversionError(e.stderr.decode(errors="replace").strip() or f"LibreOffice exited with code {e.returncode}")
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+            self.process = None
+
+    def close(self):
+        self.stop()
+        shutil.rmtree(self.profile_dir, ignore_errors=True)
+
+
+class ConverterPool:
+    """
+    A queue of conversion jobs served by a fixed number of headless LibreOffice workers.
+
+    Each worker is recycled after max_jobs conversions, after a timeout, or when
+    its instance has crashed, so one bad document cannot stall the pool.
+
+    Parameters:
+    - size: Number of concurrent workers
+    - timeout: Default per-job timeout in seconds
+    - max_jobs: Conversions served by a worker before it is restarted
+    - soffice: Path of the LibreOffice executable (found automatically if None)
+    """
+
+    def __init__(self, size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT, max_jobs=DEFAULT_MAX_JOBS, soffice=None):
+        self.soffice = soffice or find_soffice()
+        if not self.soffice:
+            raise ConversionError("LibreOffice (soffice) was not found. Install it or set SOFFICE_PATH.")
+        self.size = size
+        self.timeout = timeout
+        self.max_jobs = max_jobs
+        self._jobs = queue.Queue()
+        self._threads = []
+        for index in range(size):
+            thread = threading.Thread(target=self._serve, args=(index,), name=f"converter-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, source_path, target_path=None, target_format="pdf", timeout=None):
+        """
+        Queues a conversion and returns a Future resolving to the output path.
+        """
+        if target_format not in EXPORT_FILTERS:
+            raise ValueError(f"Unsupported target format '{target_format}'")
+        if target_path is None:
+            fd, target_path = tempfile.mkstemp(suffix=f".{target_format}")
+            os.close(fd)
+        future = Future()
+        self._jobs.put((source_path, target_path, target_format, timeout or self.timeout, future))
+        return future
+
+    def convert(self, source_path, target_path=None, target_format="pdf", timeout=None):
+        """
+        Converts a document and waits for the result; returns the output path.
+        """
+        return self.submit(source_path, target_path, target_format, timeout).result()
+
+    def shutdown(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _serve(self, index):
+        worker = None
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            source_path, target_path, target_format, timeout, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is not None and (worker.jobs >= self.max_jobs or not worker.alive()):
+                    logger.info(f"Recycling LibreOffice worker {index} after {worker.jobs} jobs")
+                    worker.close()
+                    worker = None
+                if worker is None:
+                    worker = _Worker(self.soffice, index)
+                    worker.start()
+                worker.convert(source_path, target_path, target_format, timeout)
+                future.set_result(target_path)
+            except Exception as e:
+                logger.error(f"Conversion of {source_path} failed on worker {index}: {str(e)}")
+                if worker is not None and (isinstance(e, TimeoutError) or not worker.alive()):
+                    worker.close()
+                    worker = None
+                if os.path.exists(target_path) and os.path.getsize(target_path) == 0:
+                    os.remove(target_path)
+                future.set_exception(e if isinstance(e, (ConversionError, TimeoutError)) else ConversionError(str(e)))
+        if worker is not None:
+            worker.close()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the process-wide converter pool, creating it on first use.
+
+    Configured with the CONVERTER_POOL_SIZE, CONVERTER_TIMEOUT and
+    CONVERTER_MAX_JOBS environment variables.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConverterPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def _free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    pool = get_pool()
+    futures = [pool.submit(path) for path in sys.argv[1:]]
+    for path, future in zip(sys.argv[1:], futures):
+        print(f"{path} -> {future.result()}")
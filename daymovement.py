@@ -1,26 +1,89 @@
 import pandas as pd
+import numpy as np
+import openpyxl
+from openpyxl.utils import get_column_letter
+import os
 import re
 import io
+from concurrent.futures import ProcessPoolExecutor
+from sharding import map_blocks
+
+SUMMARY_SHEET = "Summary"
+PARALLEL_THRESHOLD_BYTES = 20 * 1024 * 1024
 
 def process(file1, file2, sheet_name, cell_range):
     """
     Calculates the daily movement and returns it as Excel bytes.
     """
     try:
-        df1 = pd.read_excel(file1, sheet_name=sheet_name, engine="openpyxl")
-        df2 = pd.read_excel(file2, sheet_name=sheet_name, engine="openpyxl")
-
         start_col, start_row, end_col, end_row = parse_cell_range(cell_range)
-        df1_values = df1.iloc[start_row:end_row, start_col:end_col].astype(float)
-        df2_values = df2.iloc[start_row:end_row, start_col:end_col].astype(float)
+        df1_values = read_range(file1, sheet_name, cell_range)
+        df2_values = read_range(file2, sheet_name, cell_range)
         day_movement = df2_values - df1_values
 
-        df = pd.DataFrame(day_movement)
+        df = movement_frame(day_movement, cell_range)
 
         # Convert DataFrame to Excel bytes
         output = io.BytesIO()
         with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, index=False, sheet_name='Day Movement')
+            df.to_excel(writer, sheet_name='Day Movement')
+        output.seek(0)
+        return output.read()
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+def process_batch(files, sheet_name, cell_range, base_index=None):
+    """
+    Calculates movements across an ordered list of snapshots and returns them as Excel bytes.
+
+    Each workbook's range is read once and stacked into a (snapshots, rows, cols)
+    array, so all consecutive movements are computed in a single vectorized
+    subtraction. The output has a summary sheet plus one sheet per period.
+
+    :param files: Ordered list of workbook paths or file-like objects (oldest first).
+    :param sheet_name: Name of the sheet to read from in every workbook.
+    :param cell_range: A string representing the cell range (e.g., "A1:K26").
+    :param base_index: Optional 0-based index of a base snapshot; when given,
+                       the movement of every other snapshot against it is added.
+    """
+    try:
+        if len(files) < 2:
+            raise ValueError("At least two snapshots are required.")
+        if base_index is not None and not 0 <= base_index < len(files):
+            raise ValueError(f"Base snapshot index {base_index} is out of range for {len(files)} files.")
+
+        labels = [snapshot_label(file, i) for i, file in enumerate(files)]
+        stack = np.stack([read_range(file, sheet_name, cell_range) for file in files])
+
+        periods = []
+        consecutive = np.diff(stack, axis=0)
+        for i in range(len(files) - 1):
+            periods.append((f"P{i + 1:02d}", labels[i], labels[i + 1], consecutive[i]))
+        if base_index is not None:
+            from_base = stack - stack[base_index]
+            for i in range(len(files)):
+                if i != base_index:
+                    periods.append((f"B{i + 1:02d}", labels[base_index], labels[i], from_base[i]))
+
+        moves = np.stack([period[3] for period in periods])
+        titles = [excel_sheet_title(f"{period} {to_label}") for period, _, to_label, _ in periods]
+        summary = pd.DataFrame({
+            "Sheet": titles,
+            "Period": [period[0] for period in periods],
+            "From": [period[1] for period in periods],
+            "To": [period[2] for period in periods],
+            "Total Movement": np.nansum(moves, axis=(1, 2)),
+            "Max Abs Movement": np.nanmax(np.abs(np.nan_to_num(moves)), axis=(1, 2)),
+            "Cells Changed": np.count_nonzero(np.nan_to_num(moves), axis=(1, 2)),
+        })
+
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            summary.to_excel(writer, index=False, sheet_name=SUMMARY_SHEET)
+            for title, (_, _, _, values) in zip(titles, periods):
+                movement_frame(values, cell_range).to_excel(writer, sheet_name=title)
         output.seek(0)
         return output.read()
 
@@ -28,6 +91,281 @@ def process(file1, file2, sheet_name, cell_range):
         print(f"Error: {e}")
         return None
 
+def process_multi(file1, file2, ranges):
+    """
+    Calculates the movement for several (sheet, range) blocks and returns them as Excel bytes.
+
+    Each workbook is opened once and all of its ranges are extracted in one pass
+    per sheet. The output has a summary sheet plus one sheet per range.
+
+    :param file1: Path or file-like object of the earlier workbook.
+    :param file2: Path or file-like object of the later workbook.
+    :param ranges: List of (sheet_name, cell_range) tuples.
+    """
+    try:
+        if not ranges:
+            raise ValueError("At least one sheet range is required.")
+
+        old = read_ranges(file1, ranges)
+        new = read_ranges(file2, ranges)
+
+        titles = []
+        summary_rows = []
+        for i, ((sheet_name, cell_range), before, after) in enumerate(zip(ranges, old, new)):
+            moves = np.nan_to_num(after - before)
+            titles.append(excel_sheet_title(f"R{i + 1:02d} {sheet_name} {cell_range}"))
+            summary_rows.append({
+                "Sheet": titles[-1],
+                "Source Sheet": sheet_name,
+                "Range": cell_range,
+                "Total Movement": moves.sum(),
+                "Max Abs Movement": np.abs(moves).max(),
+                "Cells Changed": np.count_nonzero(moves),
+            })
+
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            pd.DataFrame(summary_rows).to_excel(writer, index=False, sheet_name=SUMMARY_SHEET)
+            for title, (_, cell_range), before, after in zip(titles, ranges, old, new):
+                movement_frame(after - before, cell_range).to_excel(writer, sheet_name=title)
+        output.seek(0)
+        return output.read()
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+def process_keyed(file1, file2, sheet_name, key_columns, abs_threshold=0.0, rel_threshold=None):
+    """
+    Calculates movements between two snapshots aligned on key columns and returns
+    only the significant changes as Excel bytes.
+
+    Rows are matched with a hashed index join rather than by position, so inserted
+    or deleted rows do not shift the comparison. A cell is reported when its
+    absolute movement exceeds abs_threshold and, if rel_threshold is given, its
+    movement relative to the old value also exceeds rel_threshold (e.g. 0.05 = 5%).
+
+    :param file1: Path or file-like object of the earlier snapshot.
+    :param file2: Path or file-like object of the later snapshot.
+    :param sheet_name: Name of the sheet to compare; its first row holds the headers.
+    :param key_columns: List of header names that identify a row.
+    :param abs_threshold: Minimum absolute movement to report.
+    :param rel_threshold: Optional minimum relative movement to report.
+    """
+    try:
+        if not key_columns:
+            raise ValueError("At least one key column is required.")
+
+        df1 = pd.read_excel(file1, sheet_name=sheet_name, engine="openpyxl")
+        df2 = pd.read_excel(file2, sheet_name=sheet_name, engine="openpyxl")
+
+        for label, df in (("File 1", df1), ("File 2", df2)):
+            missing = [key for key in key_columns if key not in df.columns]
+            if missing:
+                raise ValueError(f"Key column(s) {', '.join(missing)} not found in {label}.")
+            duplicated = df.duplicated(key_columns)
+            if duplicated.any():
+                raise ValueError(f"{label} has {int(duplicated.sum())} duplicate key(s) in {', '.join(key_columns)}.")
+
+        old = df1.set_index(key_columns)
+        new = df2.set_index(key_columns)
+        value_columns = [
+            col for col in old.columns
+            if col in new.columns
+            and pd.api.types.is_numeric_dtype(old[col])
+            and pd.api.types.is_numeric_dtype(new[col])
+        ]
+
+        common = old.index.intersection(new.index)
+        added = new.index.difference(old.index)
+        removed = old.index.difference(new.index)
+
+        old_values = old.reindex(common)[value_columns].to_numpy(dtype=float)
+        new_values = new.reindex(common)[value_columns].to_numpy(dtype=float)
+        movement = np.nan_to_num(new_values) - np.nan_to_num(old_values)
+
+        changed = np.abs(movement) > abs_threshold
+        if rel_threshold is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                relative = np.abs(movement) / np.abs(np.nan_to_num(old_values))
+            changed &= relative > rel_threshold
+        rows, cols = np.nonzero(changed)
+
+        changes = common[rows].to_frame(index=False)
+        changes["Column"] = np.asarray(value_columns, dtype=object)[cols]
+        changes["Old"] = old_values[rows, cols]
+        changes["New"] = new_values[rows, cols]
+        changes["Movement"] = movement[rows, cols]
+
+        summary = pd.DataFrame({
+            "Metric": ["Matched Keys", "Added Keys", "Removed Keys", "Compared Columns", "Changed Cells"],
+            "Value": [len(common), len(added), len(removed), len(value_columns), len(changes)],
+        })
+
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='openpyxl') as writer:
+            summary.to_excel(writer, index=False, sheet_name=SUMMARY_SHEET)
+            changes.to_excel(writer, index=False, sheet_name="Changes")
+            new.loc[added].reset_index().to_excel(writer, index=False, sheet_name="Added Keys")
+            old.loc[removed].reset_index().to_excel(writer, index=False, sheet_name="Removed Keys")
+        output.seek(0)
+        return output.read()
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return None
+
+def movement_frame(values, cell_range):
+    """
+    Wraps a movement array in a DataFrame labelled with Excel row numbers and column letters.
+    """
+    start_col, start_row, end_col, end_row = parse_cell_range(cell_range)
+    columns = [get_column_letter(col + 1) for col in range(start_col, end_col)]
+    index = pd.RangeIndex(start_row + 1, end_row + 1, name="Row")
+    return pd.DataFrame(values, index=index, columns=columns)
+
+def snapshot_label(file, position):
+    """
+    Returns a short label for a snapshot: its file name without extension, or its position.
+    """
+    name = file if isinstance(file, str) else getattr(file, "name", None)
+    if not name:
+        return f"Snapshot {position + 1}"
+    return os.path.splitext(os.path.basename(name))[0]
+
+def excel_sheet_title(title):
+    """
+    Strips characters Excel does not allow in sheet names and truncates to 31 characters.
+    """
+    return re.sub(r"[\\/*?:\[\]]", "_", title)[:31]
+
+def read_range(file, sheet_name, cell_range):
+    """
+    Reads only the cells inside an Excel range into a float array.
+
+    The workbook is opened in read-only (streaming) mode and rows are parsed
+    up to the last row of the range, so the cost depends on the size and
+    position of the range rather than on the size of the sheet.
+
+    :param file: Path or file-like object of the workbook.
+    :param sheet_name: Name of the sheet to read from.
+    :param cell_range: A string representing the cell range (e.g., "A1:K26").
+    :return: A 2-D float64 NumPy array; empty cells are NaN.
+    """
+    return read_ranges(file, [(sheet_name, cell_range)])[0]
+
+def read_ranges(file, ranges, workers=None):
+    """
+    Reads several (sheet, range) blocks from one workbook into float arrays.
+
+    The workbook is opened once and each sheet is streamed once, covering all
+    of its requested ranges in a single pass; the rows of a large sheet are
+    parsed in blocks across worker processes (see sharding.map_blocks). When
+    the workbook is a path larger than PARALLEL_THRESHOLD_BYTES and the ranges
+    span several sheets, the sheets are read in parallel worker processes instead.
+
+    :param file: Path or file-like object of the workbook.
+    :param ranges: List of (sheet_name, cell_range) tuples.
+    :param workers: Optional maximum number of worker processes.
+    :return: A list of 2-D float64 NumPy arrays in the order of ranges.
+    """
+    by_sheet = {}
+    for position, (sheet_name, cell_range) in enumerate(ranges):
+        by_sheet.setdefault(sheet_name, []).append((position, cell_range))
+
+    results = [None] * len(ranges)
+    if (
+        isinstance(file, str)
+        and len(by_sheet) > 1
+        and os.path.getsize(file) > PARALLEL_THRESHOLD_BYTES
+    ):
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(_read_sheet_ranges_from_path, file, sheet_name, [r for _, r in items]): items
+                for sheet_name, items in by_sheet.items()
+            }
+            for future, items in futures.items():
+                for (position, _), values in zip(items, future.result()):
+                    results[position] = values
+        return results
+
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        for sheet_name, items in by_sheet.items():
+            arrays = _read_sheet_ranges(wb, sheet_name, [r for _, r in items])
+            for (position, _), values in zip(items, arrays):
+                results[position] = values
+        return results
+    finally:
+        wb.close()
+
+def _read_sheet_ranges_from_path(path, sheet_name, cell_ranges):
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        # Already in a worker process, so the sheet's blocks are parsed here
+        return _read_sheet_ranges(wb, sheet_name, cell_ranges, workers=1)
+    finally:
+        wb.close()
+
+def _read_sheet_ranges(wb, sheet_name, cell_ranges, workers=None):
+    """
+    Streams one sheet over the bounding box of cell_ranges, in blocks of rows, and fills one array per range.
+    """
+    if sheet_name not in wb.sheetnames:
+        raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {', '.join(wb.sheetnames)}")
+    ws = wb[sheet_name]
+
+    bounds = [parse_cell_range(cell_range) for cell_range in cell_ranges]
+    arrays = [np.full((end_row - start_row, end_col - start_col), np.nan) for start_col, start_row, end_col, end_row in bounds]
+    min_col = min(b[0] for b in bounds)
+    max_col = max(b[2] for b in bounds)
+    min_row = min(b[1] for b in bounds)
+
+    blocks = map_blocks(
+        ws, _block_values, (bounds, min_col),
+        min_row=min_row + 1, max_row=max(b[3] for b in bounds), min_col=min_col + 1, max_col=max_col, workers=workers,
+    )
+    for parts in blocks:
+        for values, part in zip(arrays, parts):
+            if part is not None:
+                offset, block_values = part
+                values[offset:offset + len(block_values)] = block_values
+    return arrays
+
+def _block_values(block, bounds, min_col):
+    """
+    Returns the values of a block of rows (a sharding.Block) inside each range as
+    (first row within the range, float array), or None where they do not overlap.
+    """
+    width = max(b[2] for b in bounds) - min_col
+    rows = np.array(block.rows, dtype=object).reshape(len(block.rows), width)
+    block_start = block.first_row - 1  # 0-based like the range bounds
+    parts = []
+    for start_col, start_row, end_col, end_row in bounds:
+        first, last = max(start_row, block_start), min(end_row, block_start + len(rows))
+        if first >= last:
+            parts.append(None)
+            continue
+        cells = rows[first - block_start:last - block_start, start_col - min_col:end_col - min_col]
+        parts.append((first - start_row, cells.astype(float)))
+    return parts
+
+def parse_range_list(text):
+    """
+    Parses one "Sheet!A1:D10" entry per line (or separated by ";") into (sheet_name, cell_range) tuples.
+    """
+    ranges = []
+    for entry in re.split(r"[;\n]", text):
+        entry = entry.strip()
+        if not entry:
+            continue
+        sheet_name, sep, cell_range = entry.rpartition("!")
+        if not sep or not sheet_name:
+            raise ValueError(f"Invalid range '{entry}'. Use format like 'Sheet1!A1:D10'.")
+        parse_cell_range(cell_range)
+        ranges.append((sheet_name.strip().strip("'"), cell_range.strip()))
+    return ranges
+
 def parse_cell_range(cell_range):
     """
     Converts an Excel cell range (e.g., "A1:K26") into row and column indices.
@@ -36,7 +374,7 @@ def parse_cell_range(cell_range):
     :return: A tuple (start_col_index, start_row_index, end_col_index, end_row_index)
     """
     # Match the cell range using regular expression
-    match = re.match(r"([A-Z]+)(\d+):([A-Z]+)(\d+)", cell_range)
+    match = re.match(r"([A-Z]+)(\d+):([A-Z]+)(\d+)", cell_range.replace(" ", "").upper())
     if not match:
         raise ValueError("Invalid cell range format. Use format like 'A1:D10'.")
 
@@ -0,0 +1,331 @@
+import datetime
+import hashlib
+import io
+import json
+import re
+import openpyxl
+from openpyxl.styles.colors import COLOR_INDEX
+from openpyxl.utils import range_boundaries, get_column_letter
+
+# Default Office theme colours, indexed like the theme attribute of a cell colour
+THEME_COLORS = [
+    "FFFFFF", "000000", "E7E6E6", "44546A", "4472C4",
+    "ED7D31", "A5A5A5", "FFC000", "5B9BD5", "70AD47",
+]
+
+DEFAULT_COL_WIDTH = 8.43  # characters
+DEFAULT_ROW_HEIGHT = 15.0  # points
+
+
+def load_workbook(excel_file, password=None):
+    """
+    Opens a workbook with cached cell values, decrypting it first when a password is given.
+
+    Parameters:
+    - excel_file: Path or file-like object of the workbook
+    - password: Optional password of an encrypted workbook (needs msoffcrypto-tool)
+
+    Returns:
+    - openpyxl Workbook
+    """
+    if password:
+        try:
+            import msoffcrypto
+        except ImportError:
+            raise ValueError("Opening password protected workbooks requires the msoffcrypto-tool package")
+        decrypted = io.BytesIO()
+        if isinstance(excel_file, str):
+            with open(excel_file, "rb") as f:
+                office_file = msoffcrypto.OfficeFile(f)
+                office_file.load_key(password=password)
+                office_file.decrypt(decrypted)
+        else:
+            office_file = msoffcrypto.OfficeFile(excel_file)
+            office_file.load_key(password=password)
+            office_file.decrypt(decrypted)
+        decrypted.seek(0)
+        excel_file = decrypted
+    return openpyxl.load_workbook(excel_file, data_only=True)
+
+
+def read_range_snapshot(ws, cell_range):
+    """
+    Captures everything needed to draw an Excel range: formatted text, fonts,
+    fills, borders, alignment, merged cells, column widths and row heights.
+
+    The snapshot is a plain, picklable dict. Its "hash" entry is a SHA-256 of
+    the rest of the content except the sheet name and address, so two ranges
+    that would render identically share a hash wherever they are.
+
+    Parameters:
+    - ws: openpyxl Worksheet
+    - cell_range: Excel range (e.g., "A1:H10")
+
+    Returns:
+    - dict snapshot of the range
+    """
+    min_col, min_row, max_col, max_row = range_boundaries(cell_range.replace(" ", "").upper())
+
+    col_widths = []
+    for col in range(min_col, max_col + 1):
+        dim = ws.column_dimensions.get(get_column_letter(col))
+        if dim is not None and dim.hidden:
+            col_widths.append(0.0)
+        elif dim is not None and dim.customWidth and dim.width:
+            col_widths.append(float(dim.width))
+        else:
+            col_widths.append(float(ws.sheet_format.defaultColWidth or DEFAULT_COL_WIDTH))
+
+    row_heights = []
+    for row in range(min_row, max_row + 1):
+        dim = ws.row_dimensions.get(row)
+        if dim is not None and dim.hidden:
+            row_heights.append(0.0)
+        elif dim is not None and dim.ht:
+            row_heights.append(float(dim.ht))
+        else:
+            row_heights.append(float(ws.sheet_format.defaultRowHeight or DEFAULT_ROW_HEIGHT))
+
+    merges = []
+    merge_origins = {}
+    for merged in ws.merged_cells.ranges:
+        if merged.max_row < min_row or merged.min_row > max_row or merged.max_col < min_col or merged.min_col > max_col:
+            continue
+        top, left = max(merged.min_row, min_row), max(merged.min_col, min_col)
+        bottom, right = min(merged.max_row, max_row), min(merged.max_col, max_col)
+        merges.append([top - min_row, left - min_col, bottom - min_row, right - min_col])
+        merge_origins[(top, left)] = (merged.min_row, merged.min_col)
+
+    cells = []
+    for row in ws.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=max_col):
+        cells_row = []
+        for cell in row:
+            origin = merge_origins.get((cell.row, cell.column))
+            source = ws.cell(*origin) if origin else cell
+            cells_row.append(_cell_snapshot(cell, source))
+        cells.append(cells_row)
+
+    snapshot = {
+        "sheet": ws.title,
+        "range": f"{get_column_letter(min_col)}{min_row}:{get_column_letter(max_col)}{max_row}",
+        "col_widths": col_widths,
+        "row_heights": row_heights,
+        "merges": merges,
+        "cells": cells,
+    }
+    snapshot["hash"] = content_hash(snapshot)
+    return snapshot
+
+
+def content_hash(snapshot):
+    """
+    Returns a SHA-256 hex digest of a range snapshot's content, leaving out where the range is.
+    """
+    content = {key: value for key, value in snapshot.items() if key not in ("hash", "sheet", "range")}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _cell_snapshot(cell, source):
+    """
+    Describes one cell; the value comes from source (the top-left cell of its merge, if any).
+    """
+    value = source.value
+    font = cell.font
+    alignment = cell.alignment
+    fill = cell.fill
+    fill_color = None
+    if fill is not None and fill.fill_type == "solid":
+        fill_color = color_to_hex(fill.fgColor, None)
+
+    horizontal = alignment.horizontal if alignment is not None else None
+    if horizontal in (None, "general"):
+        if isinstance(value, bool):
+            horizontal = "center"
+        elif isinstance(value, (int, float, datetime.date, datetime.time)):
+            horizontal = "right"
+        else:
+            horizontal = "left"
+    elif horizontal == "centerContinuous":
+        horizontal = "center"
+
+    borders = {}
+    for side in ("left", "right", "top", "bottom"):
+        edge = getattr(cell.border, side, None)
+        if edge is not None and edge.style:
+            borders[side] = [edge.style, color_to_hex(edge.color, "000000")]
+
+    return {
+        "text": format_value(value, source.number_format),
+        "number": isinstance(value, (int, float)) and not isinstance(value, bool),
+        "bold": bool(font.b),
+        "italic": bool(font.i),
+        "underline": bool(font.u),
+        "size": float(font.sz or 11),
+        "color": color_to_hex(font.color, "000000"),
+        "fill": fill_color,
+        "horizontal": horizontal,
+        "vertical": (alignment.vertical if alignment is not None else None) or "bottom",
+        "wrap": bool(alignment.wrap_text) if alignment is not None else False,
+        "borders": borders,
+    }
+
+
+def color_to_hex(color, default):
+    """
+    Converts an openpyxl Color (rgb, indexed or theme) to an "RRGGBB" string.
+    """
+    if color is None:
+        return default
+    try:
+        if color.type == "rgb" and isinstance(color.rgb, str):
+            return color.rgb[-6:].upper()
+        if color.type == "indexed" and color.indexed is not None and color.indexed < len(COLOR_INDEX):
+            return COLOR_INDEX[color.indexed][-6:].upper()
+        if color.type == "theme" and color.theme is not None and color.theme < len(THEME_COLORS):
+            return _apply_tint(THEME_COLORS[color.theme], color.tint or 0.0)
+    except (AttributeError, TypeError):
+        pass
+    return default
+
+
+def _apply_tint(hex_color, tint):
+    channels = [int(hex_color[i:i + 2], 16) for i in (0, 2, 4)]
+    if tint < 0:
+        channels = [round(c * (1 + tint)) for c in channels]
+    elif tint > 0:
+        channels = [round(c + (255 - c) * tint) for c in channels]
+    return "".join(f"{c:02X}" for c in channels)
+
+
+def format_value(value, number_format="General"):
+    """
+    Formats a cell value the way Excel displays it for common number formats
+    (General, fixed decimals, thousands separators, percentages, scaling,
+    scientific, currency literals, negative sections and dates).
+    """
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, str):
+        return value
+    number_format = number_format or "General"
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return _format_date(value, number_format)
+    if not isinstance(value, (int, float)):
+        return str(value)
+
+    sections = _split_sections(number_format)
+    if value < 0 and len(sections) > 1:
+        section, value = sections[1], -value
+    elif value == 0 and len(sections) > 2:
+        section = sections[2]
+    else:
+        section = sections[0]
+
+    section = re.sub(r"\[[^\]]*\]", "", section)  # colours and conditions
+    section = re.sub(r"_.", " ", section).replace("*", "")
+    section = re.sub(r"\\(.)", r"\1", section)
+
+    literals = []
+
+    def keep_literal(match):
+        literals.append(match.group(1))
+        return f"\x01{chr(65 + len(literals) - 1)}\x01"
+
+    section = re.sub(r'"([^"]*)"', keep_literal, section)
+
+    if section.strip().lower() in ("general", ""):
+        text = _format_general(value)
+    elif re.search(r"[ymdhs]", section, re.IGNORECASE) and not re.search(r"[0#]", section):
+        return _format_date(_excel_serial_to_datetime(value), section)
+    else:
+        match = re.search(r"[#0?,.]*[0#?][#0?,.]*(E[+-]0+)?", section)
+        if not match:
+            text = section
+        else:
+            placeholder = match.group(0)
+            number = value * 100 if "%" in section else value
+            exponent = match.group(1)
+            mantissa = placeholder[:placeholder.index("E")] if exponent else placeholder
+            trailing_commas = len(mantissa) - len(mantissa.rstrip(","))
+            number /= 1000 ** trailing_commas
+            mantissa = mantissa.rstrip(",")
+            decimals = len(mantissa.split(".", 1)[1]) if "." in mantissa else 0
+            if exponent:
+                formatted = f"{number:.{decimals}E}"
+                base, power = formatted.split("E")
+                formatted = f"{base}E{int(power):+0{len(exponent) - 1}d}"
+            else:
+                grouping = "," if "," in mantissa else ""
+                formatted = f"{number:{grouping}.{decimals}f}"
+            text = section[:match.start()] + formatted + section[match.end():]
+
+    for i, literal in enumerate(literals):
+        text = text.replace(f"\x01{chr(65 + i)}\x01", literal)
+    return text
+
+
+def _split_sections(number_format):
+    sections, current, quoted = [], "", False
+    for char in number_format:
+        if char == '"':
+            quoted = not quoted
+        if char == ";" and not quoted:
+            sections.append(current)
+            current = ""
+        else:
+            current += char
+    sections.append(current)
+    return sections
+
+
+def _format_general(value):
+    if isinstance(value, int) or float(value).is_integer() and abs(value) < 1e11:
+        return str(int(value))
+    return f"{value:.10G}"
+
+
+def _excel_serial_to_datetime(serial):
+    return datetime.datetime(1899, 12, 30) + datetime.timedelta(days=float(serial))
+
+
+DATE_TOKENS = [
+    ("yyyy", "%Y"), ("yy", "%y"), ("mmmm", "%B"), ("mmm", "%b"),
+    ("dddd", "%A"), ("ddd", "%a"), ("dd", "%d"), ("d", "{d}"),
+    ("hh", "%H"), ("h", "{h}"), ("ss", "%S"), ("am/pm", "%p"),
+]
+
+
+def _format_date(value, number_format):
+    """
+    Formats dates and times with the usual Excel tokens; falls back to ISO format.
+    """
+    if number_format.lower() in ("general", ""):
+        return value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+    pattern = re.sub(r"\[[^\]]*\]", "", _split_sections(number_format)[0]).replace('"', "").replace("\\", "")
+    lower = pattern.lower()
+    out, i, last = "", 0, ""
+    while i < len(lower):
+        for token, replacement in DATE_TOKENS:
+            if lower.startswith(token, i):
+                out += replacement
+                i += len(token)
+                last = token
+                break
+        else:
+            if lower.startswith("mm", i) or lower[i] == "m":
+                length = 2 if lower.startswith("mm", i) else 1
+                # "m" right after hours or before seconds means minutes
+                minutes = last.startswith("h") or re.match(r"m{1,2}\W*s", lower[i:])
+                out += ("%M" if length == 2 else "{M}") if minutes else ("%m" if length == 2 else "{m}")
+                i += length
+                last = "m"
+            else:
+                out += pattern[i].replace("%", "%%").replace("{", "{{").replace("}", "}}")
+                i += 1
+    if not hasattr(value, "year"):
+        value = datetime.datetime.combine(datetime.date(1900, 1, 1), value)
+    elif not hasattr(value, "hour"):
+        value = datetime.datetime.combine(value, datetime.time())
+    return value.strftime(out).format(d=value.day, m=value.month, h=value.hour, M=value.minute)
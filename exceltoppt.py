@@ -1,21 +1,58 @@
 import pandas as pd
-import win32com.client
-import pythoncom
 from pptx import Presentation
-from pptx.util import Inches
-import openpyxl
-from PIL import Image
+from pptx.util import Inches, Pt, Emu
+from pptx.dml.color import RGBColor
+from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.oxml.ns import qn
+from pptx.opc.package import Part
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT, CONTENT_TYPE as CT
+from lxml import etree
+from xml.sax.saxutils import quoteattr
+from excelrange import load_workbook, read_range_snapshot
+from rangeimage import render_png, render_many
 import tempfile
 import os
 import sys
 import logging
-import time
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_width, slide_height, left, top, excel_password=None):
+INSERT_MODES = ["image", "table"]
+
+# Built-in "No Style, No Grid" table style, so only the borders copied from Excel are drawn
+NO_STYLE_TABLE_ID = "{2D5ABB26-0587-4C30-8999-92F81FD0307C}"
+
+HORIZONTAL_ALIGN = {
+    "left": PP_ALIGN.LEFT, "center": PP_ALIGN.CENTER, "right": PP_ALIGN.RIGHT,
+    "justify": PP_ALIGN.JUSTIFY, "distributed": PP_ALIGN.DISTRIBUTE, "fill": PP_ALIGN.LEFT,
+}
+VERTICAL_ANCHOR = {
+    "top": MSO_ANCHOR.TOP, "center": MSO_ANCHOR.MIDDLE, "bottom": MSO_ANCHOR.BOTTOM,
+    "justify": MSO_ANCHOR.MIDDLE, "distributed": MSO_ANCHOR.MIDDLE,
+}
+BORDER_POINTS = {
+    "hair": 0.25, "thin": 0.75, "dotted": 0.75, "dashed": 0.75, "dashDot": 0.75, "dashDotDot": 0.75,
+    "medium": 1.5, "mediumDashed": 1.5, "mediumDashDot": 1.5, "mediumDashDotDot": 1.5, "slantDashDot": 1.5,
+    "thick": 2.25, "double": 2.25,
+}
+MANIFEST_COLUMNS = ["sheet", "range", "slide", "left", "top", "width", "height"]
+
+# PowerPoint tag names recorded on every inserted range, used by refresh()
+TAG_WORKBOOK = "XLRANGE_WORKBOOK"
+TAG_SHEET = "XLRANGE_SHEET"
+TAG_RANGE = "XLRANGE_RANGE"
+TAG_HASH = "XLRANGE_HASH"
+TAG_MODE = "XLRANGE_MODE"
+
+BORDER_DASH = {
+    "dotted": "sysDot", "hair": "sysDot", "dashed": "dash", "mediumDashed": "dash",
+    "dashDot": "dashDot", "mediumDashDot": "dashDot", "slantDashDot": "dashDot",
+    "dashDotDot": "lgDashDotDot", "mediumDashDotDot": "lgDashDotDot",
+}
+
+def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_width, slide_height, left, top, excel_password=None, insert_mode="image"):
     """
     Process Excel data and insert it into a PowerPoint presentation.
     
@@ -30,20 +67,19 @@ def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_wi
     - left: Left position in inches
     - top: Top position in inches
     - excel_password: Optional password for protected Excel files
+    - insert_mode: "image" to paste a rendered picture, "table" to insert a native PowerPoint table
     
     Returns:
     - Path to the saved PowerPoint file or error message
     """
     temp_files = []  # Keep track of temp files to clean up later
-    xlApp = None
     
     try:
-        # Initialize COM for this thread
-        pythoncom.CoInitialize()
-        
         # Validate inputs
         if excel_file is None:
             raise ValueError("Excel file is missing")
+        if insert_mode not in INSERT_MODES:
+            raise ValueError(f"Unknown insert mode '{insert_mode}'. Use one of: {', '.join(INSERT_MODES)}")
             
         # Save uploaded files as temporary files
         if hasattr(ppt_file, 'read'):
@@ -77,57 +113,31 @@ def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_wi
             
         # Load Excel
         logger.info(f"Opening Excel file: {temp_xlsx_path}")
-        xlApp = win32com.client.Dispatch("Excel.Application")
-        xlApp.Visible = True  # Set to True for debugging
-        xlApp.DisplayAlerts = False  # Suppress alerts
-        
-        if excel_password:
-            wb = xlApp.Workbooks.Open(temp_xlsx_path, False, True, None, excel_password)
-        else:
-            wb = xlApp.Workbooks.Open(temp_xlsx_path, False, True)
+        wb = load_workbook(temp_xlsx_path, excel_password)
             
         # Validate sheet name exists
-        sheet_names = [sheet.Name for sheet in wb.Sheets]
+        sheet_names = wb.sheetnames
         if sheet_name not in sheet_names:
             available_sheets = ", ".join(sheet_names)
             raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {available_sheets}")
             
-        ws = wb.Sheets(sheet_name)
-        
-        # Ensure the sheet is active and visible
-        ws.Activate()
+        ws = wb[sheet_name]
         
-        # Check if the range exists and contains data
+        # Check that the range is valid and read it
         try:
-            range_obj = ws.Range(cell_range)
-            if range_obj.Count == 0:
-                raise ValueError(f"The specified range '{cell_range}' is empty")
+            snapshot = read_range_snapshot(ws, cell_range)
         except Exception as e:
             raise ValueError(f"Problem with cell range '{cell_range}': {str(e)}")
         
-        logger.info(f"Copying range {cell_range} from sheet {sheet_name}")
-        
-        # Try to export the range to an image using a chart object
-        try:
-            logger.info("Exporting range as image using chart object")
-            chart_obj = ws.ChartObjects().Add(10, 10, 300, 300)  # Add a chart object temporarily
-            chart = chart_obj.Chart
-            chart.SetSourceData(range_obj)
-            
-            # Export the chart as an image
-            temp_img_path = tempfile.NamedTemporaryFile(delete=False, suffix=".png").name
-            chart.Export(temp_img_path)
-            chart_obj.Delete()  # Clean up the chart object
-            
-            # Load the exported image
-            img = Image.open(temp_img_path)
-            logger.info(f"Successfully created image: {temp_img_path}")
-        except Exception as e:
-            logger.error(f"Failed to export range as image: {str(e)}")
-            raise ValueError("Failed to export range as image from Excel")
-        
-        # Save the image temporarily
-        temp_files.append(temp_img_path)
+        # Render the range to an image in-process (cached by content hash)
+        if insert_mode == "image":
+            logger.info(f"Rendering range {cell_range} from sheet {sheet_name}")
+            try:
+                temp_img_path = render_png(snapshot)
+                logger.info(f"Successfully created image: {temp_img_path}")
+            except Exception as e:
+                logger.error(f"Failed to render range as image: {str(e)}")
+                raise ValueError("Failed to render range as image")
         
         # Load or Create PowerPoint
         logger.info("Working with PowerPoint presentation")
@@ -136,19 +146,17 @@ def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_wi
         else:
             prs = Presentation()
             
-        # Validate slide number
-        if slide_number < 1:
-            raise ValueError("Slide number must be at least 1")
-            
-        # Adjust slide count if needed
-        while len(prs.slides) < slide_number:
-            prs.slides.add_slide(prs.slide_layouts[5])  # Blank layout
-            
-        slide = prs.slides[slide_number - 1]  # Get target slide
+        # Get target slide, adding blank slides if needed
+        slide = get_slide(prs, slide_number)
         
-        # Insert Image
-        logger.info(f"Adding image to slide {slide_number} at position ({left}, {top}) with dimensions {slide_width}x{slide_height}")
-        slide.shapes.add_picture(temp_img_path, Inches(left), Inches(top), Inches(slide_width), Inches(slide_height))
+        # Insert Image or Table
+        if insert_mode == "table":
+            logger.info(f"Adding table to slide {slide_number} at position ({left}, {top}) with dimensions {slide_width}x{slide_height}")
+            shape = add_range_table(slide, snapshot, Inches(left), Inches(top), Inches(slide_width), Inches(slide_height))
+        else:
+            logger.info(f"Adding image to slide {slide_number} at position ({left}, {top}) with dimensions {slide_width}x{slide_height}")
+            shape = slide.shapes.add_picture(temp_img_path, Inches(left), Inches(top), Inches(slide_width), Inches(slide_height))
+        tag_range_shape(slide, shape, source_name(excel_file), snapshot, insert_mode)
         
         # Save Presentation
         output_ppt = tempfile.NamedTemporaryFile(delete=False, suffix=".pptx").name
@@ -156,9 +164,6 @@ def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_wi
         prs.save(output_ppt)
         logger.info(f"Saved presentation to {output_ppt}")
         
-        # Close Excel
-        wb.Close(SaveChanges=False)
-        
         return output_ppt
         
     except Exception as e:
@@ -166,16 +171,6 @@ def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_wi
         return f"Error: {str(e)}"
         
     finally:
-        # Clean up Excel application
-        if xlApp:
-            try:
-                xlApp.Quit()
-            except:
-                pass
-                
-        # Uninitialize COM
-        pythoncom.CoUninitialize()
-                
         # Optionally clean up temporary files (uncomment if you want to delete them)
         # for temp_file in temp_files:
         #     try:
@@ -183,6 +178,386 @@ def process(ppt_file, excel_file, sheet_name, cell_range, slide_number, slide_wi
         #             os.remove(temp_file)
         #     except:
         #         pass
+        pass
+
+
+def process_batch(ppt_file, excel_file, manifest_file, excel_password=None, insert_mode="image", workers=None):
+    """
+    Inserts every placement listed in a manifest into one presentation.
+
+    The workbook and the presentation are each opened once, the distinct ranges
+    are rendered in parallel across a worker pool (image mode), and a single
+    output file is saved.
+
+    Parameters:
+    - ppt_file: PowerPoint file object or path (can be None to create new presentation)
+    - excel_file: Excel file object or path
+    - manifest_file: CSV, XLSX or JSON file object or path with one placement per row and
+      columns sheet, range, slide, left, top, width, height (inches) and optional mode
+    - excel_password: Optional password for protected Excel files
+    - insert_mode: Default insert mode for rows without a mode ("image" or "table")
+    - workers: Optional maximum number of render processes
+
+    Returns:
+    - Path to the saved PowerPoint file or error message
+    """
+    try:
+        if excel_file is None:
+            raise ValueError("Excel file is missing")
+        placements = load_manifest(manifest_file, insert_mode)
+        logger.info(f"Loaded {len(placements)} placements from manifest")
+
+        wb = load_workbook(excel_file, excel_password)
+        snapshots = {}
+        for placement in placements:
+            key = (placement["sheet"], placement["range"])
+            if key not in snapshots:
+                if placement["sheet"] not in wb.sheetnames:
+                    raise ValueError(f"Sheet '{placement['sheet']}' not found. Available sheets: {', '.join(wb.sheetnames)}")
+                snapshots[key] = read_range_snapshot(wb[placement["sheet"]], placement["range"])
+
+        image_keys = list({(p["sheet"], p["range"]) for p in placements if p["mode"] == "image"})
+        image_paths = dict(zip(image_keys, render_many([snapshots[key] for key in image_keys], workers)))
+        logger.info(f"Rendered {len(image_keys)} distinct ranges")
+
+        workbook_name = source_name(excel_file)
+        prs = Presentation(ppt_file) if ppt_file is not None else Presentation()
+        for placement in placements:
+            key = (placement["sheet"], placement["range"])
+            slide = get_slide(prs, placement["slide"])
+            geometry = [Inches(placement[name]) for name in ("left", "top", "width", "height")]
+            if placement["mode"] == "table":
+                shape = add_range_table(slide, snapshots[key], *geometry)
+            else:
+                shape = slide.shapes.add_picture(image_paths[key], *geometry)
+            tag_range_shape(slide, shape, workbook_name, snapshots[key], placement["mode"])
+
+        output_ppt = tempfile.NamedTemporaryFile(delete=False, suffix=".pptx").name
+        prs.save(output_ppt)
+        logger.info(f"Saved presentation to {output_ppt}")
+        return output_ppt
+
+    except Exception as e:
+        logger.error(f"Error in process_batch function: {str(e)}", exc_info=True)
+        return f"Error: {str(e)}"
+
+
+def refresh(ppt_file, excel_file, excel_password=None, match_workbook=True, workers=None):
+    """
+    Refreshes ranges previously inserted by this module in an existing deck.
+
+    Every inserted picture or table carries tags with its source workbook,
+    sheet, range and content hash. Only the tagged ranges are re-read, and
+    only shapes whose content hash changed are replaced, keeping their
+    position, size, z-order and name.
+
+    Parameters:
+    - ppt_file: PowerPoint file object or path
+    - excel_file: Excel file object or path holding the current data
+    - excel_password: Optional password for protected Excel files
+    - match_workbook: Only refresh shapes whose recorded workbook name matches excel_file
+    - workers: Optional maximum number of render processes
+
+    Returns:
+    - Path to the saved PowerPoint file or error message
+    """
+    try:
+        prs = Presentation(ppt_file)
+        workbook_name = source_name(excel_file)
+
+        tagged = []
+        for slide in prs.slides:
+            for shape in slide.shapes:
+                tags = read_shape_tags(slide, shape)
+                if not tags.get(TAG_RANGE):
+                    continue
+                if match_workbook and tags.get(TAG_WORKBOOK) != workbook_name:
+                    continue
+                tagged.append((slide, shape, tags))
+        if not tagged:
+            raise ValueError(f"No ranges from '{workbook_name}' were found in the presentation")
+
+        wb = load_workbook(excel_file, excel_password)
+        snapshots = {}
+        for _, _, tags in tagged:
+            key = (tags.get(TAG_SHEET), tags[TAG_RANGE])
+            if key not in snapshots and key[0] in wb.sheetnames:
+                snapshots[key] = read_range_snapshot(wb[key[0]], key[1])
+
+        changed = []
+        for slide, shape, tags in tagged:
+            key = (tags.get(TAG_SHEET), tags[TAG_RANGE])
+            if key not in snapshots:
+                logger.warning(f"Sheet '{key[0]}' not found, keeping {key[0]}!{key[1]} as is")
+            elif snapshots[key]["hash"] != tags.get(TAG_HASH):
+                changed.append((slide, shape, key, tags.get(TAG_MODE) or "image"))
+        logger.info(f"{len(changed)} of {len(tagged)} tagged ranges changed")
+
+        image_keys = list({key for _, _, key, mode in changed if mode == "image"})
+        image_paths = dict(zip(image_keys, render_many([snapshots[key] for key in image_keys], workers)))
+
+        for slide, shape, key, mode in changed:
+            geometry = (shape.left, shape.top, shape.width, shape.height)
+            if mode == "table":
+                new_shape = add_range_table(slide, snapshots[key], *geometry)
+            else:
+                new_shape = slide.shapes.add_picture(image_paths[key], *geometry)
+            new_shape.name = shape.name
+            tag_range_shape(slide, new_shape, workbook_name, snapshots[key], mode)
+            _replace_shape(slide, shape, new_shape)
+
+        output_ppt = tempfile.NamedTemporaryFile(delete=False, suffix=".pptx").name
+        prs.save(output_ppt)
+        logger.info(f"Saved presentation to {output_ppt}")
+        return output_ppt
+
+    except Exception as e:
+        logger.error(f"Error in refresh function: {str(e)}", exc_info=True)
+        return f"Error: {str(e)}"
+
+
+def source_name(file):
+    """
+    Returns the base file name of a path or file object, as recorded in range tags.
+    """
+    name = file if isinstance(file, str) else getattr(file, "name", "")
+    return os.path.basename(str(name))
+
+
+def tag_range_shape(slide, shape, workbook_name, snapshot, insert_mode):
+    """
+    Records the source of an inserted range on its shape as PowerPoint tags.
+    """
+    set_shape_tags(slide, shape, {
+        TAG_WORKBOOK: workbook_name,
+        TAG_SHEET: snapshot["sheet"],
+        TAG_RANGE: snapshot["range"],
+        TAG_HASH: snapshot["hash"],
+        TAG_MODE: insert_mode,
+    })
+
+
+def set_shape_tags(slide, shape, tags):
+    """
+    Attaches a new ppt/tags part to a shape (p:nvPr/p:custDataLst/p:tags).
+    """
+    blob = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<p:tagLst xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main">'
+        + "".join(f"<p:tag name={quoteattr(name)} val={quoteattr(str(value))}/>" for name, value in tags.items())
+        + "</p:tagLst>"
+    ).encode("utf-8")
+    package = slide.part.package
+    part = Part(package.next_partname("/ppt/tags/tag%d.xml"), CT.PML_TAGS, package, blob)
+    rId = slide.part.relate_to(part, RT.TAGS)
+
+    nvPr = shape._element[0].find(qn("p:nvPr"))
+    custDataLst = nvPr.find(qn("p:custDataLst"))
+    if custDataLst is None:
+        custDataLst = etree.Element(qn("p:custDataLst"))
+        extLst = nvPr.find(qn("p:extLst"))
+        if extLst is not None:
+            extLst.addprevious(custDataLst)
+        else:
+            nvPr.append(custDataLst)
+    etree.SubElement(custDataLst, qn("p:tags")).set(qn("r:id"), rId)
+
+
+def read_shape_tags(slide, shape):
+    """
+    Returns the PowerPoint tags attached to a shape as a dict.
+    """
+    tags = {}
+    nvPr = shape._element[0].find(qn("p:nvPr"))
+    if nvPr is None:
+        return tags
+    for tags_ref in nvPr.iterfind(f"{qn('p:custDataLst')}/{qn('p:tags')}"):
+        try:
+            part = slide.part.related_part(tags_ref.get(qn("r:id")))
+        except KeyError:
+            continue
+        for tag in etree.fromstring(part.blob).iterfind(qn("p:tag")):
+            tags[tag.get("name")] = tag.get("val")
+    return tags
+
+
+def _replace_shape(slide, old_shape, new_shape):
+    """
+    Moves new_shape into old_shape's z-order position and removes old_shape and its now unused relationships.
+    """
+    old_element, new_element = old_shape._element, new_shape._element
+    old_element.addprevious(new_element)
+    rIds = set(old_element.xpath(".//@r:embed | .//@r:link | .//@r:id"))
+    old_element.getparent().remove(old_element)
+    for rId in rIds:
+        if not slide.part._element.xpath(f'.//@r:embed[.="{rId}"] | .//@r:link[.="{rId}"] | .//@r:id[.="{rId}"]'):
+            slide.part.drop_rel(rId)
+
+
+def load_manifest(manifest_file, insert_mode="image"):
+    """
+    Reads a placement manifest (CSV, XLSX or JSON records) into a list of dicts.
+
+    Column names are matched case-insensitively; positions and sizes are in inches.
+    """
+    name = manifest_file if isinstance(manifest_file, str) else getattr(manifest_file, "name", "")
+    extension = os.path.splitext(name)[1].lower()
+    if extension == ".csv":
+        df = pd.read_csv(manifest_file)
+    elif extension in (".xlsx", ".xlsm", ".xls"):
+        df = pd.read_excel(manifest_file)
+    elif extension == ".json":
+        df = pd.read_json(manifest_file, orient="records")
+    else:
+        raise ValueError("Manifest must be a .csv, .xlsx or .json file")
+
+    df.columns = [str(col).strip().lower().replace(" ", "_") for col in df.columns]
+    missing = [col for col in MANIFEST_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Manifest is missing column(s): {', '.join(missing)}")
+    if "mode" not in df.columns:
+        df["mode"] = insert_mode
+    df["mode"] = df["mode"].fillna(insert_mode).astype(str).str.strip().str.lower()
+    unknown = sorted(set(df["mode"]) - set(INSERT_MODES))
+    if unknown:
+        raise ValueError(f"Unknown insert mode(s) in manifest: {', '.join(unknown)}")
+
+    placements = []
+    for row_number, row in enumerate(df.to_dict("records"), start=1):
+        try:
+            placements.append({
+                "sheet": str(row["sheet"]),
+                "range": str(row["range"]).replace(" ", "").upper(),
+                "slide": int(row["slide"]),
+                "left": float(row["left"]),
+                "top": float(row["top"]),
+                "width": float(row["width"]),
+                "height": float(row["height"]),
+                "mode": row["mode"],
+            })
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid manifest row {row_number}: {str(e)}")
+    return placements
+
+
+def get_slide(prs, slide_number):
+    """
+    Returns the slide at a 1-based position, appending blank slides if the deck is shorter.
+    """
+    if slide_number < 1:
+        raise ValueError("Slide number must be at least 1")
+    while len(prs.slides) < slide_number:
+        prs.slides.add_slide(prs.slide_layouts[5])  # Blank layout
+    return prs.slides[slide_number - 1]
+
+
+def add_range_table(slide, snapshot, left, top, width, height):
+    """
+    Inserts a range snapshot as a native PowerPoint table.
+
+    Column widths and row heights keep the proportions they have in Excel, and
+    font sizes are scaled by the same factor as the table so the text fits.
+    Formatted text, fonts, fills, borders, alignment and merged cells are
+    carried over from the snapshot.
+
+    Parameters:
+    - slide: python-pptx Slide to add the table to
+    - snapshot: dict produced by excelrange.read_range_snapshot
+    - left, top, width, height: Table geometry (EMU)
+
+    Returns:
+    - The table's GraphicFrame shape
+    """
+    col_px = [width_chars * 7 + 5 if width_chars else 0 for width_chars in snapshot["col_widths"]]
+    row_pt = snapshot["row_heights"]
+    natural_width = Inches(sum(col_px) / 96)
+    natural_height = Pt(sum(row_pt))
+    font_scale = min(width / natural_width, height / natural_height) if natural_width and natural_height else 1
+
+    shape = slide.shapes.add_table(len(row_pt), len(col_px), left, top, width, height)
+    tbl = shape._element.graphic.graphicData.tbl
+    tbl.tblPr.set("firstRow", "0")
+    tbl.tblPr.set("bandRow", "0")
+    style_id = tbl.tblPr.find(qn("a:tableStyleId"))
+    if style_id is None:
+        style_id = etree.SubElement(tbl.tblPr, qn("a:tableStyleId"))
+    style_id.text = NO_STYLE_TABLE_ID
+
+    table = shape.table
+    for i, size in enumerate(_split_length(width, col_px)):
+        table.columns[i].width = Emu(max(size, 1))
+    for i, size in enumerate(_split_length(height, row_pt)):
+        table.rows[i].height = Emu(max(size, 1))
+
+    for top_row, left_col, bottom_row, right_col in snapshot["merges"]:
+        if (top_row, left_col) != (bottom_row, right_col):
+            table.cell(top_row, left_col).merge(table.cell(bottom_row, right_col))
+
+    for r, row in enumerate(snapshot["cells"]):
+        for c, cell_snapshot in enumerate(row):
+            cell = table.cell(r, c)
+            _set_cell_borders(cell, cell_snapshot["borders"])
+            if cell_snapshot["fill"]:
+                cell.fill.solid()
+                cell.fill.fore_color.rgb = RGBColor.from_string(cell_snapshot["fill"])
+            else:
+                cell.fill.background()
+            if cell.is_spanned:
+                continue
+
+            cell.margin_left = cell.margin_right = Pt(2 * font_scale)
+            cell.margin_top = cell.margin_bottom = Pt(1 * font_scale)
+            cell.vertical_anchor = VERTICAL_ANCHOR.get(cell_snapshot["vertical"], MSO_ANCHOR.BOTTOM)
+            text_frame = cell.text_frame
+            text_frame.word_wrap = cell_snapshot["wrap"]
+            paragraph = text_frame.paragraphs[0]
+            paragraph.alignment = HORIZONTAL_ALIGN.get(cell_snapshot["horizontal"], PP_ALIGN.LEFT)
+            run = paragraph.add_run()
+            run.text = cell_snapshot["text"].strip()
+            font = run.font
+            font.size = Pt(max(round(cell_snapshot["size"] * font_scale * 2) / 2, 1))
+            font.bold = cell_snapshot["bold"]
+            font.italic = cell_snapshot["italic"]
+            font.underline = cell_snapshot["underline"]
+            font.color.rgb = RGBColor.from_string(cell_snapshot["color"])
+
+    return shape
+
+
+def _split_length(total, weights):
+    """
+    Splits an EMU length in proportion to weights, with the parts summing exactly to total.
+    """
+    weight_sum = sum(weights) or 1
+    bounds, running = [0], 0
+    for weight in weights:
+        running += weight
+        bounds.append(round(total * running / weight_sum))
+    return [end - start for start, end in zip(bounds, bounds[1:])]
+
+
+def _set_cell_borders(cell, borders):
+    """
+    Writes a:lnL/lnR/lnT/lnB border lines into a table cell, ahead of any fill element.
+    """
+    tcPr = cell._tc.get_or_add_tcPr()
+    for index, (side, tag) in enumerate((("left", "a:lnL"), ("right", "a:lnR"), ("top", "a:lnT"), ("bottom", "a:lnB"))):
+        for existing in tcPr.findall(qn(tag)):
+            tcPr.remove(existing)
+        line = etree.Element(qn(tag))
+        if side in borders:
+            style, color = borders[side]
+            line.set("w", str(Pt(BORDER_POINTS.get(style, 0.75))))
+            if style == "double":
+                line.set("cmpd", "dbl")
+            solid = etree.SubElement(line, qn("a:solidFill"))
+            etree.SubElement(solid, qn("a:srgbClr")).set("val", color)
+            if style in BORDER_DASH:
+                etree.SubElement(line, qn("a:prstDash")).set("val", BORDER_DASH[style])
+        else:
+            line.set("w", "0")
+            etree.SubElement(line, qn("a:noFill"))
+        tcPr.insert(index, line)
 
 
 def main():
@@ -220,10 +595,4 @@ def main():
 
 
 if __name__ == "__main__":
-    # Initialize COM at the application level
-    pythoncom.CoInitialize()
-    try:
-        main()
-    finally:
-        # Uninitialize COM when done
-        pythoncom.CoUninitialize()
+    main()
@@ -0,0 +1,231 @@
+import re
+import numpy as np
+import openpyxl
+from openpyxl.utils import get_column_letter, column_index_from_string
+from openpyxl.worksheet.formula import ArrayFormula, DataTableFormula
+from openpyxl.worksheet._read_only import ReadOnlyWorksheet
+
+# A run needs this many formulas, and its most common fingerprint this share of them, to be checked
+MIN_RUN_FORMULAS = 3
+DOMINANT_SHARE = 0.5
+
+MAX_COLUMN = 16384  # XFD
+EMPTY = 0
+CONSTANT = -1
+
+# String literals and quoted sheet names, which are left as they are
+QUOTED = re.compile(r"(\"(?:[^\"]|\"\")*\"|'(?:[^']|'')*')")
+REFERENCE = re.compile(
+    r"(?<![A-Za-z0-9_.\]$])"
+    r"(?:"
+    r"(\$?)([A-Za-z]{1,3})(\$?)([0-9]{1,7})"  # A1, $A$1
+    r"|(\$?)([A-Za-z]{1,3}):(\$?)([A-Za-z]{1,3})"  # A:C
+    r"|(\$?)([0-9]{1,7}):(\$?)([0-9]{1,7})"  # 1:5
+    r")"
+    r"(?![A-Za-z0-9_(!])"
+)
+_column_numbers = {}  # column letters -> number, filled as references are seen
+
+
+def fingerprint(formula, row, column):
+    """
+    Returns a formula in relative R1C1 form as seen from the cell at (row, column).
+
+    Formulas filled down or across a range have the same fingerprint in every
+    cell; one pointing at another row or column does not. Text in quotes and
+    sheet names are kept as they are, and a reference's sheet prefix stays in
+    front of it.
+    """
+    def relative(match):
+        cabs, col, rabs, ref_row, c1abs, col1, c2abs, col2, r1abs, row1, r2abs, row2 = match.groups()
+        try:
+            if col is not None:
+                return _r1c1_row(rabs, ref_row, row) + _r1c1_col(cabs, col, column)
+            if col1 is not None:
+                return f"{_r1c1_col(c1abs, col1, column)}:{_r1c1_col(c2abs, col2, column)}"
+            return f"{_r1c1_row(r1abs, row1, row)}:{_r1c1_row(r2abs, row2, row)}"
+        except ValueError:
+            return match.group(0)  # letters beyond XFD: a name, not a reference
+
+    formula = formula[1:] if formula.startswith("=") else formula
+    if '"' not in formula and "'" not in formula:
+        return "=" + REFERENCE.sub(relative, formula)
+    parts = QUOTED.split(formula)
+    for index in range(0, len(parts), 2):
+        parts[index] = REFERENCE.sub(relative, parts[index])
+    return "=" + "".join(parts)
+
+
+def _r1c1_row(absolute, target, row):
+    return f"R{target}" if absolute else f"R[{int(target) - row}]"
+
+
+def _r1c1_col(absolute, letters, column):
+    target = _column_numbers.get(letters)
+    if target is None:
+        target = _column_numbers[letters] = column_index_from_string(letters.upper())
+    if target > MAX_COLUMN:
+        raise ValueError(letters)
+    return f"C{target}" if absolute else f"C[{target - column}]"
+
+
+def formula_text(value):
+    """
+    Returns the formula of a cell value as read by openpyxl, or None for a constant.
+    """
+    if isinstance(value, ArrayFormula):
+        return value.text
+    if isinstance(value, DataTableFormula):
+        return f"=TABLE({value.r1 or ''},{value.r2 or ''})"
+    if isinstance(value, str) and value.startswith("=") and len(value) > 1:
+        return value
+    return None
+
+
+def scan_sheet(sheet):
+    """
+    Finds formulas that break the pattern of the formulas around them.
+
+    Every formula is reduced to its R1C1 fingerprint and interned in one hash
+    index, so the sheet becomes a grid of small integers (0 empty, -1
+    constant) and each check is a count over that grid: linear in the
+    number of cells. A column's runs of non-empty cells are checked when
+    they hold enough formulas with one dominant fingerprint. Inside the span
+    of that fingerprint, a formula with another fingerprint is flagged
+    unless its row agrees with it (a totals row, say), and so is a constant
+    (a hard-coded value).
+
+    Parameters:
+    - sheet: openpyxl worksheet, loaded with formulas (data_only=False); read-only works
+
+    Returns:
+    - List of findings, dicts with cell, row, column, issue, content (the cell's formula
+      or value), expected (the dominant formula, as written in expected_cell) and run
+    """
+    ids = {}  # fingerprint -> id
+    examples = {}  # id -> (cell, formula) of its first occurrence
+    rows = []
+    for row_number, values in enumerate(sheet.iter_rows(values_only=True), start=1):
+        row_ids = np.zeros(len(values), dtype=np.int32)
+        for column, value in enumerate(values, start=1):
+            if value is None or value == "":
+                continue
+            formula = formula_text(value)
+            if formula is None:
+                row_ids[column - 1] = CONSTANT
+                continue
+            key = fingerprint(formula, row_number, column)
+            fingerprint_id = ids.get(key)
+            if fingerprint_id is None:
+                fingerprint_id = ids[key] = len(ids) + 1
+                examples[fingerprint_id] = (f"{get_column_letter(column)}{row_number}", formula)
+            row_ids[column - 1] = fingerprint_id
+        rows.append(row_ids)
+    if not ids:
+        return []
+
+    grid = np.zeros((len(rows), max(len(row) for row in rows)), dtype=np.int32)
+    for index, row_ids in enumerate(rows):
+        grid[index, :len(row_ids)] = row_ids
+    del rows
+
+    findings = []
+    for column in np.flatnonzero((grid > 0).sum(axis=0) >= MIN_RUN_FORMULAS):
+        values = grid[:, column]
+        for first, last in _runs(values != EMPTY):
+            run = values[first:last + 1]
+            formulas = run[run > 0]
+            if len(formulas) < MIN_RUN_FORMULAS:
+                continue
+            counts = np.bincount(formulas)
+            dominant = int(counts.argmax())
+            if counts[dominant] < DOMINANT_SHARE * len(formulas):
+                continue
+            span = np.flatnonzero(run == dominant)
+            run_name = f"{get_column_letter(column + 1)}{first + 1}:{get_column_letter(column + 1)}{last + 1}"
+            for offset in range(span[0], span[-1] + 1):
+                value = run[offset]
+                if value == dominant:
+                    continue
+                row = int(first + offset)
+                if value == CONSTANT:
+                    issue = "Constant in formula run"
+                elif _row_agrees(grid[row], column, value):
+                    continue
+                else:
+                    issue = "Inconsistent formula"
+                findings.append({
+                    "cell": f"{get_column_letter(column + 1)}{row + 1}",
+                    "row": row + 1,
+                    "column": int(column) + 1,
+                    "issue": issue,
+                    "expected": examples[dominant][1],
+                    "expected_cell": examples[dominant][0],
+                    "run": run_name,
+                })
+    findings.sort(key=lambda finding: (finding["row"], finding["column"]))
+    contents = _cell_contents(sheet, [(finding["row"], finding["column"]) for finding in findings])
+    for finding in findings:
+        finding["content"] = contents.get((finding["row"], finding["column"]))
+    return findings
+
+
+def _cell_contents(sheet, cells):
+    """
+    Returns the formula or value of the given (row, column) cells. A read-only
+    sheet is streamed once more over just the rows needed.
+    """
+    if not cells:
+        return {}
+    if not isinstance(sheet, ReadOnlyWorksheet):
+        return {(row, column): _content(sheet.cell(row=row, column=column).value) for row, column in cells}
+    wanted = set(cells)
+    first_row, last_row = min(row for row, _ in cells), max(row for row, _ in cells)
+    contents = {}
+    for row, values in enumerate(sheet.iter_rows(min_row=first_row, max_row=last_row, values_only=True), start=first_row):
+        for column, value in enumerate(values, start=1):
+            if (row, column) in wanted:
+                contents[(row, column)] = _content(value)
+    return contents
+
+
+def _content(value):
+    formula = formula_text(value)
+    return formula if formula is not None else value
+
+
+def _runs(mask):
+    """
+    Returns (first, last) index pairs of the runs of True in a 1D mask.
+    """
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return zip(np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1)
+
+
+def _row_agrees(row, column, value):
+    """
+    Whether a formula is filled across its row: a neighbouring cell has the same fingerprint.
+    """
+    return (column > 0 and row[column - 1] == value) or (column + 1 < len(row) and row[column + 1] == value)
+
+
+def scan_workbook(source, sheet_names=None):
+    """
+    Scans sheets of a workbook for broken formulas (see scan_sheet).
+
+    Parameters:
+    - source: Path or file-like object of the workbook
+    - sheet_names: Sheets to scan (defaults to all worksheets)
+
+    Returns:
+    - List of findings, each with its sheet name added
+    """
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=False)
+    try:
+        findings = []
+        for name in sheet_names or workbook.sheetnames:
+            for finding in scan_sheet(workbook[name]):
+                findings.append({"sheet": name, **finding})
+        return findings
+    finally:
+        workbook.close()
@@ -1,30 +1,52 @@
-import win32com.client
-import pythoncom
+import copy
+import zlib
+import hashlib
 import tempfile
-import time
-import os
+from lxml import etree
+from opcpackage import (
+    CT_NOTES_MASTER,
+    CT_SLIDE,
+    CT_SLIDE_LAYOUT,
+    CT_SLIDE_MASTER,
+    NS,
+    PRESENTATION,
+    RT_NOTES_MASTER,
+    RT_SLIDE,
+    RT_SLIDE_MASTER,
+    OpcPackage,
+    partname_template,
+    qn,
+    relative_target,
+)
+from updateppt_ppt2ppt import parse_slide_list, update_sections
+
+# Relationships from a slide that are not carried over (comments belong to the source deck's authors)
+DROPPED_RELATIONSHIPS = ("/comments", "/commentAuthors")
+
+# Parts shared by every copied slide that uses them; all other parts are copied per slide
+CT_THEME = "application/vnd.openxmlformats-officedocument.theme+xml"
+SHARED_CONTENT_TYPES = {CT_SLIDE_LAYOUT, CT_SLIDE_MASTER, CT_NOTES_MASTER, CT_THEME}
 
 def process(ppt_file_A, ppt_file_B, slide_to_merge, merge_position):
     """
-    Copies a slide from presentation A and inserts it at a specific position in presentation B.
-    
+    Copies slides from presentation A and inserts them at specific positions in presentation B.
+
+    Slides are copied in-process together with everything they use: layouts
+    and masters (reusing B's own when they are identical), notes, charts,
+    embedded objects and media. Pictures already present in B, or repeated
+    across the copied slides, are stored only once.
+
     Parameters:
-        ppt_file_A (BytesIO): First PowerPoint file containing the slide to copy.
-        ppt_file_B (BytesIO): Second PowerPoint file where the slide will be inserted.
-        slide_to_merge (int): Slide number in presentation A to copy.
-        merge_position (int): Position in presentation B to insert the copied slide.
-    
+        ppt_file_A (BytesIO): First PowerPoint file containing the slides to copy.
+        ppt_file_B (BytesIO): Second PowerPoint file where the slides will be inserted.
+        slide_to_merge (int or str): Slide number(s) in presentation A to copy, e.g. 3 or "2, 5-7".
+        merge_position (int or str): Position(s) in the merged presentation for the copied slides.
+            A single position places all copied slides consecutively from there.
+
     Returns:
         str: Path to the merged PowerPoint file or error message.
     """
-    pptApp = None
-    presentation_A = None
-    presentation_B = None
-    
     try:
-        # Initialize COM - this is the missing step in the original code
-        pythoncom.CoInitialize()
-        
         # Save uploaded files as temporary files
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as temp_A, \
              tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as temp_B:
@@ -34,105 +56,321 @@ def process(ppt_file_A, ppt_file_B, slide_to_merge, merge_position):
 
             temp_A_path = temp_A.name
             temp_B_path = temp_B.name
-            
+
         print(f"Temp files created: {temp_A_path}, {temp_B_path}")
 
-        # Create PowerPoint Application
-        pptApp = win32com.client.Dispatch("PowerPoint.Application")
-        pptApp.Visible = True  # Run in foreground for stability
-        
-        # Allow PowerPoint to fully initialize
-        time.sleep(1)
-
-        # Open presentations - explicitly set ReadOnly to False
-        presentation_A = pptApp.Presentations.Open(temp_A_path, ReadOnly=False, WithWindow=True)
-        time.sleep(0.5)  # Give time to fully load
-        
-        presentation_B = pptApp.Presentations.Open(temp_B_path, ReadOnly=False, WithWindow=True)
-        time.sleep(0.5)  # Give time to fully load
-
-        slides_A = presentation_A.Slides
-        slides_B = presentation_B.Slides
-        
-        # Make sure one of the presentations is active
-        presentation_A.Windows(1).Activate()
-        time.sleep(0.2)
-
-        # Validate slide and merge position
-        if slide_to_merge < 1 or slide_to_merge > slides_A.Count:
-            raise ValueError(f"Invalid slide number {slide_to_merge} in PPT A (which has {slides_A.Count} slides)!")
-        
-        if merge_position < 1 or merge_position > slides_B.Count + 1:
-            raise ValueError(f"Invalid merge position {merge_position} in PPT B (which has {slides_B.Count} slides)!")
-
-        # Copy the slide from A and paste it in B
-        print(f"Copying slide {slide_to_merge} from presentation A")
-        slides_A(slide_to_merge).Copy()
-        time.sleep(0.5)  # Give time for copy operation to complete
-        
-        # Activate presentation B to ensure paste works correctly
-        presentation_B.Windows(1).Activate()
-        time.sleep(0.3)
-        
-        print(f"Pasting slide to position {merge_position} in presentation B")
-        # Use the Paste method with Index parameter
-        slides_B.Paste(Index=merge_position)
-        time.sleep(0.5)  # Give time for paste operation to complete
-
-        # Create output filename
-        merged_ppt_file = os.path.join(os.path.dirname(temp_B_path), "merged_presentation.pptx")
-        
-        # Save the merged file
-        print(f"Saving merged presentation to {merged_ppt_file}")
-        presentation_B.SaveAs(merged_ppt_file)
-        time.sleep(0.5)  # Give time for save operation to complete
-
-        # Close presentations
-        presentation_A.Close()
-        presentation_B.Close()
-        
-        # Quit PowerPoint
-        pptApp.Quit()
-        
-        # Clean up temporary files
-        try:
-            os.remove(temp_A_path)
-            os.remove(temp_B_path)
-        except:
-            pass
-
-        # Always clean up COM resources
-        pythoncom.CoUninitialize()
-        
+        with OpcPackage(temp_A_path) as source, OpcPackage(temp_B_path) as target:
+            count_A = len(source.xml(PRESENTATION).find("p:sldIdLst", NS))
+            count_B = len(target.xml(PRESENTATION).find("p:sldIdLst", NS))
+            slides = parse_slide_list(slide_to_merge)
+            positions = parse_slide_list(merge_position)
+            if len(positions) == 1 and len(slides) > 1:
+                positions = list(range(positions[0], positions[0] + len(slides)))
+
+            # Validate slides and merge positions
+            if not slides:
+                raise ValueError("No slides to merge were given!")
+            for number in slides:
+                if number < 1 or number > count_A:
+                    raise ValueError(f"Invalid slide number {number} in PPT A (which has {count_A} slides)!")
+            if len(positions) != len(slides):
+                raise ValueError("The number of slides to merge and merge positions must match!")
+            if len(set(positions)) != len(positions):
+                raise ValueError("Two slides cannot be merged at the same position!")
+            for position in positions:
+                if position < 1 or position > count_B + len(slides):
+                    raise ValueError(f"Invalid merge position {position} (the merged PPT has {count_B + len(slides)} slides)!")
+
+            importer = SlideImporter(target, source)
+            for number in slides:
+                print(f"Copying slide {number} from presentation A")
+                importer.import_slide(number)
+            importer.finish()
+            place_slides(target, count_B, positions)
+
+            merged_ppt_file = temp_B_path.replace(".pptx", "_merged.pptx")
+            print(f"Saving merged presentation to {merged_ppt_file}")
+            target.save(merged_ppt_file)
+
+        print(f"Copied {len(slides)} slides; {importer.media_reused} media parts reused")
         return merged_ppt_file
 
     except Exception as e:
         error_msg = f"Error: {str(e)}"
         print(error_msg)
-        
-        # Clean up resources
-        try:
-            if presentation_A is not None:
-                presentation_A.Close()
-        except:
-            pass
-            
-        try:
-            if presentation_B is not None:
-                presentation_B.Close()
-        except:
-            pass
-            
-        try:
-            if pptApp is not None:
-                pptApp.Quit()
-        except:
-            pass
-            
-        # Make sure to uninitialize COM if it was initialized
-        try:
-            pythoncom.CoUninitialize()
-        except:
-            pass
-            
-        return error_msg
\ No newline at end of file
+        return error_msg
+
+def place_slides(package, existing_count, positions):
+    """
+    Moves the slides appended after the first existing_count slides to their
+    1-based positions in the final order; the existing slides fill the rest
+    in their original order. Sections are updated to match.
+    """
+    presentation = package.xml(PRESENTATION)
+    sldIdLst = presentation.find("p:sldIdLst", NS)
+    entries = list(sldIdLst)
+    existing, added = iter(entries[:existing_count]), entries[existing_count:]
+    order = [None] * len(entries)
+    for entry, position in zip(added, positions):
+        order[position - 1] = entry
+    order = [entry if entry is not None else next(existing) for entry in order]
+    for entry in entries:
+        sldIdLst.remove(entry)
+    for entry in order:
+        sldIdLst.append(entry)
+    # Copied slides join the section of the slide before them
+    update_sections(presentation, [(entry, entry.get("id") if entry not in added else None) for entry in order])
+
+class SlideImporter:
+    """
+    Copies slides from one presentation package into another.
+
+    Layouts, masters, themes and media are copied once per import session and
+    shared by every slide that uses them; slide-specific parts such as notes
+    and charts are copied with each slide. Masters are matched against the
+    target's by content (master, theme and all its layouts) and reused when
+    identical; otherwise the master is copied with its layouts. Media parts
+    are looked up by size and CRC first and confirmed by SHA-256, so a
+    picture already in the target, or used by several copied slides, is
+    stored once.
+
+    Parameters:
+    - target: OpcPackage receiving the slides
+    - source: OpcPackage the slides come from
+    """
+
+    def __init__(self, target, source):
+        self.target = target
+        self.source = source
+        self.media_reused = 0
+        self._mapped = {}  # shared source part -> target part
+        self._slide_mapped = {}  # source part -> target part for the slide being imported
+        self._slide_links = []  # (target slide, rId, source slide it links to)
+        self._imported_slides = {}  # source slide -> target slide
+        self._target_masters = None
+        self._target_media = None
+        presentation = target.xml(PRESENTATION)
+        self._next_slide_id = max([int(entry.get("id")) for entry in presentation.find("p:sldIdLst", NS)] + [255]) + 1
+
+    def import_slide(self, slide_number):
+        """
+        Copies a 1-based slide of the source to the end of the target's slide list.
+
+        Returns:
+        - The new p:sldId element
+        """
+        sldIdLst = self.source.xml(PRESENTATION).find("p:sldIdLst", NS)
+        slide_part = self.source.related(PRESENTATION, sldIdLst[slide_number - 1].get(qn("r:id")))
+        self._slide_mapped = {}
+        new_part = self._copy_part(slide_part)
+        # Links to a slide copied more than once go to its first copy
+        self._imported_slides.setdefault(slide_part, new_part)
+
+        target_presentation = self.target.xml(PRESENTATION)
+        entry = etree.SubElement(target_presentation.find("p:sldIdLst", NS), qn("p:sldId"))
+        entry.set("id", str(self._next_slide_id))
+        entry.set(qn("r:id"), self.target.add_relationship(PRESENTATION, RT_SLIDE, new_part))
+        self._next_slide_id += 1
+        return entry
+
+    def finish(self):
+        """
+        Resolves links between copied slides; links to slides that were not copied are removed.
+        """
+        for new_part, rId, linked_slide in self._slide_links:
+            rels = self.target.rels_xml(new_part)
+            rel = next(rel for rel in rels if rel.get("Id") == rId)
+            if linked_slide in self._imported_slides:
+                rel.set("Target", relative_target(new_part, self._imported_slides[linked_slide]))
+                continue
+            rels.remove(rel)
+            slide = self.target.xml(new_part)
+            for link in slide.xpath("//*[@r:id=$rId]", namespaces=NS, rId=rId):
+                if etree.QName(link).localname.startswith("hlink"):
+                    link.getparent().remove(link)
+        self._slide_links = []
+
+    def _copy_part(self, part):
+        content_type = self.source.content_type(part)
+        mapped = self._mapped if content_type in SHARED_CONTENT_TYPES or part.startswith("ppt/media/") else self._slide_mapped
+        if part in mapped:
+            return mapped[part]
+
+        if content_type == CT_SLIDE_MASTER:
+            match = self._match_master(part)
+            if match is not None:
+                return self._mapped[part]
+        elif content_type == CT_SLIDE_LAYOUT:
+            # Layouts come with their master, which decides whether they are reused
+            master = next(rel.target for rel in self.source.relationships(part) if rel.type == RT_SLIDE_MASTER)
+            self._copy_part(master)
+            if part in self._mapped:
+                return self._mapped[part]
+        elif content_type == CT_NOTES_MASTER:
+            existing = self._target_notes_master()
+            if existing is not None:
+                self._mapped[part] = existing
+                return existing
+        elif part.startswith("ppt/media/"):
+            match = self._match_media(part)
+            if match is not None:
+                self.media_reused += 1
+                self._mapped[part] = match
+                return match
+
+        new_part = self.target.next_partname(partname_template(part))
+        mapped[part] = new_part
+        self.target.add_part_from(self.source, part, new_part, content_type)
+        if part.startswith("ppt/media/"):
+            self._target_media.setdefault(self._media_key(self.source, part), []).append(new_part)
+
+        relationships = self.source.relationships(part)
+        if relationships:
+            rels = self.target.rels_xml(new_part)
+            for rel in relationships:
+                if rel.type.endswith(DROPPED_RELATIONSHIPS):
+                    continue
+                element = etree.SubElement(rels, f"{{{NS['rel']}}}Relationship")
+                element.set("Id", rel.rId)
+                element.set("Type", rel.type)
+                if rel.external:
+                    element.set("Target", rel.target)
+                    element.set("TargetMode", "External")
+                elif rel.type == RT_SLIDE and content_type == CT_SLIDE:
+                    # Slide-to-slide links are settled in finish(), once all slides are in
+                    element.set("Target", relative_target(new_part, new_part))
+                    self._slide_links.append((new_part, rel.rId, rel.target))
+                else:
+                    element.set("Target", relative_target(new_part, self._copy_part(rel.target)))
+
+        if content_type == CT_SLIDE_MASTER:
+            self._register_master(new_part)
+        elif content_type == CT_NOTES_MASTER:
+            self._register_notes_master(new_part)
+        return new_part
+
+    def _match_master(self, master):
+        """
+        Maps a source master and its layouts onto an identical target master, if there is one.
+        """
+        if self._target_masters is None:
+            self._target_masters = {}
+            for entry in self.target.xml(PRESENTATION).find("p:sldMasterIdLst", NS):
+                target_master = self.target.related(PRESENTATION, entry.get(qn("r:id")))
+                self._target_masters.setdefault(_master_signature(self.target, target_master), target_master)
+        target_master = self._target_masters.get(_master_signature(self.source, master))
+        if target_master is None:
+            return None
+        self._mapped[master] = target_master
+        for source_layout, target_layout in zip(_master_layouts(self.source, master), _master_layouts(self.target, target_master)):
+            self._mapped[source_layout] = target_layout
+        # Identical master XML means identical rIds, so the theme and the master's media pair up by rId
+        target_rels = {rel.rId: rel for rel in self.target.relationships(target_master)}
+        for rel in self.source.relationships(master):
+            target_rel = target_rels.get(rel.rId)
+            if target_rel is not None and target_rel.type == rel.type and not rel.external:
+                self._mapped.setdefault(rel.target, target_rel.target)
+        return target_master
+
+    def _match_media(self, part):
+        if self._target_media is None:
+            self._target_media = {}
+            for name in self.target.names:
+                if name.startswith("ppt/media/"):
+                    self._target_media.setdefault(self._media_key(self.target, name), []).append(name)
+        candidates = self._target_media.get(self._media_key(self.source, part), [])
+        if not candidates:
+            return None
+        digest = hashlib.sha256(self.source.read(part)).digest()
+        for candidate in candidates:
+            if hashlib.sha256(self.target.read(candidate)).digest() == digest:
+                return candidate
+        return None
+
+    @staticmethod
+    def _media_key(package, name):
+        # Size and CRC come from the ZIP directory, so indexing media reads no media data
+        info = package.member_info(name)
+        if info is not None:
+            return (info.file_size, info.CRC)
+        data = package.read(name)
+        return (len(data), zlib.crc32(data))
+
+    def _register_master(self, new_master):
+        """
+        Lists a copied master in presentation.xml and gives it and its layouts unused ids.
+        """
+        presentation = self.target.xml(PRESENTATION)
+        master_list = presentation.find("p:sldMasterIdLst", NS)
+        used = [int(entry.get("id")) for entry in master_list]
+        for entry in master_list:
+            master = self.target.related(PRESENTATION, entry.get(qn("r:id")))
+            used += [int(layout.get("id")) for layout in self.target.parse(master).findall("p:sldLayoutIdLst/p:sldLayoutId", NS)]
+        next_id = max(used + [2147483647]) + 1
+
+        entry = etree.SubElement(master_list, qn("p:sldMasterId"))
+        entry.set("id", str(next_id))
+        entry.set(qn("r:id"), self.target.add_relationship(PRESENTATION, RT_SLIDE_MASTER, new_master))
+        for layout in self.target.xml(new_master).findall("p:sldLayoutIdLst/p:sldLayoutId", NS):
+            next_id += 1
+            layout.set("id", str(next_id))
+        if self._target_masters is not None:
+            self._target_masters.setdefault(_master_signature(self.target, new_master), new_master)
+
+    def _target_notes_master(self):
+        """
+        Returns the target's notes master, or None. A notes master that is only
+        related from presentation.xml (as in decks saved by python-pptx) is listed there too.
+        """
+        existing = self.target.xml(PRESENTATION).find("p:notesMasterIdLst/p:notesMasterId", NS)
+        if existing is not None:
+            return self.target.related(PRESENTATION, existing.get(qn("r:id")))
+        for rel in self.target.relationships(PRESENTATION):
+            if rel.type == RT_NOTES_MASTER and not rel.external:
+                self._list_notes_master(rel.rId)
+                return rel.target
+        return None
+
+    def _register_notes_master(self, new_notes_master):
+        self._list_notes_master(self.target.add_relationship(PRESENTATION, RT_NOTES_MASTER, new_notes_master))
+
+    def _list_notes_master(self, rId):
+        presentation = self.target.xml(PRESENTATION)
+        notes_list = etree.Element(qn("p:notesMasterIdLst"))
+        etree.SubElement(notes_list, qn("p:notesMasterId")).set(qn("r:id"), rId)
+        presentation.find("p:sldMasterIdLst", NS).addnext(notes_list)
+
+def _master_layouts(package, master):
+    """
+    Returns a master's layout part names in the order of its p:sldLayoutIdLst.
+    """
+    return [
+        package.related(master, entry.get(qn("r:id")))
+        for entry in package.parse(master).findall("p:sldLayoutIdLst/p:sldLayoutId", NS)
+    ]
+
+def _master_signature(package, master):
+    """
+    Hashes a master with its theme, media and layouts, leaving out the ids and rIds that differ between decks.
+    """
+    digest = hashlib.sha256()
+    master_xml = copy.deepcopy(package.parse(master))
+    for layout_list in master_xml.findall("p:sldLayoutIdLst", NS):
+        master_xml.remove(layout_list)
+    digest.update(etree.tostring(master_xml))
+    for rel in package.relationships(master):
+        if rel.external or package.content_type(rel.target) == CT_SLIDE_LAYOUT:
+            continue
+        digest.update(_part_fingerprint(package, rel.target))
+    for layout in _master_layouts(package, master):
+        digest.update(package.read(layout))
+        for rel in package.relationships(layout):
+            if not rel.external and rel.type != RT_SLIDE_MASTER:
+                digest.update(_part_fingerprint(package, rel.target))
+    return digest.hexdigest()
+
+def _part_fingerprint(package, part):
+    info = package.member_info(part)
+    if info is not None:
+        return f"{info.file_size}:{info.CRC}".encode("ascii")
+    return hashlib.sha256(package.read(part)).digest()
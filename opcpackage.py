@@ -0,0 +1,441 @@
+import io
+import os
+import re
+import copy
+import shutil
+import struct
+import zipfile
+import datetime
+import posixpath
+from collections import namedtuple
+from lxml import etree
+
+CONTENT_TYPES = "[Content_Types].xml"
+PRESENTATION = "ppt/presentation.xml"
+
+NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "p14": "http://schemas.microsoft.com/office/powerpoint/2010/main",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+    "ct": "http://schemas.openxmlformats.org/package/2006/content-types",
+}
+
+RT_BASE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+RT_SLIDE = RT_BASE + "slide"
+RT_NOTES_SLIDE = RT_BASE + "notesSlide"
+RT_SLIDE_MASTER = RT_BASE + "slideMaster"
+RT_NOTES_MASTER = RT_BASE + "notesMaster"
+
+CT_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.slide+xml"
+CT_NOTES_SLIDE = "application/vnd.openxmlformats-officedocument.presentationml.notesSlide+xml"
+CT_SLIDE_LAYOUT = "application/vnd.openxmlformats-officedocument.presentationml.slideLayout+xml"
+CT_SLIDE_MASTER = "application/vnd.openxmlformats-officedocument.presentationml.slideMaster+xml"
+CT_NOTES_MASTER = "application/vnd.openxmlformats-officedocument.presentationml.notesMaster+xml"
+
+Relationship = namedtuple("Relationship", ["rId", "type", "target", "external"])
+PartFile = namedtuple("PartFile", ["path"])  # content of a part kept in a file until saving
+
+COPY_CHUNK = 1024 * 1024
+
+
+def qn(tag):
+    """
+    Expands a prefixed tag like "p:sldId" to lxml's "{namespace}sldId" form.
+    """
+    prefix, local = tag.split(":")
+    return f"{{{NS[prefix]}}}{local}"
+
+
+def rels_name(part_name):
+    """
+    Returns the name of the relationships part of a package part ("" for the package itself).
+    """
+    folder, base = posixpath.split(part_name)
+    return posixpath.join(folder, "_rels", f"{base}.rels")
+
+
+def resolve_target(source_part, target):
+    """
+    Turns a relationship target relative to source_part into a package part name.
+    """
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_part), target))
+
+
+def relative_target(source_part, target_part):
+    """
+    Returns the relationship target of target_part as seen from source_part.
+    """
+    return posixpath.relpath(target_part, posixpath.dirname(source_part) or ".")
+
+
+def partname_template(part):
+    """
+    Turns "ppt/media/image12.png" into "ppt/media/image%d.png" for picking a free name.
+    """
+    folder, base = posixpath.split(part)
+    stem, extension = posixpath.splitext(base)
+    stem = re.sub(r"\d+$", "", stem).replace("%", "%%")
+    return posixpath.join(folder, f"{stem}%d{extension}")
+
+
+class OpcPackage:
+    """
+    An Open Packaging Conventions file (.pptx, .xlsx, .docx) edited at the part level.
+
+    Parts are read from the ZIP archive only when asked for, and XML parts
+    opened for editing are parsed once and serialized again on save. Saving
+    copies every unchanged member byte-for-byte in its compressed form, so
+    structural edits cost disk throughput rather than re-deflating media.
+
+    Parameters:
+    - source: Path or file-like object of the package
+    """
+
+    def __init__(self, source):
+        self._zip = zipfile.ZipFile(source)
+        self._names = [info.filename for info in self._zip.infolist()]
+        self._data = {}  # part name -> bytes of new or replaced parts
+        self._xml = {}  # part name -> lxml root of parts opened for editing
+        self._refs = {}  # part name -> (other OpcPackage, part name) for parts copied from another package
+        self._removed = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    @property
+    def names(self):
+        """
+        Part names in archive order, followed by parts added since opening.
+        """
+        names = [name for name in self._names if name not in self._removed]
+        added = [name for name in list(self._data) + list(self._xml) + list(self._refs) if name not in self._names]
+        return names + list(dict.fromkeys(added))
+
+    def exists(self, name):
+        return name not in self._removed and (
+            name in self._data or name in self._xml or name in self._refs or name in self._zip.NameToInfo
+        )
+
+    def is_modified(self, name):
+        return name in self._data or name in self._xml or name in self._refs
+
+    def read(self, name):
+        """
+        Returns the bytes of a part, including any edits made so far.
+        """
+        if name in self._removed:
+            raise KeyError(f"There is no item named '{name}' in the archive")
+        if name in self._xml:
+            return etree.tostring(self._xml[name], xml_declaration=True, encoding="UTF-8", standalone=True)
+        if name in self._data:
+            if isinstance(self._data[name], PartFile):
+                with open(self._data[name].path, "rb") as f:
+                    return f.read()
+            return self._data[name]
+        if name in self._refs:
+            other, other_name = self._refs[name]
+            return other.read(other_name)
+        return self._zip.read(name)
+
+    def open(self, name):
+        """
+        Returns a binary file object for reading a part without loading it whole.
+        """
+        if name in self._data and isinstance(self._data[name], PartFile):
+            return open(self._data[name].path, "rb")
+        if self.member_info(name) is not None and name not in self._refs:
+            return self._zip.open(name)
+        return io.BytesIO(self.read(name))
+
+    def member_info(self, name):
+        """
+        Returns the ZipInfo a part is stored under unchanged (here or in the package it
+        is copied from), or None if the part has new content.
+        """
+        if name in self._data or name in self._xml or name in self._removed:
+            return None
+        if name in self._refs:
+            other, other_name = self._refs[name]
+            return other.member_info(other_name)
+        return self._zip.NameToInfo.get(name)
+
+    def xml(self, name):
+        """
+        Returns the parsed root element of an XML part; changes to it are written on save.
+        """
+        if name not in self._xml:
+            self._xml[name] = etree.fromstring(self.read(name))
+            self._data.pop(name, None)
+            self._refs.pop(name, None)
+        return self._xml[name]
+
+    def parse(self, name):
+        """
+        Returns a parsed copy of an XML part for reading; unlike xml(), the part
+        stays unmodified and is still copied raw on save.
+        """
+        if name in self._xml:
+            return self._xml[name]
+        return etree.fromstring(self.read(name))
+
+    def write(self, name, data):
+        """
+        Adds a part or replaces its content with bytes.
+        """
+        self._xml.pop(name, None)
+        self._refs.pop(name, None)
+        self._data[name] = data
+        self._removed.discard(name)
+
+    def write_file(self, name, path):
+        """
+        Adds a part or replaces its content with the content of a file, which is
+        streamed into the package on save rather than held in memory. The file
+        must stay in place until then.
+        """
+        self.write(name, PartFile(path))
+
+    def add_part_from(self, other, name, new_name, content_type):
+        """
+        Adds a part of another package under new_name without reading it; if it is
+        unchanged when saving, its compressed bytes are copied straight across.
+        """
+        self._xml.pop(new_name, None)
+        self._data.pop(new_name, None)
+        self._refs[new_name] = (other, name)
+        self._removed.discard(new_name)
+        if self.content_type(new_name) != content_type:
+            self.set_content_type(new_name, content_type)
+
+    def remove(self, name):
+        """
+        Removes a part together with its relationships part and content type override.
+        """
+        for part in (name, rels_name(name)):
+            self._xml.pop(part, None)
+            self._data.pop(part, None)
+            self._refs.pop(part, None)
+            if part in self._zip.NameToInfo:
+                self._removed.add(part)
+        for override in self.xml(CONTENT_TYPES).findall("ct:Override", NS):
+            if override.get("PartName") == f"/{name}":
+                override.getparent().remove(override)
+
+    def next_partname(self, template):
+        """
+        Returns the first free part name for a template like "ppt/slides/slide%d.xml".
+        """
+        number = 1
+        while self.exists(template % number):
+            number += 1
+        return template % number
+
+    def relationships(self, part_name):
+        """
+        Returns the relationships of a part, with internal targets resolved to part names.
+        """
+        name = rels_name(part_name)
+        if not self.exists(name):
+            return []
+        relationships = []
+        for rel in self.xml(name) if name in self._xml else etree.fromstring(self.read(name)):
+            external = rel.get("TargetMode") == "External"
+            target = rel.get("Target", "")
+            relationships.append(Relationship(rel.get("Id"), rel.get("Type"), target if external else resolve_target(part_name, target), external))
+        return relationships
+
+    def related(self, part_name, rId):
+        """
+        Returns the part name a part's relationship points to.
+        """
+        for rel in self.relationships(part_name):
+            if rel.rId == rId:
+                return rel.target
+        raise KeyError(f"{part_name} has no relationship '{rId}'")
+
+    def rels_xml(self, part_name):
+        """
+        Returns the editable Relationships element of a part, creating an empty one if needed.
+        """
+        name = rels_name(part_name)
+        if not self.exists(name):
+            self._xml[name] = etree.Element(f"{{{NS['rel']}}}Relationships", nsmap={None: NS["rel"]})
+            self._removed.discard(name)
+        return self.xml(name)
+
+    def add_relationship(self, part_name, rel_type, target_part):
+        """
+        Adds an internal relationship from part_name to target_part and returns its rId.
+        """
+        rels = self.rels_xml(part_name)
+        used = {rel.get("Id") for rel in rels}
+        number = len(used) + 1
+        while f"rId{number}" in used:
+            number += 1
+        rel = etree.SubElement(rels, f"{{{NS['rel']}}}Relationship")
+        rel.set("Id", f"rId{number}")
+        rel.set("Type", rel_type)
+        rel.set("Target", relative_target(part_name, target_part))
+        return f"rId{number}"
+
+    def drop_relationship(self, part_name, rId):
+        rels = self.rels_xml(part_name)
+        for rel in rels:
+            if rel.get("Id") == rId:
+                rels.remove(rel)
+
+    def content_type(self, name):
+        """
+        Returns the content type of a part from its override or its extension default.
+        """
+        types = self.xml(CONTENT_TYPES)
+        for override in types.findall("ct:Override", NS):
+            if override.get("PartName") == f"/{name}":
+                return override.get("ContentType")
+        extension = posixpath.splitext(name)[1][1:].lower()
+        for default in types.findall("ct:Default", NS):
+            if default.get("Extension", "").lower() == extension:
+                return default.get("ContentType")
+        return None
+
+    def set_content_type(self, name, content_type):
+        """
+        Registers a content type override for a part.
+        """
+        types = self.xml(CONTENT_TYPES)
+        for override in types.findall("ct:Override", NS):
+            if override.get("PartName") == f"/{name}":
+                override.set("ContentType", content_type)
+                return
+        override = etree.SubElement(types, f"{{{NS['ct']}}}Override")
+        override.set("PartName", f"/{name}")
+        override.set("ContentType", content_type)
+
+    def copy_part(self, name, new_name, content_type):
+        """
+        Copies a part and its relationships under a new name; targets are re-based to the new location.
+        """
+        self.write(new_name, self.read(name))
+        self.set_content_type(new_name, content_type)
+        if self.exists(rels_name(name)):
+            rels = copy.deepcopy(self.xml(rels_name(name)))
+            for rel in rels:
+                if rel.get("TargetMode") != "External":
+                    rel.set("Target", relative_target(new_name, resolve_target(name, rel.get("Target"))))
+            self._xml[rels_name(new_name)] = rels
+            self._removed.discard(rels_name(new_name))
+
+    def prune(self):
+        """
+        Removes parts no longer reachable through relationships from the package root.
+
+        Returns:
+        - List of removed part names
+        """
+        reachable = set()
+        pending = [""]
+        while pending:
+            part = pending.pop()
+            for rel in self.relationships(part):
+                if not rel.external and rel.target not in reachable and self.exists(rel.target):
+                    reachable.add(rel.target)
+                    pending.append(rel.target)
+        removed = []
+        for name in self.names:
+            if name == CONTENT_TYPES or name.endswith(".rels") or name.endswith("/") or name in reachable:
+                continue
+            self.remove(name)
+            removed.append(name)
+        # Relationship parts whose source part is gone
+        for name in self.names:
+            match = re.match(r"^(.*?)_rels/(.+)\.rels$", name)
+            if match and match.group(2) and not self.exists(match.group(1) + match.group(2)):
+                self.remove(name)
+        return removed
+
+    def save(self, output_path):
+        """
+        Writes the package with all edits to output_path.
+
+        Only new and modified parts are compressed; all other members are
+        streamed over with their original compressed data and CRC.
+        """
+        now = datetime.datetime.now().timetuple()[:6]
+        with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as out:
+            for name in self.names:
+                original = self._zip.NameToInfo.get(name)
+                if original is not None and not self.is_modified(name):
+                    copy_member_raw(self._zip, original, out)
+                    continue
+                if name in self._refs:
+                    other, other_name = self._refs[name]
+                    if other.member_info(other_name) is not None and other_name not in other._refs:
+                        copy_member_raw(other._zip, other.member_info(other_name), out, name)
+                        continue
+                info = zipfile.ZipInfo(name, original.date_time if original is not None else now)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = original.external_attr if original is not None else 0o600 << 16
+                data = self._data.get(name)
+                if isinstance(data, PartFile):
+                    with open(data.path, "rb") as src, out.open(info, "w", force_zip64=os.path.getsize(data.path) > zipfile.ZIP64_LIMIT) as dst:
+                        shutil.copyfileobj(src, dst, COPY_CHUNK)
+                else:
+                    out.writestr(info, self.read(name))
+        return output_path
+
+
+def copy_member_raw(source, info, out, arcname=None):
+    """
+    Appends a member of one open ZipFile to another without decompressing it.
+
+    The local header is written afresh (with the CRC and sizes in it, so no
+    data descriptor is needed) and the stored compressed bytes are copied in
+    chunks exactly as they are.
+
+    Parameters:
+    - source: ZipFile opened for reading
+    - info: ZipInfo of the member in source
+    - out: ZipFile opened for writing
+    - arcname: Name to store the member under (defaults to its current name)
+    """
+    if info.flag_bits & 0x01:
+        raise zipfile.BadZipFile(f"Cannot copy encrypted member {info.filename}")
+    fp = source.fp
+    fp.seek(info.header_offset)
+    header = fp.read(zipfile.sizeFileHeader)
+    if header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad local header for {info.filename}")
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+
+    member = copy.copy(info)
+    member.flag_bits &= ~0x08
+    if arcname is not None:
+        member.filename = member.orig_filename = arcname
+    # FileHeader adds its own zip64 extra when the sizes need it
+    member.extra = zipfile._strip_extra(info.extra, (1,))
+    zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    member.header_offset = out.fp.tell()
+    out.fp.write(member.FileHeader(zip64))
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = fp.read(min(COPY_CHUNK, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated data for {info.filename}")
+        out.fp.write(chunk)
+        remaining -= len(chunk)
+
+    out.filelist.append(member)
+    out.NameToInfo[member.filename] = member
+    out.start_dir = out.fp.tell()
@@ -0,0 +1,294 @@
+import io
+import os
+import hashlib
+import logging
+import posixpath
+import tempfile
+from collections import defaultdict
+from lxml import etree
+from PIL import Image
+from opcpackage import NS, PRESENTATION, OpcPackage, qn, relative_target
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DPI = 150
+DEFAULT_JPEG_QUALITY = 85
+EMU_PER_INCH = 914400
+
+# Raster formats that can be resized and re-encoded; vector and animated media are left alone
+RASTER_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".tif", ".tiff"}
+CONTENT_TYPES = {"png": "image/png", "jpeg": "image/jpeg"}
+
+# Images are only resized when they are at least this much larger than needed
+RESIZE_MARGIN = 1.1
+# Images with more distinct colours than this are treated as photographs and may become JPEG
+PHOTO_COLORS = 4096
+
+def process(ppt_file, target_dpi=DEFAULT_DPI, jpeg_quality=DEFAULT_JPEG_QUALITY):
+    """
+    Shrinks the media of a PowerPoint file.
+
+    Parameters:
+        ppt_file (BytesIO): Uploaded PowerPoint file.
+        target_dpi (int): Resolution images are downsampled to at their displayed size.
+        jpeg_quality (int): JPEG quality used for photographic images.
+
+    Returns:
+        tuple: Path to the optimized PowerPoint file and the report of optimize(), or str: error message.
+    """
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as temp_ppt:
+            temp_ppt.write(ppt_file.read())
+            temp_ppt_path = temp_ppt.name
+
+        optimized_path = temp_ppt_path.replace(".pptx", "_optimized.pptx")
+        report = optimize(temp_ppt_path, optimized_path, target_dpi, jpeg_quality)
+        logger.info("Optimized deck: %s", format_report(report))
+        return optimized_path, report
+
+    except Exception as e:
+        error_msg = f"Error: {str(e)}"
+        print(error_msg)
+        return error_msg
+
+def format_report(report):
+    """
+    Describes a report of optimize() in one line for the user.
+    """
+    saved = report["saved_bytes"] / report["original_bytes"] if report["original_bytes"] else 0
+    return (
+        f"{_size(report['original_bytes'])} -> {_size(report['optimized_bytes'])} ({saved:.0%} saved); "
+        f"{report['images_resized']} images resized, {report['images_reencoded']} re-encoded, "
+        f"{report['duplicates_removed']} duplicates and {report['orphans_removed']} orphaned parts removed"
+    )
+
+def _size(size):
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.0f} KB"
+
+def optimize(pptx_path, output_path, target_dpi=DEFAULT_DPI, jpeg_quality=DEFAULT_JPEG_QUALITY):
+    """
+    Writes an optimized copy of a deck and reports what changed.
+
+    The pass drops parts no longer reachable from the package root, merges
+    media parts with identical content, downsamples raster images to their
+    largest displayed size at target_dpi, and re-encodes them as optimized
+    PNG, lossless palette PNG or (for photographs without transparency) JPEG,
+    whichever is smallest. Images whose displayed size cannot be determined
+    (placeholders, groups, chart fills) are re-encoded but not resized.
+
+    Returns:
+    - dict with original_bytes, optimized_bytes, saved_bytes, orphans_removed,
+      duplicates_removed, images_resized and images_reencoded
+    """
+    report = {"orphans_removed": 0, "duplicates_removed": 0, "images_resized": 0, "images_reencoded": 0}
+    with OpcPackage(pptx_path) as package:
+        report["orphans_removed"] = len(package.prune())
+        references = _media_references(package)
+        report["duplicates_removed"] = _merge_duplicates(package, references)
+
+        slide_size = package.xml(PRESENTATION).find("p:sldSz", NS)
+        slide_size = (int(slide_size.get("cx")), int(slide_size.get("cy"))) if slide_size is not None else None
+        extents = _display_extents(package, references, slide_size)
+
+        for media in sorted(references):
+            if posixpath.splitext(media)[1].lower() not in RASTER_EXTENSIONS:
+                continue
+            resized, reencoded = _optimize_image(package, media, references[media], extents.get(media), target_dpi, jpeg_quality)
+            report["images_resized"] += resized
+            report["images_reencoded"] += reencoded
+
+        package.save(output_path)
+
+    report["original_bytes"] = os.path.getsize(pptx_path)
+    report["optimized_bytes"] = os.path.getsize(output_path)
+    report["saved_bytes"] = report["original_bytes"] - report["optimized_bytes"]
+    return report
+
+def _media_references(package):
+    """
+    Maps every media part to the (part, rId) relationships that point at it.
+    """
+    references = defaultdict(list)
+    for name in package.names:
+        if name.endswith(".rels") or name.endswith("/"):
+            continue
+        for rel in package.relationships(name):
+            if not rel.external and rel.target.startswith("ppt/media/") and package.exists(rel.target):
+                references[rel.target].append((name, rel.rId))
+    return references
+
+def _merge_duplicates(package, references):
+    """
+    Points every reference to a media part at the first part with the same content and removes the copies.
+    """
+    by_size = defaultdict(list)
+    for media in sorted(references):
+        info = package.member_info(media)
+        by_size[info.file_size if info is not None else len(package.read(media))].append(media)
+
+    removed = 0
+    for candidates in by_size.values():
+        if len(candidates) < 2:
+            continue
+        canonical = {}
+        for media in candidates:
+            digest = hashlib.sha256(package.read(media)).digest()
+            if digest not in canonical:
+                canonical[digest] = media
+                continue
+            keep = canonical[digest]
+            for part, rId in references.pop(media):
+                _retarget(package, part, rId, keep)
+                references[keep].append((part, rId))
+            package.remove(media)
+            removed += 1
+    return removed
+
+def _display_extents(package, references, slide_size):
+    """
+    Returns the largest area (cx, cy in EMU, crop included) each media part is
+    shown at, or None for a part with any reference of unknown size.
+    """
+    extents = {}
+    by_part = defaultdict(dict)
+    for media, refs in references.items():
+        for part, rId in refs:
+            by_part[part][rId] = media
+
+    for part, media_by_rId in by_part.items():
+        if not part.endswith(".xml"):
+            continue
+        found = defaultdict(list)
+        for blip in etree.fromstring(package.read(part)).iter(qn("a:blip")):
+            rId = blip.get(qn("r:embed"))
+            if rId in media_by_rId:
+                found[rId].append(_blip_extent(blip, slide_size))
+        for rId, media in media_by_rId.items():
+            # References we could not size (or not find) keep the image at full resolution
+            for extent in found.get(rId) or [None]:
+                if extent is None or extents.get(media, (0, 0)) is None:
+                    extents[media] = None
+                else:
+                    current = extents.get(media, (0, 0))
+                    extents[media] = (max(current[0], extent[0]), max(current[1], extent[1]))
+    return extents
+
+def _blip_extent(blip, slide_size):
+    """
+    Returns the size (cx, cy in EMU) the full image behind a blip is drawn at, or None if unknown.
+    """
+    blip_fill = blip.getparent()
+    container = blip_fill.getparent()
+    for ancestor in blip.iterancestors():
+        if ancestor.tag == qn("p:grpSp"):
+            return None  # group scaling is not followed
+    if container.tag == qn("p:bgPr"):
+        extent = slide_size
+    elif container.tag in (qn("p:pic"), qn("p:sp")):
+        ext = container.find("p:spPr/a:xfrm/a:ext", NS)
+        extent = (int(ext.get("cx")), int(ext.get("cy"))) if ext is not None else None
+    elif container.tag == qn("p:spPr"):
+        ext = container.find("a:xfrm/a:ext", NS)
+        extent = (int(ext.get("cx")), int(ext.get("cy"))) if ext is not None else None
+    else:
+        extent = None
+    if extent is None:
+        return None
+
+    # A cropped picture shows only part of the image, so the whole image is drawn larger
+    crop = blip_fill.find("a:srcRect", NS)
+    if crop is not None:
+        visible_x = 1 - (int(crop.get("l", 0)) + int(crop.get("r", 0))) / 100000
+        visible_y = 1 - (int(crop.get("t", 0)) + int(crop.get("b", 0))) / 100000
+        if visible_x <= 0 or visible_y <= 0:
+            return None
+        extent = (extent[0] / visible_x, extent[1] / visible_y)
+    return extent
+
+def _optimize_image(package, media, refs, extent, target_dpi, jpeg_quality):
+    """
+    Resizes and re-encodes one image part if that makes it smaller. Returns (resized, reencoded) flags.
+    """
+    original = package.read(media)
+    try:
+        image = Image.open(io.BytesIO(original))
+        if getattr(image, "n_frames", 1) > 1:
+            return False, False  # animated
+        image.load()
+    except Exception:
+        return False, False
+
+    resized = False
+    if extent is not None:
+        needed = (
+            max(1, round(extent[0] / EMU_PER_INCH * target_dpi)),
+            max(1, round(extent[1] / EMU_PER_INCH * target_dpi)),
+        )
+        if image.width > needed[0] * RESIZE_MARGIN and image.height > needed[1] * RESIZE_MARGIN:
+            scale = max(needed[0] / image.width, needed[1] / image.height)
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+            resized = True
+
+    try:
+        candidates = _encode(image, jpeg_quality)
+    except Exception:
+        return False, False  # keep images Pillow cannot re-encode as they are
+    extension = posixpath.splitext(media)[1].lower()
+    if not resized:
+        # First in the list, so the original wins ties
+        candidates.insert(0, ("jpeg" if extension in (".jpg", ".jpeg") else extension[1:], original))
+    image_format, data = min(candidates, key=lambda candidate: len(candidate[1]))
+    if data is original:
+        return False, False
+
+    new_extension = {"png": ".png", "jpeg": ".jpeg"}[image_format]
+    if extension == new_extension or (image_format == "jpeg" and extension == ".jpg"):
+        package.write(media, data)
+        return resized, not resized
+    # A new format needs a new part name, so move the references over
+    stem = posixpath.splitext(media)[0]
+    new_media = stem + new_extension if not package.exists(stem + new_extension) else package.next_partname(f"{stem}_%d{new_extension}")
+    package.write(new_media, data)
+    if package.content_type(new_media) != CONTENT_TYPES[image_format]:
+        package.set_content_type(new_media, CONTENT_TYPES[image_format])
+    for part, rId in refs:
+        _retarget(package, part, rId, new_media)
+    package.remove(media)
+    return resized, True
+
+def _encode(image, jpeg_quality):
+    """
+    Returns (format, bytes) encodings of an image: optimized PNG, palette PNG
+    when that is lossless, and JPEG for opaque photographs.
+    """
+    if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+        # CMYK, YCbCr, 16-bit and other modes are encoded as RGB(A)
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode.endswith("A") else "RGB")
+    candidates = []
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+    candidates.append(("png", buffer.getvalue()))
+
+    rgb = image.convert("RGBA") if image.mode in ("RGBA", "LA", "P", "PA") else image.convert("RGB")
+    colors = rgb.getcolors(PHOTO_COLORS)
+    if colors is not None and len(colors) <= 256 and image.mode != "P":
+        method = Image.Quantize.FASTOCTREE if rgb.mode == "RGBA" else Image.Quantize.MEDIANCUT
+        palette = rgb.quantize(colors=len(colors), method=method)
+        if palette.convert(rgb.mode).tobytes() == rgb.tobytes():
+            buffer = io.BytesIO()
+            palette.save(buffer, format="PNG", optimize=True)
+            candidates.append(("png", buffer.getvalue()))
+
+    opaque = rgb.mode == "RGB" or rgb.getchannel("A").getextrema() == (255, 255)
+    if colors is None and opaque:
+        buffer = io.BytesIO()
+        rgb.convert("RGB").save(buffer, format="JPEG", quality=jpeg_quality, optimize=True)
+        candidates.append(("jpeg", buffer.getvalue()))
+    return candidates
+
+def _retarget(package, part, rId, target_part):
+    for rel in package.rels_xml(part):
+        if rel.get("Id") == rId:
+            rel.set("Target", relative_target(part, target_part))
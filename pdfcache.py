@@ -0,0 +1,241 @@
+import os
+import re
+import json
+import shutil
+import posixpath
+import zipfile
+import hashlib
+import logging
+import tempfile
+import threading
+import xml.etree.ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.environ.get("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "automation_hub_pdf_cache"))
+MAX_BYTES = int(float(os.environ.get("PDF_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+# Package members whose volatile fields change on every save without changing the rendered deck
+VOLATILE_FIELDS = {
+    "docProps/core.xml": re.compile(rb"<(cp:lastModifiedBy|dcterms:modified|cp:revision|cp:lastPrinted)\b[^>]*>.*?</\1>", re.S),
+    "docProps/app.xml": re.compile(rb"<(TotalTime)\b[^>]*>.*?</\1>", re.S),
+}
+
+# Relationships that do not change how a slide renders (notes, comments, links to other slides)
+IGNORED_RELATIONSHIPS = {"notesSlide", "slide", "comments", "commentAuthors"}
+
+
+def deck_key(source, options=None):
+    """
+    Returns the SHA-256 cache key of a .pptx and its conversion options.
+
+    The package is normalized first: members are hashed by name in sorted order
+    from their uncompressed content, so ZIP timestamps, member order and
+    compression level do not matter, and save-time metadata (last modified
+    date and author, revision, editing time) is ignored.
+    """
+    digest = hashlib.sha256()
+    with zipfile.ZipFile(source) as package:
+        for name in sorted(package.namelist()):
+            data = package.read(name)
+            if name in VOLATILE_FIELDS:
+                data = VOLATILE_FIELDS[name].sub(b"", data)
+            digest.update(name.encode("utf-8") + b"\0" + str(len(data)).encode("ascii") + b"\0")
+            digest.update(data)
+    digest.update(json.dumps(options or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def slide_keys(source, options=None):
+    """
+    Returns one cache key per slide of a .pptx in deck order, or None for hidden slides.
+
+    A slide's key covers its own XML and, through its relationships, every
+    part it draws on (layout, master, theme, pictures, charts, embedded
+    objects), plus the slide size and the conversion options. Part names are
+    left out, so a slide keeps its key when slides are added or moved around
+    it. Slides showing a slide number also include their position.
+    """
+    with zipfile.ZipFile(source) as package:
+        names = set(package.namelist())
+        part_keys = {}
+
+        def part_key(name, stack=()):
+            if name in part_keys:
+                return part_keys[name]
+            digest = hashlib.sha256(package.read(name))
+            for rId, rel_type, target in _relationships(package, names, name):
+                kind = rel_type.rsplit("/", 1)[-1]
+                # Masters list their layouts; following them back would tie every slide to every layout
+                if kind in IGNORED_RELATIONSHIPS or (kind == "slideLayout" and name.startswith("ppt/slideMasters/")):
+                    continue
+                digest.update(f"{rId}\0{kind}\0".encode("utf-8"))
+                digest.update(b"cycle" if target in stack else part_key(target, stack + (name,)).encode("ascii"))
+            part_keys[name] = digest.hexdigest()
+            return part_keys[name]
+
+        presentation = package.read("ppt/presentation.xml")
+        slide_size = re.search(rb"<p:sldSz\b[^>]*>", presentation)
+        first_number = re.search(rb'\bfirstSlideNum="(\d+)"', presentation)
+        first_number = int(first_number.group(1)) if first_number else 1
+        slide_targets = {rId: target for rId, _, target in _relationships(package, names, "ppt/presentation.xml")}
+        common = json.dumps(options or {}, sort_keys=True).encode("utf-8") + (slide_size.group(0) if slide_size else b"")
+
+        keys = []
+        for position, rId in enumerate(re.findall(rb'<p:sldId\b[^>]*\br:id="([^"]+)"', presentation)):
+            name = slide_targets[rId.decode("utf-8")]
+            xml = package.read(name)
+            if re.search(rb'<p:sld\b[^>]*\bshow="(0|false)"', xml):
+                keys.append(None)
+                continue
+            digest = hashlib.sha256(common)
+            digest.update(part_key(name).encode("ascii"))
+            if b'type="slidenum"' in xml:
+                digest.update(f"\0slide {first_number + position}".encode("utf-8"))
+            keys.append(digest.hexdigest())
+        return keys
+
+
+def _relationships(package, names, part_name):
+    """
+    Returns (rId, type, target part name) for the internal relationships of a package part.
+    """
+    folder, base = posixpath.split(part_name)
+    rels_name = posixpath.join(folder, "_rels", f"{base}.rels")
+    if rels_name not in names:
+        return []
+    relationships = []
+    for rel in ET.fromstring(package.read(rels_name)):
+        if rel.get("TargetMode") == "External":
+            continue
+        target = rel.get("Target", "")
+        target = target[1:] if target.startswith("/") else posixpath.normpath(posixpath.join(folder, target))
+        if target in names:
+            relationships.append((rel.get("Id"), rel.get("Type", ""), target))
+    return relationships
+
+
+class ConversionCache:
+    """
+    On-disk cache of converted files keyed by deck_key, with size-based LRU eviction.
+
+    Parameters:
+    - directory: Cache directory
+    - max_bytes: Total size above which the least recently used entries are evicted
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, suffix=".pdf"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}{self.suffix}")
+
+    def get(self, key):
+        """
+        Returns a private copy of the cached file for key, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            os.utime(path)  # mark as recently used
+            copy = _private_copy(path, self.suffix)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return copy
+
+    def put(self, key, file_path):
+        """
+        Stores a converted file under key and evicts old entries if the cache is over size.
+        """
+        fd, temp_path = tempfile.mkstemp(suffix=self.suffix, dir=self.directory)
+        os.close(fd)
+        shutil.copyfile(file_path, temp_path)
+        os.replace(temp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """
+        Removes least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                logger.info(f"Evicted {os.path.basename(path)} from conversion cache")
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        """
+        Returns hit/miss counters of this process and the current size of the cache.
+        """
+        entries = self._entries()
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and entry.name.endswith(self.suffix) and not entry.name.startswith("tmp"):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+def _private_copy(path, suffix):
+    """
+    Hard-links (or copies) a cache entry to a new temporary path so eviction cannot remove it under the caller.
+    """
+    fd, copy_path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    os.remove(copy_path)
+    try:
+        os.link(path, copy_path)
+    except OSError:
+        shutil.copyfile(path, copy_path)
+    return copy_path
+
+
+_cache = None
+_page_cache = None
+
+
+def get_cache():
+    """
+    Returns the process-wide PDF conversion cache (PDF_CACHE_DIR, PDF_CACHE_MAX_MB).
+    """
+    global _cache
+    if _cache is None:
+        _cache = ConversionCache()
+    return _cache
+
+
+def get_page_cache():
+    """
+    Returns the process-wide cache of single-slide PDF pages keyed by slide_keys.
+    """
+    global _page_cache
+    if _page_cache is None:
+        _page_cache = ConversionCache(os.path.join(CACHE_DIR, "pages"))
+    return _page_cache
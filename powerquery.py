@@ -1,67 +1,82 @@
-import xlwings as xw
-import pandas as pd
-from time import sleep
+import os
+import shutil
 import logging
+import tempfile
+from sheettransfer import transfer_sheets
+from querypipeline import load_pipeline, run_pipeline
 
-def process(template_file):
+TARGET_SHEETS = ['Total Summary', 'MVOI']
+
+def process(source_file, stripped_data, setup_file, pipeline_file=None):
     """
-    Automates Power Query operations in Excel.
-    Streamlit-compatible version using uploaded file-like objects.
+    Automates Power Query operations.
+
+    Copies the target sheets of the latest source file into the stripped data
+    file, then refreshes the setup file. When a pipeline is defined (a
+    pipeline_file, or a "Pipeline" sheet in the setup file; see
+    querypipeline.load_pipeline) its queries are run in-process with pandas
+    and their results written into the setup file's target sheets, so no
+    Excel installation is needed. Otherwise Excel refreshes the setup file's
+    own queries and the call returns once they have finished.
 
     Args:
-        template_file (BytesIO): The uploaded Excel template file.
+        source_file (str): Path to the latest source file.
+        stripped_data (str): Path to the stripped data file, updated in place.
+        setup_file (str): Path to the Power Query setup file.
+        pipeline_file (str): Optional path to a JSON/YAML pipeline definition.
 
     Returns:
-        str: Success message or error details.
+        bytes: The refreshed setup file, or str: error details.
     """
     try:
-        logging.info("Opening template file...")
-
-        # Open template file in-memory
-        with open("temp_template.xlsx", "wb") as f:
-            f.write(template_file.getvalue())
-
-        temp_book = xw.Book("temp_template.xlsx")
-        temp_sheet = temp_book.sheets['PW Query']
-
-        # Read the sheet's used range
-        data_feed = temp_sheet.used_range.value
-        temp_book.close()
-
-        # Convert to DataFrame
-        input_df = pd.DataFrame(data_feed)
-        input_df = input_df.set_axis(input_df.iloc[1], axis=1).iloc[2:]
-
-        # Extract required file paths
-        main_file_loc = input_df['Latest Source File'][0]
-        stripped_data_loc = input_df['Stripped Data'][0]
-        setup_pq_loc = input_df['Setup File'][0]
-
-        target_sheets = ['Total Summary', 'MVOI']
-
-        # Open main and stripped data files
-        main_file = xw.Book(main_file_loc)
-        stripped_data = xw.Book(stripped_data_loc)
+        logging.info("Copying target sheets into stripped data...")
+        row_counts = transfer_sheets(source_file, stripped_data, TARGET_SHEETS)
+        logging.info(f"Rows copied: {row_counts}")
 
-        for sheet in target_sheets:
-            curr_sheet = main_file.sheets[sheet]
-            dest_sheet = stripped_data.sheets[sheet]
-            dest_sheet.range("A1").value = curr_sheet.used_range.value
+        queries = load_pipeline(pipeline_file if pipeline_file else setup_file)
+        output_path = os.path.join(tempfile.mkdtemp(), os.path.basename(setup_file))
+        if queries is not None:
+            logging.info(f"Running {len(queries)} pipeline queries...")
+            row_counts = run_pipeline(
+                queries,
+                {"source": source_file, "stripped": stripped_data, "setup": setup_file},
+                setup_file,
+                output_path,
+            )
+            logging.info(f"Pipeline finished: {row_counts}")
+        else:
+            shutil.copyfile(setup_file, output_path)
+            refresh_in_excel(output_path)
 
-        # Save and close files
-        main_file.close()
-        stripped_data.save(stripped_data_loc)
-        stripped_data.close()
-
-        # Open Setup File and Refresh Queries
-        setup_pq = xw.Book(setup_pq_loc)
-        setup_pq.api.RefreshAll()
-        sleep(30)  # Allow time for refresh
-        setup_pq.save(setup_pq_loc)
-        setup_pq.close()
-
-        return "Power Query automation completed successfully!"
+        with open(output_path, "rb") as f:
+            return f.read()
 
     except Exception as e:
         logging.error(f"Error in Power Query automation: {str(e)}")
         return f"Error: {str(e)}"
+
+def refresh_in_excel(setup_path):
+    """
+    Refreshes every query of a workbook in Excel and saves it once the refresh has finished.
+
+    Background refresh is switched off so RefreshAll blocks until each
+    connection is done; CalculateUntilAsyncQueriesDone then waits for any
+    query that still runs asynchronously (e.g. data model refreshes).
+    """
+    import xlwings as xw  # Excel is only needed for setup files without a pipeline
+
+    app = xw.App(visible=False)
+    try:
+        book = app.books.open(setup_path)
+        for connection in book.api.Connections:
+            for attribute in ("OLEDBConnection", "ODBCConnection"):
+                try:
+                    getattr(connection, attribute).BackgroundQuery = False
+                except Exception:
+                    pass  # connection is of another type
+        book.api.RefreshAll()
+        app.api.CalculateUntilAsyncQueriesDone()
+        book.save(setup_path)
+        book.close()
+    finally:
+        app.quit()
@@ -0,0 +1,104 @@
+import os
+import zipfile
+import threading
+from lxml import etree
+from opcpackage import NS, PRESENTATION, rels_name, resolve_target
+
+TITLE_XPATH = etree.XPath(
+    ".//p:sp[p:nvSpPr/p:nvPr/p:ph[@type='title' or @type='ctrTitle']]//a:p",
+    namespaces=NS,
+)
+TEXT_XPATH = etree.XPath(".//a:t/text()", namespaces=NS)
+
+# Folders whose parts count towards a slide's media size
+MEDIA_FOLDERS = ("ppt/media/", "ppt/embeddings/")
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def inspect_deck(source):
+    """
+    Summarizes a .pptx straight from its ZIP: slide count, slide size and, per
+    slide, the title, layout name, hidden flag and size of the media it uses.
+
+    Only presentation.xml, relationship parts, slide XML and layout XML are
+    read; media sizes come from the ZIP directory, so no media is loaded.
+    Results for a path are cached until the file changes.
+
+    Parameters:
+    - source: Path or file-like object of the deck
+
+    Returns:
+    - dict with slide_count, slide_width, slide_height (EMU), media_bytes and
+      slides: a list of dicts with number, title, layout, hidden and media_bytes
+    """
+    key = None
+    if isinstance(source, str):
+        stat = os.stat(source)
+        key = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+        with _cache_lock:
+            if key in _cache:
+                return _cache[key]
+
+    with zipfile.ZipFile(source) as package:
+        infos = package.NameToInfo
+
+        def relationships(part):
+            name = rels_name(part)
+            if name not in infos:
+                return {}
+            return {
+                rel.get("Id"): (rel.get("Type", ""), resolve_target(part, rel.get("Target", "")))
+                for rel in etree.fromstring(package.read(name))
+                if rel.get("TargetMode") != "External"
+            }
+
+        presentation = etree.fromstring(package.read(PRESENTATION))
+        presentation_rels = relationships(PRESENTATION)
+        slide_size = presentation.find("p:sldSz", NS)
+        layout_names = {}
+        slides = []
+        for number, sldId in enumerate(presentation.findall("p:sldIdLst/p:sldId", NS), start=1):
+            part = presentation_rels[sldId.get(f"{{{NS['r']}}}id")][1]
+            slide = etree.fromstring(package.read(part))
+            slide_rels = relationships(part).values()
+
+            layout = next((target for rel_type, target in slide_rels if rel_type.endswith("/slideLayout")), None)
+            if layout not in layout_names:
+                layout_names[layout] = _layout_name(package, layout) if layout in infos else ""
+
+            media = {target for _, target in slide_rels if target.startswith(MEDIA_FOLDERS) and target in infos}
+            slides.append({
+                "number": number,
+                "title": slide_title(slide),
+                "layout": layout_names[layout],
+                "hidden": slide.get("show") in ("0", "false"),
+                "media_bytes": sum(infos[target].file_size for target in media),
+            })
+
+    summary = {
+        "slide_count": len(slides),
+        "slide_width": int(slide_size.get("cx")) if slide_size is not None else None,
+        "slide_height": int(slide_size.get("cy")) if slide_size is not None else None,
+        "media_bytes": sum(info.file_size for name, info in infos.items() if name.startswith(MEDIA_FOLDERS)),
+        "slides": slides,
+    }
+    if key is not None:
+        with _cache_lock:
+            _cache[key] = summary
+    return summary
+
+
+def slide_title(slide):
+    """
+    Returns the text of a slide's title placeholder ("" if it has none), paragraphs joined by spaces.
+    """
+    paragraphs = ["".join(TEXT_XPATH(paragraph)).strip() for paragraph in TITLE_XPATH(slide)]
+    return " ".join(paragraph for paragraph in paragraphs if paragraph)
+
+
+def _layout_name(package, layout):
+    c_sld = etree.fromstring(package.read(layout)).find("p:cSld", NS)
+    return c_sld.get("name", "") if c_sld is not None else ""
+
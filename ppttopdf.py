@@ -1,19 +1,250 @@
-import win32com.client
-import pythoncom  # This import is crucial
 import tempfile
 import os
+import re
+import sys
+import math
+import logging
+import zipfile
+from converterpool import ConversionError, find_soffice, get_pool
+from pdfcache import deck_key, get_cache, get_page_cache, slide_keys
+from opcpackage import NS, PRESENTATION, OpcPackage, qn
+from updateppt_ppt2ppt import apply_order
 
-def process(ppt_file):
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # stitching chunked conversions needs pypdf
+    PdfWriter = None
+
+logger = logging.getLogger(__name__)
+
+# Decks are only split when every chunk gets at least this many slides
+CHUNK_MIN_SLIDES = int(os.environ.get("PDF_CHUNK_SLIDES", "50"))
+
+def process(ppt_file, incremental=False):
+    """
+    Converts a PowerPoint file to PDF.
+
+    Conversions go through the shared pool of headless LibreOffice workers
+    (see converterpool). On Windows machines without LibreOffice, PowerPoint
+    is driven through COM instead. Results are cached by the content of the
+    deck (see pdfcache), so converting an unchanged deck again is immediate.
+    Large decks are split into slide ranges that convert in parallel on
+    separate workers and are stitched back together.
+
+    In incremental mode every slide's page is also cached on its own, keyed by
+    the slide and everything it draws on (see pdfcache.slide_keys); only
+    slides that changed since an earlier conversion are rendered, and the
+    unchanged pages are reused.
+
+    Parameters:
+        ppt_file (BytesIO): Uploaded PowerPoint file.
+        incremental (bool): Reuse the pages of unchanged slides from earlier conversions.
+
+    Returns:
+        str: Path to the PDF file or error message.
+    """
     try:
-        # Initialize COM
-        pythoncom.CoInitialize()
-        
         # Save uploaded PPT as a temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as temp_ppt:
             temp_ppt.write(ppt_file.read())
             temp_ppt_path = temp_ppt.name
             print(f"Temporary PPT saved at: {temp_ppt_path}")  # Debugging line
 
+        use_powerpoint = find_soffice() is None and sys.platform == "win32"
+        cache = get_cache()
+        options = {"format": "pdf", "engine": "powerpoint" if use_powerpoint else "libreoffice"}
+        key = deck_key(temp_ppt_path, options)
+        cached_pdf_path = cache.get(key)
+        if cached_pdf_path:
+            logger.debug(f"PDF served from cache: {cached_pdf_path}")
+            return cached_pdf_path
+
+        if use_powerpoint:
+            temp_pdf_path = convert_with_powerpoint(temp_ppt_path)
+            if temp_pdf_path.startswith("Error"):
+                return temp_pdf_path
+        else:
+            pool = get_pool()
+            chunks = plan_chunks(count_slides(temp_ppt_path), pool.size)
+            if incremental and PdfWriter is not None:
+                temp_pdf_path = convert_incremental(temp_ppt_path, options, pool)
+            elif len(chunks) > 1 and PdfWriter is not None:
+                logger.debug(f"Converting in {len(chunks)} chunks: {chunks}")
+                temp_pdf_path = convert_chunked(temp_ppt_path, chunks, pool)
+            else:
+                temp_pdf_path = pool.convert(temp_ppt_path)
+        logger.debug(f"PDF saved at: {temp_pdf_path}")
+
+        # Ensure PDF exists
+        if os.path.exists(temp_pdf_path) and os.path.getsize(temp_pdf_path) > 0:
+            cache.put(key, temp_pdf_path)
+            return temp_pdf_path
+        else:
+            return "Error: PDF conversion failed."
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+def count_slides(pptx_path):
+    """
+    Counts the slides of a .pptx from ppt/presentation.xml without loading the deck.
+    """
+    with zipfile.ZipFile(pptx_path) as package:
+        return len(re.findall(rb"<p:sldId\b", package.read("ppt/presentation.xml")))
+
+def plan_chunks(slide_count, workers, min_chunk=CHUNK_MIN_SLIDES):
+    """
+    Splits slides 1..slide_count into at most `workers` contiguous, evenly sized
+    ranges of at least min_chunk slides each.
+
+    Returns:
+        list: (first_slide, last_slide) tuples, 1-based and inclusive.
+    """
+    count = max(1, min(workers, slide_count // max(min_chunk, 1)))
+    size = math.ceil(slide_count / count) if slide_count else 0
+    return [(start, min(start + size - 1, slide_count)) for start in range(1, slide_count + 1, size or 1)]
+
+def convert_chunked(pptx_path, chunks, pool):
+    """
+    Converts each slide range of a deck on its own worker and stitches the PDFs in order.
+    """
+    chunk_decks = []
+    futures = []
+    try:
+        for first, last in chunks:
+            # Submit each chunk as soon as it is cut so earlier chunks already convert
+            chunk_decks.append(slice_deck(pptx_path, range(first, last + 1)))
+            futures.append(pool.submit(chunk_decks[-1]))
+        chunk_pdfs = [future.result() for future in futures]
+        try:
+            return stitch_pdfs(chunk_pdfs, [first for first, _ in chunks])
+        finally:
+            for path in chunk_pdfs:
+                os.remove(path)
+    finally:
+        for path in chunk_decks:
+            os.remove(path)
+
+def convert_incremental(pptx_path, options, pool):
+    """
+    Converts a deck page by page through the slide page cache, rendering only
+    the slides that have no cached page and splicing everything in slide order.
+    """
+    page_cache = get_page_cache()
+    keys = slide_keys(pptx_path, options)
+    pages = {}
+    missing = []
+    for number, key in enumerate(keys, start=1):
+        if key is None or key in pages:
+            continue
+        pages[key] = page_cache.get(key)
+        if pages[key] is None:
+            missing.append(number)
+    logger.debug(f"Rendering {len(missing)} of {sum(key is not None for key in keys)} slides")
+
+    try:
+        chunk_decks = []
+        futures = []
+        groups = [missing[first - 1:last] for first, last in plan_chunks(len(missing), pool.size)]
+        for group in groups:
+            chunk_decks.append(slice_deck(pptx_path, group))
+            futures.append(pool.submit(chunk_decks[-1]))
+        for group, future in zip(groups, futures):
+            chunk_pdf = future.result()
+            try:
+                reader = PdfReader(chunk_pdf)
+                if len(reader.pages) != len(group):
+                    raise ConversionError(f"Expected {len(group)} pages for slides {group}, got {len(reader.pages)}")
+                for number, page in zip(group, reader.pages):
+                    writer = PdfWriter()
+                    writer.add_page(page)
+                    page_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
+                    with open(page_path, "wb") as f:
+                        writer.write(f)
+                    pages[keys[number - 1]] = page_path
+                    page_cache.put(keys[number - 1], page_path)
+            finally:
+                os.remove(chunk_pdf)
+
+        writer = PdfWriter()
+        numbers = []
+        for number, key in enumerate(keys, start=1):
+            if key is not None:
+                writer.add_page(PdfReader(pages[key]).pages[0])
+                numbers.append(number)
+        # Label pages with their slide numbers, one label range per run of visible slides
+        start = 0
+        for index in range(1, len(numbers) + 1):
+            if index == len(numbers) or numbers[index] != numbers[index - 1] + 1:
+                writer.set_page_label(start, index - 1, style="/D", start=numbers[start])
+                start = index
+        output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
+        with open(output_path, "wb") as f:
+            writer.write(f)
+        return output_path
+    finally:
+        for path in chunk_decks:
+            os.remove(path)
+        for path in pages.values():
+            if path and os.path.exists(path):
+                os.remove(path)
+
+def slice_deck(pptx_path, slide_numbers, output_path=None, show_hidden=False):
+    """
+    Saves a copy of a deck that renders only the given 1-based slide numbers.
+
+    Slides outside their span are removed. Slides inside it that were not
+    asked for are hidden rather than removed, and the first slide number is
+    shifted, so slide number fields still show the original numbers. With
+    show_hidden, requested slides that are hidden in the deck are shown.
+    """
+    keep = set(slide_numbers)
+    first, last = min(keep), max(keep)
+    if output_path is None:
+        output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pptx").name
+    with OpcPackage(pptx_path) as package:
+        apply_order(package, list(range(first, last + 1)))
+        presentation = package.xml(PRESENTATION)
+        for number, sldId in enumerate(presentation.find("p:sldIdLst", NS), start=first):
+            slide_part = package.related(PRESENTATION, sldId.get(qn("r:id")))
+            if number not in keep:
+                package.xml(slide_part).set("show", "0")
+            elif show_hidden and package.xml(slide_part).get("show") in ("0", "false"):
+                del package.xml(slide_part).attrib["show"]
+        first_slide_number = int(presentation.get("firstSlideNum", "1"))
+        presentation.set("firstSlideNum", str(first_slide_number + first - 1))
+        package.save(output_path)
+    return output_path
+
+def stitch_pdfs(pdf_paths, first_slide_numbers, output_path=None):
+    """
+    Concatenates chunk PDFs in order, keeping their bookmarks, and labels the
+    pages of each chunk from its first slide number so numbering runs on
+    across chunks instead of restarting.
+    """
+    writer = PdfWriter()
+    for path, first_slide in zip(pdf_paths, first_slide_numbers):
+        start_page = len(writer.pages)
+        writer.append(PdfReader(path), import_outline=True)
+        if len(writer.pages) > start_page:
+            writer.set_page_label(start_page, len(writer.pages) - 1, style="/D", start=first_slide)
+    if output_path is None:
+        output_path = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf").name
+    with open(output_path, "wb") as f:
+        writer.write(f)
+    return output_path
+
+def convert_with_powerpoint(temp_ppt_path):
+    """
+    Converts a saved .pptx to PDF with PowerPoint over COM (Windows only).
+    """
+    import win32com.client
+    import pythoncom
+
+    try:
+        # Initialize COM
+        pythoncom.CoInitialize()
+
         # Create PowerPoint Application
         pptApp = win32com.client.Dispatch("PowerPoint.Application")
         pptApp.Visible = 1  # Run PowerPoint in foreground (for debugging)
@@ -0,0 +1,457 @@
+import os
+import json
+import logging
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+from sheettransfer import sheet_tables, write_sheets
+
+try:
+    import yaml
+except ImportError:  # optional; JSON pipelines and pipeline sheets work without it
+    yaml = None
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_SHEET = "Pipeline"
+PIPELINE_COLUMNS = ["query", "step", "options"]
+
+TYPES = {
+    "int": "Int64",
+    "integer": "Int64",
+    "float": "float64",
+    "number": "float64",
+    "decimal": "float64",
+    "str": "string",
+    "string": "string",
+    "text": "string",
+    "bool": "boolean",
+    "boolean": "boolean",
+    "date": "datetime64[ns]",
+    "datetime": "datetime64[ns]",
+}
+
+FILTER_OPERATORS = {
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    "in": lambda column, value: column.isin(value),
+    "not in": lambda column, value: ~column.isin(value),
+    "null": lambda column, value: column.isna(),
+    "not null": lambda column, value: column.notna(),
+    "contains": lambda column, value: column.astype("string").str.contains(str(value), regex=False, na=False),
+}
+
+
+class PipelineError(Exception):
+    """Raised when a pipeline definition is invalid or cannot be run."""
+
+
+def load_pipeline(source):
+    """
+    Reads a pipeline definition.
+
+    A pipeline is an ordered list of queries, each a name plus a list of steps.
+    It can be given as a JSON or YAML file:
+
+        {"queries": [{"name": "totals", "steps": [
+            {"step": "source", "workbook": "stripped", "sheet": "Total Summary"},
+            {"step": "filter", "column": "Region", "op": "==", "value": "EU"},
+            {"step": "group_by", "keys": ["Entity"], "aggregations": {"Amount": "sum"}},
+            {"step": "output", "sheet": "Totals"}]}]}
+
+    or as a "Pipeline" sheet in a workbook with columns query, step and
+    options, one step per row in order and options as a JSON object.
+
+    Parameters:
+    - source: Path or file-like object of a .json, .yaml/.yml or Excel workbook
+
+    Returns:
+    - List of {"name", "steps"} dicts, or None if a workbook has no Pipeline sheet
+    """
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    extension = os.path.splitext(name)[1].lower()
+    if extension in (".json", ".yaml", ".yml"):
+        text = open(source, "rb").read() if isinstance(source, str) else source.read()
+        if extension == ".json":
+            spec = json.loads(text)
+        elif yaml is None:
+            raise PipelineError("Reading YAML pipelines needs PyYAML")
+        else:
+            spec = yaml.safe_load(text)
+        queries = spec.get("queries") if isinstance(spec, dict) else spec
+        if not isinstance(queries, list):
+            raise PipelineError("Pipeline must have a list of queries")
+        return _validate([{"name": query.get("name"), "steps": query.get("steps")} for query in queries])
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        if PIPELINE_SHEET not in workbook.sheetnames:
+            return None
+        rows = workbook[PIPELINE_SHEET].iter_rows(values_only=True)
+        header = [str(value).strip().lower() if value is not None else "" for value in next(rows, ())]
+        missing = [col for col in PIPELINE_COLUMNS[:2] if col not in header]
+        if missing:
+            raise PipelineError(f"{PIPELINE_SHEET} sheet is missing column(s): {', '.join(missing)}")
+
+        queries = {}
+        for row_number, row in enumerate(rows, start=2):
+            row = dict(zip(header, row))
+            if row.get("query") is None and row.get("step") is None:
+                continue
+            options = row.get("options")
+            try:
+                options = json.loads(options) if options not in (None, "") else {}
+            except ValueError as e:
+                raise PipelineError(f"Invalid options in {PIPELINE_SHEET} row {row_number}: {str(e)}")
+            if not isinstance(options, dict):
+                raise PipelineError(f"Invalid options in {PIPELINE_SHEET} row {row_number}: expected a JSON object")
+            queries.setdefault(str(row.get("query") or "").strip(), []).append(
+                {**options, "step": str(row.get("step") or "").strip().lower()}
+            )
+        return _validate([{"name": query, "steps": steps} for query, steps in queries.items()])
+    finally:
+        workbook.close()
+
+
+def _validate(queries):
+    names = set()
+    for query in queries:
+        if not query["name"]:
+            raise PipelineError("Every query needs a name")
+        if query["name"] in names:
+            raise PipelineError(f"Query '{query['name']}' is defined more than once")
+        names.add(query["name"])
+        if not query["steps"] or query["steps"][0].get("step") != "source":
+            raise PipelineError(f"Query '{query['name']}' must start with a source step")
+        for step in query["steps"]:
+            if step.get("step") not in STEPS:
+                raise PipelineError(f"Query '{query['name']}' has an unknown step: {step.get('step')}")
+    return queries
+
+
+class Pipeline:
+    """
+    Runs a pipeline's queries in-process with pandas.
+
+    Queries run in definition order, each as soon as it is reached; a step
+    that refers to another query (source, join, append) runs that query first.
+    Every source sheet is read once per run, straight from the workbook with
+    openpyxl in read-only mode, so nothing depends on Excel being installed.
+    """
+
+    def __init__(self, queries, workbooks):
+        """
+        Parameters:
+        - queries: Output of load_pipeline
+        - workbooks: Dict of workbook name (as used by source steps) to path
+        """
+        self.queries = {query["name"]: query["steps"] for query in queries}
+        self.workbooks = workbooks
+        self.results = {}
+        self.outputs = []  # (query, sheet, cell) in the order outputs were reached
+        self._sheets = {}
+        self._running = set()
+
+    def run(self):
+        """
+        Runs every query and returns a dict of query name to DataFrame.
+        """
+        for name in self.queries:
+            self.result(name)
+        return self.results
+
+    def result(self, name):
+        if name in self.results:
+            return self.results[name]
+        if name not in self.queries:
+            raise PipelineError(f"Unknown query: {name}")
+        if name in self._running:
+            raise PipelineError(f"Query '{name}' depends on itself")
+        self._running.add(name)
+        df = None
+        for number, step in enumerate(self.queries[name], start=1):
+            try:
+                df = STEPS[step["step"]](self, df, step, name)
+            except PipelineError:
+                raise
+            except Exception as e:
+                raise PipelineError(f"Query '{name}' step {number} ({step['step']}) failed: {str(e)}")
+        self._running.discard(name)
+        logger.info(f"Query '{name}' produced {len(df)} rows")
+        self.results[name] = df
+        return df
+
+    def sheet(self, workbook, sheet, header_row):
+        """
+        Returns a copy of a sheet as a DataFrame, with the given 1-based row as header.
+        """
+        key = (workbook, sheet, header_row)
+        if key not in self._sheets:
+            if workbook not in self.workbooks:
+                raise PipelineError(f"Unknown workbook: {workbook}")
+            book = openpyxl.load_workbook(self.workbooks[workbook], read_only=True, data_only=True)
+            try:
+                if sheet not in book.sheetnames:
+                    raise PipelineError(f"Workbook '{workbook}' has no sheet '{sheet}'")
+                rows = book[sheet].iter_rows(min_row=header_row, values_only=True)
+                header = next(rows, ())
+                df = pd.DataFrame(list(rows), columns=_column_names(header))
+            finally:
+                book.close()
+            # Trailing blank rows and unnamed blank columns are formatting, not data
+            df = df.dropna(how="all")
+            blank = [col for col, value in zip(df.columns, header) if value is None and df[col].isna().all()]
+            self._sheets[key] = df.drop(columns=blank).reset_index(drop=True)
+        return self._sheets[key].copy()
+
+
+def _column_names(header):
+    names, seen = [], {}
+    for position, value in enumerate(header, start=1):
+        name = str(value).strip() if value is not None else f"Column{position}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _columns(df, columns, step):
+    columns = [columns] if isinstance(columns, str) else list(columns or [])
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise PipelineError(f"{step} step refers to missing column(s): {', '.join(map(str, missing))}")
+    return columns
+
+
+def _source(pipeline, df, step, name):
+    if "query" in step:
+        return pipeline.result(step["query"]).copy()
+    if "workbook" not in step or "sheet" not in step:
+        raise PipelineError(f"Source of query '{name}' needs a workbook and sheet, or a query")
+    return pipeline.sheet(step["workbook"], step["sheet"], int(step.get("header_row", 1)))
+
+
+def _filter(pipeline, df, step, name):
+    if "expr" in step:
+        return df.query(step["expr"], engine="python").reset_index(drop=True)
+    column = _columns(df, step.get("column"), "filter")[0]
+    op = step.get("op", "==")
+    if op not in FILTER_OPERATORS:
+        raise PipelineError(f"Unknown filter operator: {op}")
+    return df[FILTER_OPERATORS[op](df[column], step.get("value")).fillna(False).astype(bool)].reset_index(drop=True)
+
+
+def _select(pipeline, df, step, name):
+    return df[_columns(df, step.get("columns"), "select")]
+
+
+def _remove(pipeline, df, step, name):
+    return df.drop(columns=_columns(df, step.get("columns"), "remove"))
+
+
+def _rename(pipeline, df, step, name):
+    mapping = step.get("columns") or {}
+    _columns(df, list(mapping), "rename")
+    return df.rename(columns=mapping)
+
+
+def _types(pipeline, df, step, name):
+    types = step.get("columns") or {}
+    df = df.copy()
+    for column in _columns(df, list(types), "types"):
+        type_name = str(types[column]).lower()
+        if type_name not in TYPES:
+            raise PipelineError(f"Unknown type for column '{column}': {types[column]}")
+        if type_name in ("int", "integer", "float", "number", "decimal"):
+            values = pd.to_numeric(df[column], errors="coerce")
+            df[column] = values.round().astype(TYPES[type_name]) if TYPES[type_name] == "Int64" else values
+        elif type_name in ("date", "datetime"):
+            df[column] = pd.to_datetime(df[column], errors="coerce")
+            if type_name == "date":
+                df[column] = df[column].dt.normalize()
+        else:
+            df[column] = df[column].astype(TYPES[type_name])
+    return df
+
+
+def _join(pipeline, df, step, name):
+    other = pipeline.result(step["query"])
+    how = step.get("how", "left")
+    if "on" in step:
+        left_on = right_on = step["on"]
+    else:
+        left_on, right_on = step.get("left_on"), step.get("right_on")
+    _columns(df, left_on, "join")
+    _columns(other, right_on, "join")
+    return df.merge(
+        other,
+        how=how,
+        left_on=left_on,
+        right_on=right_on,
+        suffixes=("", step.get("suffix", f".{step['query']}")),
+    )
+
+
+def _append(pipeline, df, step, name):
+    queries = step.get("queries") or [step["query"]]
+    return pd.concat([df] + [pipeline.result(query) for query in queries], ignore_index=True)
+
+
+def _group_by(pipeline, df, step, name):
+    keys = _columns(df, step.get("keys"), "group_by")
+    aggregations = {}
+    for output, spec in (step.get("aggregations") or {}).items():
+        # {"Amount": "sum"} aggregates a column under its own name; {"Total": ["Amount", "sum"]} renames it
+        column, function = (output, spec) if isinstance(spec, str) else spec
+        _columns(df, column, "group_by")
+        aggregations[output] = (column, "size" if function == "count_rows" else function)
+    if not aggregations:
+        return df[keys].drop_duplicates().sort_values(keys).reset_index(drop=True)
+    return df.groupby(keys, dropna=False, sort=True).agg(**aggregations).reset_index()
+
+
+def _pivot(pipeline, df, step, name):
+    index = _columns(df, step.get("index"), "pivot")
+    columns = _columns(df, step.get("columns"), "pivot")
+    values = _columns(df, step.get("values"), "pivot")
+    pivoted = df.pivot_table(
+        index=index,
+        columns=columns,
+        values=values[0] if len(values) == 1 else values,
+        aggfunc=step.get("aggfunc", "sum"),
+        fill_value=step.get("fill_value"),
+        dropna=False,
+        observed=True,
+    )
+    pivoted.columns = [
+        " ".join(str(part) for part in col) if isinstance(col, tuple) else str(col) for col in pivoted.columns
+    ]
+    return pivoted.reset_index()
+
+
+def _unpivot(pipeline, df, step, name):
+    id_columns = _columns(df, step.get("id_columns"), "unpivot")
+    value_columns = _columns(df, step.get("columns"), "unpivot") if step.get("columns") else None
+    return df.melt(
+        id_vars=id_columns,
+        value_vars=value_columns,
+        var_name=step.get("attribute", "Attribute"),
+        value_name=step.get("value", "Value"),
+    )
+
+
+def _add_column(pipeline, df, step, name):
+    df = df.copy()
+    df[step["name"]] = df.eval(step["expr"], engine="python")
+    return df
+
+
+def _sort(pipeline, df, step, name):
+    by = _columns(df, step.get("by"), "sort")
+    descending = step.get("descending", False)
+    ascending = [not flag for flag in descending] if isinstance(descending, list) else not descending
+    return df.sort_values(by, ascending=ascending, kind="stable").reset_index(drop=True)
+
+
+def _distinct(pipeline, df, step, name):
+    columns = _columns(df, step.get("columns"), "distinct") if step.get("columns") else None
+    return df.drop_duplicates(subset=columns).reset_index(drop=True)
+
+
+def _output(pipeline, df, step, name):
+    if not step.get("sheet"):
+        raise PipelineError(f"Output of query '{name}' needs a sheet")
+    pipeline.outputs.append((name, step["sheet"], step.get("cell", "A1")))
+    return df
+
+
+STEPS = {
+    "source": _source,
+    "filter": _filter,
+    "select": _select,
+    "remove": _remove,
+    "rename": _rename,
+    "types": _types,
+    "join": _join,
+    "append": _append,
+    "group_by": _group_by,
+    "pivot": _pivot,
+    "unpivot": _unpivot,
+    "add_column": _add_column,
+    "sort": _sort,
+    "distinct": _distinct,
+    "output": _output,
+}
+
+
+def write_outputs(pipeline, workbook_path, output_path=None):
+    """
+    Writes every output step's result into its target sheet and saves the workbook.
+
+    A target sheet is created if missing; otherwise its cell data is replaced
+    so no rows of a longer previous result are left behind. Only the target
+    worksheet parts are rewritten (see sheettransfer.write_sheets), so
+    connections, queries and every other part of the workbook are kept as
+    they are. Sheets holding tables are refused, because a table's range and
+    columns would no longer match the new data.
+    """
+    sheet_rows = {}
+    for query, sheet_name, cell in pipeline.outputs:
+        column_letter, first_row = coordinate_from_string(cell)
+        sheet_rows[sheet_name] = _output_rows(pipeline.results[query], first_row, column_index_from_string(column_letter))
+
+    tables = sheet_tables(workbook_path)
+    tables = [f"{name} ({', '.join(tables[name])})" for name in sheet_rows if name in tables]
+    if tables:
+        raise PipelineError(f"Output sheet(s) hold tables that would no longer match the data: {'; '.join(tables)}")
+    try:
+        write_sheets(workbook_path, sheet_rows, output_path, create=True)
+    except ValueError as e:
+        raise PipelineError(str(e))
+
+
+def _output_rows(df, first_row, first_column):
+    """
+    Yields the sheet rows of a result with its header at first_row, first_column.
+    """
+    padding = (None,) * (first_column - 1)
+    for _ in range(first_row - 1):
+        yield ()
+    yield padding + tuple(str(column) for column in df.columns)
+    for row in df.itertuples(index=False, name=None):
+        yield padding + tuple(_cell_value(value) for value in row)
+
+
+def _cell_value(value):
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+
+def run_pipeline(queries, workbooks, target_path, output_path=None):
+    """
+    Runs a pipeline and writes its outputs into target_path (or a copy at output_path).
+
+    Returns:
+    - dict of query name to row count
+    """
+    pipeline = Pipeline(queries, workbooks)
+    results = pipeline.run()
+    if not pipeline.outputs:
+        raise PipelineError("Pipeline has no output steps")
+    write_outputs(pipeline, target_path, output_path)
+    return {name: len(df) for name, df in results.items()}
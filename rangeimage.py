@@ -0,0 +1,217 @@
+import os
+import tempfile
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+RENDER_VERSION = "1"
+DEFAULT_SCALE = 2  # render at 2x so the picture stays sharp when PowerPoint scales it
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "automation_hub_range_images")
+
+FONT_FILES = {
+    (False, False): ["calibri.ttf", "arial.ttf", "DejaVuSans.ttf"],
+    (True, False): ["calibrib.ttf", "arialbd.ttf", "DejaVuSans-Bold.ttf"],
+    (False, True): ["calibrii.ttf", "ariali.ttf", "DejaVuSans-Oblique.ttf"],
+    (True, True): ["calibriz.ttf", "arialbi.ttf", "DejaVuSans-BoldOblique.ttf"],
+}
+
+BORDER_WIDTHS = {
+    "hair": 1, "thin": 1, "dotted": 1, "dashed": 1, "dashDot": 1, "dashDotDot": 1,
+    "medium": 2, "mediumDashed": 2, "mediumDashDot": 2, "mediumDashDotDot": 2, "slantDashDot": 2,
+    "thick": 3, "double": 3,
+}
+
+_fonts = {}
+
+
+def render_png(snapshot, scale=DEFAULT_SCALE, cache_dir=CACHE_DIR):
+    """
+    Draws a range snapshot (see excelrange.read_range_snapshot) to a PNG file.
+
+    Renders are cached on disk by the snapshot's content hash, so drawing the
+    same block again returns the existing file without any work.
+
+    Parameters:
+    - snapshot: dict produced by excelrange.read_range_snapshot
+    - scale: Pixels per screen pixel of the rendered image
+    - cache_dir: Directory holding cached renders
+
+    Returns:
+    - Path to the PNG file
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    image_path = cached_path(snapshot, scale, cache_dir)
+    if os.path.exists(image_path):
+        logger.info(f"Using cached render for {snapshot['sheet']}!{snapshot['range']}")
+        return image_path
+
+    image = render_image(snapshot, scale)
+
+    # Write to a temporary name first so concurrent renders never expose a partial file
+    fd, temp_path = tempfile.mkstemp(suffix=".png", dir=cache_dir)
+    with os.fdopen(fd, "wb") as f:
+        image.save(f, format="PNG", optimize=True)
+    os.replace(temp_path, image_path)
+    return image_path
+
+
+def render_many(snapshots, workers=None, scale=DEFAULT_SCALE, cache_dir=CACHE_DIR):
+    """
+    Renders several snapshots, drawing the ones not already cached in parallel processes.
+
+    Returns:
+    - List of PNG paths in the order of snapshots
+    """
+    paths = [cached_path(snapshot, scale, cache_dir) for snapshot in snapshots]
+    pending = [i for i, path in enumerate(paths) if not os.path.exists(path)]
+    if len(pending) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(render_png, snapshots[i], scale, cache_dir) for i in pending]
+            for future in futures:
+                future.result()
+    else:
+        for i in pending:
+            render_png(snapshots[i], scale, cache_dir)
+    return paths
+
+
+def cached_path(snapshot, scale=DEFAULT_SCALE, cache_dir=CACHE_DIR):
+    """
+    Returns the cache path a snapshot's render is stored under.
+    """
+    key = hashlib.sha256(f"{snapshot['hash']}:{scale}:{RENDER_VERSION}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.png")
+
+
+def render_image(snapshot, scale=DEFAULT_SCALE):
+    """
+    Draws a range snapshot to a PIL Image.
+    """
+    col_x = [0]
+    for width in snapshot["col_widths"]:
+        # Excel column width is in characters of the default font: 7px each plus 5px padding
+        col_x.append(col_x[-1] + (round((width * 7 + 5) * scale) if width else 0))
+    row_y = [0]
+    for height in snapshot["row_heights"]:
+        row_y.append(row_y[-1] + round(height * 96 / 72 * scale))
+
+    image = Image.new("RGB", (max(col_x[-1], 1) + 1, max(row_y[-1], 1) + 1), "white")
+    draw = ImageDraw.Draw(image)
+    cells = snapshot["cells"]
+
+    # Each merge is drawn as one cell anchored at its top-left corner
+    covered = {}
+    for top, left, bottom, right in snapshot["merges"]:
+        for r in range(top, bottom + 1):
+            for c in range(left, right + 1):
+                covered[(r, c)] = (top, left, bottom, right)
+
+    boxes = []
+    for r, row in enumerate(cells):
+        for c in range(len(row)):
+            merge = covered.get((r, c))
+            if merge and (r, c) != (merge[0], merge[1]):
+                continue
+            top, left, bottom, right = merge or (r, c, r, c)
+            boxes.append((r, c, (col_x[left], row_y[top], col_x[right + 1], row_y[bottom + 1])))
+
+    for r, c, box in boxes:
+        fill = cells[r][c]["fill"]
+        if fill and box[2] > box[0] and box[3] > box[1]:
+            draw.rectangle([box[0], box[1], box[2] - 1, box[3] - 1], fill=f"#{fill}")
+
+    for r, row in enumerate(cells):
+        for c, cell in enumerate(row):
+            merge = covered.get((r, c))
+            x0, y0, x1, y1 = col_x[c], row_y[r], col_x[c + 1], row_y[r + 1]
+            edges = {
+                "left": ((x0, y0), (x0, y1)),
+                "right": ((x1, y0), (x1, y1)),
+                "top": ((x0, y0), (x1, y0)),
+                "bottom": ((x0, y1), (x1, y1)),
+            }
+            for side, (style, color) in cell["borders"].items():
+                if merge and _is_inner_edge(side, r, c, merge):
+                    continue
+                width = BORDER_WIDTHS.get(style, 1) * scale
+                draw.line(edges[side], fill=f"#{color}", width=width)
+
+    for r, c, box in boxes:
+        _draw_text(draw, cells[r][c], box, scale)
+
+    return image
+
+
+def _is_inner_edge(side, r, c, merge):
+    top, left, bottom, right = merge
+    return (
+        (side == "left" and c > left)
+        or (side == "right" and c < right)
+        or (side == "top" and r > top)
+        or (side == "bottom" and r < bottom)
+    )
+
+
+def _draw_text(draw, cell, box, scale):
+    text = cell["text"].strip()
+    if not text or box[2] <= box[0] or box[3] <= box[1]:
+        return
+    font = _get_font(cell["bold"], cell["italic"], round(cell["size"] * 96 / 72 * scale))
+    padding = 2 * scale
+    max_width = box[2] - box[0] - 2 * padding
+    lines = _wrap(draw, text, font, max_width) if cell["wrap"] else text.split("\n")
+
+    line_height = font.getbbox("Ag")[3] + scale
+    total_height = line_height * len(lines)
+    if cell["vertical"] == "top":
+        y = box[1] + padding
+    elif cell["vertical"] in ("center", "justify", "distributed"):
+        y = box[1] + (box[3] - box[1] - total_height) / 2
+    else:
+        y = box[3] - padding - total_height
+
+    for line in lines:
+        line_width = draw.textlength(line, font=font)
+        if cell["horizontal"] == "center":
+            x = box[0] + (box[2] - box[0] - line_width) / 2
+        elif cell["horizontal"] == "right":
+            x = box[2] - padding - line_width
+        else:
+            x = box[0] + padding
+        draw.text((x, y), line, font=font, fill=f"#{cell['color']}")
+        if cell["underline"]:
+            underline_y = y + line_height - scale
+            draw.line(((x, underline_y), (x + line_width, underline_y)), fill=f"#{cell['color']}", width=scale)
+        y += line_height
+
+
+def _wrap(draw, text, font, max_width):
+    lines = []
+    for paragraph in text.split("\n"):
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if line and draw.textlength(candidate, font=font) > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    return lines
+
+
+def _get_font(bold, italic, size):
+    key = (bold, italic, size)
+    if key not in _fonts:
+        font = None
+        for name in FONT_FILES[(bold, italic)]:
+            try:
+                font = ImageFont.truetype(name, size)
+                break
+            except OSError:
+                continue
+        _fonts[key] = font or ImageFont.load_default(size)
+    return _fonts[key]
@@ -0,0 +1,185 @@
+import io
+import itertools
+import os
+import re
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl.worksheet._reader import WorkSheetParser
+
+BLOCK_BYTES = 4 * 1024 * 1024  # uncompressed worksheet XML per block of rows
+READ_CHUNK = 1024 * 1024
+PENDING_PER_WORKER = 2  # blocks queued per worker, which bounds the rows held in memory
+
+ROOT_TAG = re.compile(rb"<(?:([A-Za-z_][\w.-]*):)?worksheet\b[^>]*>")
+ROW_NUMBER = re.compile(rb"""\sr\s*=\s*["'](\d+)["']""")
+
+Block = namedtuple("Block", ["first_row", "rows"])  # rows: tuples of values, one per sheet row from first_row
+
+_reader = None  # (shared strings, data_only, epoch, date formats, timedelta formats) of the workbook, in worker processes
+
+
+def map_blocks(sheet, function, args=(), min_row=1, max_row=None, min_col=1, max_col=None, workers=None, block_bytes=BLOCK_BYTES):
+    """
+    Applies a function to a worksheet in blocks of rows, in worker processes,
+    and yields its results in sheet order.
+
+    The worksheet XML is cut into blocks of about block_bytes at row
+    boundaries without being parsed; each worker parses its own blocks with
+    openpyxl's cell parser, so values are the same as those of iter_rows
+    in read-only mode. At most PENDING_PER_WORKER blocks per worker are in
+    flight at a time, so memory is bounded by the block size rather than by
+    the sheet. A range that fits in one block is processed in this process.
+
+    Parameters:
+    - sheet: openpyxl worksheet of a workbook opened with read_only=True (data_only is respected)
+    - function: Module-level function called as function(Block, *args); it and its result must be picklable
+    - args: Extra arguments passed to every call
+    - min_row, max_row: 1-based rows to cover (max_row defaults to the last row)
+    - min_col, max_col: 1-based columns to read (max_col defaults to the sheet's last column)
+    - workers: Maximum number of worker processes (defaults to the number of CPUs; 1 runs in this process)
+    - block_bytes: Size of the blocks
+
+    Returns:
+    - Generator of the function's results, one per block with rows in range, in order
+    """
+    workbook = sheet.parent
+    reader = (list(sheet._shared_strings), workbook.data_only, workbook.epoch, workbook._date_formats, workbook._timedelta_formats)
+    max_col = max_col or sheet.max_column or min_col
+    workers = workers or os.cpu_count() or 1
+    tasks = (
+        (function, args, xml, first_row, last_row, min_col, max_col)
+        for xml, first_row, last_row in _blocks(sheet, min_row, max_row, block_bytes)
+    )
+    first_tasks = list(itertools.islice(tasks, 2))
+    tasks = itertools.chain(first_tasks, tasks)
+
+    if workers == 1 or len(first_tasks) < 2:
+        for task in tasks:
+            yield _run_block(*task, reader=reader)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_reader, initargs=reader) as executor:
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_run_block, *task))
+            if len(pending) >= PENDING_PER_WORKER * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _init_reader(*reader):
+    global _reader
+    _reader = reader
+
+
+def _run_block(function, args, xml, first_row, last_row, min_col, max_col, reader=None):
+    shared_strings, data_only, epoch, date_formats, timedelta_formats = reader or _reader
+    parser = WorkSheetParser(
+        io.BytesIO(xml), shared_strings, data_only=data_only,
+        epoch=epoch, date_formats=date_formats, timedelta_formats=timedelta_formats,
+    )
+    empty = (None,) * (max_col - min_col + 1)
+    rows = []
+    next_row = first_row
+    for row_number, cells in parser.parse():
+        if row_number < first_row:
+            continue
+        if last_row is not None and row_number > last_row:
+            break
+        rows.extend([empty] * (row_number - next_row))  # rows missing from the XML are empty
+        values = list(empty)
+        for cell in cells:
+            if min_col <= cell["column"] <= max_col:
+                values[cell["column"] - min_col] = cell["value"]
+        rows.append(tuple(values))
+        next_row = row_number + 1
+    if last_row is not None:
+        rows.extend([empty] * (last_row + 1 - next_row))
+    return function(Block(first_row, rows), *args)
+
+
+def _blocks(sheet, min_row, max_row, block_bytes):
+    """
+    Yields (xml, first_row, last_row) for the blocks of a sheet that hold rows
+    from min_row to max_row. last_row is None for the last block of the sheet.
+    """
+    first_row = 1
+    with sheet._get_source() as source:
+        for xml, next_row in _sheet_chunks(source, block_bytes):
+            if max_row is not None and first_row > max_row:
+                return
+            last_row = next_row - 1 if next_row is not None else None
+            if max_row is not None and (last_row is None or last_row > max_row):
+                last_row = max_row
+            if last_row is None or last_row >= min_row:
+                yield xml, max(first_row, min_row), last_row
+            if next_row is None:
+                return
+            first_row = next_row
+
+
+def _sheet_chunks(source, block_bytes):
+    """
+    Cuts the rows of a worksheet part into chunks of about block_bytes, each
+    wrapped in the part's own root and sheetData tags so it parses on its own.
+
+    Chunks are only cut in front of a row with a row number, which is yielded
+    with the chunk before it (None after the last chunk).
+    """
+    buffer = b""
+    while True:
+        data = source.read(READ_CHUNK)
+        buffer += data
+        root = ROOT_TAG.search(buffer)
+        prefix = (root.group(1) + b":") if root and root.group(1) else b""
+        start = re.compile(rb"<" + re.escape(prefix) + rb"sheetData\b[^>]*>").search(buffer, root.end()) if root else None
+        if start is not None:
+            break
+        if not data:
+            return
+    if start.group(0).endswith(b"/>"):
+        return
+    head = root.group(0) + start.group(0)
+    tail = b"</" + prefix + b"sheetData></" + prefix + b"worksheet>"
+    row_open = b"<" + prefix + b"row"
+    end_tag = re.compile(rb"</" + re.escape(prefix) + rb"sheetData\s*>")
+
+    buffer = buffer[start.end():]
+    searched = 0
+    while True:
+        end = end_tag.search(buffer, max(0, searched - 32))
+        if end is not None:
+            yield head + buffer[:end.start()] + tail, None
+            return
+        searched = len(buffer)
+        if len(buffer) >= block_bytes:
+            cut = _last_row_start(buffer, row_open)
+            if cut is not None:
+                position, row_number = cut
+                yield head + buffer[:position] + tail, row_number
+                buffer = buffer[position:]
+                searched = len(buffer)
+        data = source.read(READ_CHUNK)
+        if not data:
+            raise ValueError("Worksheet XML ends inside its cell data")
+        buffer += data
+
+
+def _last_row_start(buffer, row_open):
+    """
+    Returns (offset, row number) of the last complete row start tag in buffer,
+    or None when there is none after the first or it has no row number.
+    """
+    position = len(buffer)
+    while True:
+        position = buffer.rfind(row_open, 0, position)
+        if position <= 0:
+            return None
+        if buffer[position + len(row_open):position + len(row_open) + 1] not in (b" ", b"\t", b"\r", b"\n", b">", b"/"):
+            continue
+        tag_end = buffer.find(b">", position)
+        if tag_end < 0:
+            continue  # the tag is cut off at the end of the buffer
+        number = ROW_NUMBER.search(buffer, position, tag_end)
+        return (position, int(number.group(1))) if number else None
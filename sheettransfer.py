@@ -0,0 +1,433 @@
+import os
+import re
+import posixpath
+import shutil
+import datetime
+import tempfile
+import openpyxl
+from lxml import etree
+from xml.sax.saxutils import escape
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.datetime import to_excel
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles.differential import DifferentialStyle
+from openpyxl.xml.functions import tostring
+from opcpackage import OpcPackage, COPY_CHUNK
+
+SS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+RT_OFFICE_DOCUMENT = R + "/officeDocument"
+RT_STYLES = R + "/styles"
+RT_CALC_CHAIN = R + "/calcChain"
+RT_WORKSHEET = R + "/worksheet"
+RT_TABLE = R + "/table"
+CT_WORKSHEET = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+CHUNK_ROWS = 1000  # rows buffered before they are written to the new sheet part
+SHEET_DATA_MARKER = "@@sheetData@@"
+DIMENSION_MARKER = "@@dimension@@"
+# Bytes reserved for the dimension element, which is only known once every row is written
+DIMENSION_SLOT = len('<dimension ref="A1:XFD1048576"/>')
+COLUMN_LETTERS = [None] + [get_column_letter(column) for column in range(1, 16385)]
+
+# Number formats given to date and time values, which Excel stores as serial numbers
+DATE_FORMATS = {datetime.date: 14, datetime.datetime: 22, datetime.time: 21}
+ERROR_VALUES = {"#NULL!", "#DIV/0!", "#VALUE!", "#REF!", "#NAME?", "#NUM!", "#N/A"}
+
+EMPTY_SHEET = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{SS}" xmlns:r="{R}"><sheetData/></worksheet>'.encode("utf-8")
+INVALID_TITLE = re.compile(r"[\\/*?:\[\]]")
+
+ROOT_TAG = re.compile(rb"<(?:([A-Za-z_][\w.-]*):)?worksheet\b")
+# Worksheet elements that come after conditionalFormatting in the schema
+AFTER_CONDITIONAL_FORMATTING = (
+    "dataValidations", "hyperlinks", "printOptions", "pageMargins", "pageSetup", "headerFooter",
+    "rowBreaks", "colBreaks", "customProperties", "cellWatches", "ignoredErrors", "smartTags",
+    "drawing", "legacyDrawing", "legacyDrawingHF", "drawingHF", "picture", "oleObjects", "controls",
+    "webPublishItems", "tableParts", "extLst",
+)
+# styleSheet elements that come before dxfs in the schema
+BEFORE_DXFS = ("numFmts", "fonts", "fills", "borders", "cellStyleXfs", "cellXfs", "cellStyles")
+
+
+def _ss(tag):
+    return f"{{{SS}}}{tag}"
+
+
+def transfer_sheets(source_path, destination_path, sheet_names, output_path=None, chunk_rows=CHUNK_ROWS):
+    """
+    Replaces the cell values of sheets of one workbook with those of another,
+    rewriting only the destination's worksheet parts.
+
+    Source rows are streamed with openpyxl in read-only mode and written as
+    they come, chunk_rows at a time, into a new worksheet part in a temporary
+    file; strings are written inline, so the shared strings part is left
+    alone. Everything of the destination sheet outside its cell data (column
+    widths, views, merged cells, drawings) is kept, and every other part of
+    the package is copied over without being decompressed. The calculation
+    chain is dropped and a full recalculation requested on open, because it
+    may list formula cells that now hold values.
+
+    Parameters:
+    - source_path: Path of the workbook to copy values from (cached values are used for formulas)
+    - destination_path: Path of the workbook whose sheets are replaced
+    - sheet_names: Names of the sheets, which must exist in both workbooks
+    - output_path: Path to save to (defaults to replacing destination_path)
+    - chunk_rows: Number of rows held in memory at a time
+
+    Returns:
+    - dict of sheet name to the number of rows written
+    """
+    source = openpyxl.load_workbook(source_path, read_only=True, data_only=True)
+    try:
+        missing = [name for name in sheet_names if name not in source.sheetnames]
+        if missing:
+            raise ValueError(f"Source file has no sheet(s): {', '.join(missing)}")
+        return write_sheets(
+            destination_path, {name: source[name].iter_rows(values_only=True) for name in sheet_names}, output_path, chunk_rows
+        )
+    finally:
+        source.close()
+
+
+def write_sheets(destination_path, sheet_rows, output_path=None, chunk_rows=CHUNK_ROWS, create=False):
+    """
+    Replaces the cell data of sheets of a workbook with the given rows,
+    rewriting only those worksheet parts (see transfer_sheets).
+
+    Parameters:
+    - destination_path: Path of the workbook whose sheets are replaced
+    - sheet_rows: dict of sheet name to an iterable of row value tuples, written from row 1, column A
+    - output_path: Path to save to (defaults to replacing destination_path)
+    - chunk_rows: Number of rows held in memory at a time
+    - create: Whether sheets the workbook does not have are added at the end, instead of raising ValueError
+
+    Returns:
+    - dict of sheet name to the number of rows written
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        with OpcPackage(destination_path) as package:
+            workbook_part = _workbook_part(package)
+            sheet_parts = _sheet_parts(package, workbook_part)
+            missing = [name for name in sheet_rows if name not in sheet_parts]
+            if missing and not create:
+                raise ValueError(f"Destination file has no worksheet(s): {', '.join(missing)}")
+            for sheet_name in missing:
+                sheet_parts[sheet_name] = _add_sheet(package, workbook_part, sheet_name)
+
+            date_styles = _date_styles(package, workbook_part)
+            row_counts = {}
+            for number, (sheet_name, rows) in enumerate(sheet_rows.items(), start=1):
+                part = sheet_parts[sheet_name]
+                temp_path = os.path.join(temp_dir, f"sheet{number}.xml")
+                row_counts[sheet_name] = _write_sheet(package.open(part), rows, temp_path, date_styles, chunk_rows)
+                package.write_file(part, temp_path)
+
+            _drop_calc_chain(package, workbook_part)
+            temp_output = os.path.join(temp_dir, "output.xlsx")
+            package.save(temp_output)
+        shutil.move(temp_output, output_path or destination_path)
+        return row_counts
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def sheet_tables(path):
+    """
+    Maps the name of each worksheet of a workbook that holds tables to the names of its tables.
+    """
+    with OpcPackage(path) as package:
+        tables = {}
+        for sheet_name, part in _sheet_parts(package, _workbook_part(package)).items():
+            names = [
+                package.parse(rel.target).get("displayName") or rel.target
+                for rel in package.relationships(part)
+                if rel.type == RT_TABLE and not rel.external
+            ]
+            if names:
+                tables[sheet_name] = names
+        return tables
+
+
+def _workbook_part(package):
+    return next(rel.target for rel in package.relationships("") if rel.type == RT_OFFICE_DOCUMENT)
+
+
+def _sheet_parts(package, workbook_part):
+    """
+    Maps each worksheet name of a workbook to its part name (chartsheets are left out).
+    """
+    targets = {rel.rId: rel.target for rel in package.relationships(workbook_part) if rel.type == RT_WORKSHEET}
+    sheets = package.parse(workbook_part).find(_ss("sheets"))
+    return {
+        sheet.get("name"): targets[sheet.get(f"{{{R}}}id")]
+        for sheet in (sheets if sheets is not None else [])
+        if sheet.get(f"{{{R}}}id") in targets
+    }
+
+
+def _add_sheet(package, workbook_part, sheet_name):
+    """
+    Adds an empty worksheet after the existing sheets and returns its part name.
+    """
+    if not sheet_name or len(sheet_name) > 31 or INVALID_TITLE.search(sheet_name):
+        raise ValueError(f"Invalid sheet name: {sheet_name}")
+    sheets = package.xml(workbook_part).find(_ss("sheets"))
+    if any(sheet.get("name", "").lower() == sheet_name.lower() for sheet in sheets):
+        raise ValueError(f"Workbook already has a sheet named like '{sheet_name}'")
+    part = package.next_partname(posixpath.join(posixpath.dirname(workbook_part), "worksheets/sheet%d.xml"))
+    package.write(part, EMPTY_SHEET)
+    package.set_content_type(part, CT_WORKSHEET)
+    sheet = etree.SubElement(sheets, _ss("sheet"))
+    sheet.set("name", sheet_name)
+    sheet.set("sheetId", str(max((int(entry.get("sheetId", 0)) for entry in sheets), default=0) + 1))
+    sheet.set(f"{{{R}}}id", package.add_relationship(workbook_part, RT_WORKSHEET, part))
+    return part
+
+
+def _date_styles(package, workbook_part):
+    """
+    Returns the cell style index to write each kind of date/time value with,
+    adding plain number-format-only styles to the workbook's styles when needed.
+    """
+    styles_part = next((rel.target for rel in package.relationships(workbook_part) if rel.type == RT_STYLES), None)
+    if styles_part is None:
+        return {}  # without a styles part dates are written as plain serial numbers
+    styles = package.xml(styles_part)
+    cell_xfs = styles.find(_ss("cellXfs"))
+    if cell_xfs is None:
+        return {}
+    xfs = list(cell_xfs.findall(_ss("xf")))
+    indexes = {}
+    for value_type, format_id in DATE_FORMATS.items():
+        for index, xf in enumerate(xfs):
+            if xf.get("numFmtId") == str(format_id) and set(xf.attrib) <= {"numFmtId", "fontId", "fillId", "borderId", "xfId", "applyNumberFormat"}:
+                indexes[value_type] = index
+                break
+        else:
+            xf = etree.SubElement(cell_xfs, _ss("xf"))
+            xf.attrib.update({"numFmtId": str(format_id), "fontId": "0", "fillId": "0", "borderId": "0", "xfId": "0", "applyNumberFormat": "1"})
+            xfs.append(xf)
+            indexes[value_type] = len(xfs) - 1
+    cell_xfs.set("count", str(len(xfs)))
+    return indexes
+
+
+def _write_sheet(old_part, rows, path, date_styles, chunk_rows):
+    """
+    Writes a worksheet part to path with the given rows as its cell data and
+    everything else taken from old_part. Returns the number of rows written.
+    """
+    head, middle, tail = _sheet_frame(old_part)
+    written = last_row = last_column = 0
+    with open(path, "wb") as out:
+        out.write(head.encode("utf-8"))
+        dimension_offset = out.tell()
+        out.write(b" " * DIMENSION_SLOT)
+        out.write(middle.encode("utf-8"))
+        buffer = []
+        for row_number, row in enumerate(rows, start=1):
+            cells = [
+                _cell_xml(f"{COLUMN_LETTERS[column]}{row_number}", value, date_styles)
+                for column, value in enumerate(row, start=1)
+                if value is not None
+            ]
+            if cells:
+                buffer.append(f'<row r="{row_number}">{"".join(cells)}</row>')
+                written += 1
+                last_row = row_number
+                last_column = max(last_column, max(column for column, value in enumerate(row, start=1) if value is not None))
+            if len(buffer) >= chunk_rows:
+                out.write("".join(buffer).encode("utf-8"))
+                buffer = []
+        out.write("".join(buffer).encode("utf-8"))
+        out.write(tail.encode("utf-8"))
+
+        # Readers such as openpyxl scan the whole sheet when the dimension is missing
+        extent = f"A1:{COLUMN_LETTERS[last_column]}{last_row}" if written else "A1"
+        out.seek(dimension_offset)
+        out.write(f'<dimension ref="{extent}"/>'.encode("utf-8").ljust(DIMENSION_SLOT))
+    return written
+
+
+def _sheet_frame(old_part):
+    """
+    Returns the XML of a worksheet part before its dimension, between the
+    dimension and the cell data, and after the cell data.
+
+    The part is read with iterparse and each row dropped as soon as it has
+    been parsed, so a large existing sheet is never held in memory.
+    """
+    with old_part:
+        context = etree.iterparse(old_part, events=("end",), tag=_ss("row"), huge_tree=True)
+        for _, row in context:
+            row.clear()
+            while row.getprevious() is not None:
+                del row.getparent()[0]
+        root = context.root
+
+    sheet_data = root.find(_ss("sheetData"))
+    if sheet_data is None:
+        sheet_data = etree.Element(_ss("sheetData"))
+        # sheetData follows the sheet's properties, views, format and columns
+        previous = [child for child in root if etree.QName(child).localname in ("sheetPr", "dimension", "sheetViews", "sheetFormatPr", "cols")]
+        if previous:
+            previous[-1].addnext(sheet_data)
+        else:
+            root.insert(0, sheet_data)
+    sheet_data.clear()
+    sheet_data.text = SHEET_DATA_MARKER
+    dimension = root.find(_ss("dimension"))
+    if dimension is None:
+        dimension = etree.Element(_ss("dimension"))
+        sheet_pr = root.find(_ss("sheetPr"))
+        if sheet_pr is not None:
+            sheet_pr.addnext(dimension)
+        else:
+            root.insert(0, dimension)
+    dimension.attrib.clear()
+    dimension.set("ref", DIMENSION_MARKER)
+
+    xml = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True).decode("utf-8")
+    head, middle = re.split(f'<[^<>]*ref="{DIMENSION_MARKER}"/>', xml, maxsplit=1)
+    middle, tail = middle.split(SHEET_DATA_MARKER, 1)
+    return head, middle, tail
+
+
+def _cell_xml(reference, value, date_styles):
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        if value != value or value in (float("inf"), float("-inf")):
+            return f'<c r="{reference}" t="e"><v>#NUM!</v></c>'
+        return f'<c r="{reference}"><v>{repr(value) if isinstance(value, float) else value}</v></c>'
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        style = date_styles.get(type(value) if type(value) in DATE_FORMATS else datetime.datetime)
+        style = f' s="{style}"' if style is not None else ""
+        return f'<c r="{reference}"{style}><v>{to_excel(value)}</v></c>'
+    if isinstance(value, datetime.timedelta):
+        return f'<c r="{reference}"><v>{value.total_seconds() / 86400}</v></c>'
+    text = ILLEGAL_CHARACTERS_RE.sub("", str(value))
+    if text.startswith("#") and text in ERROR_VALUES:
+        return f'<c r="{reference}" t="e"><v>{escape(text)}</v></c>'
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    return f'<c r="{reference}" t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def add_fill_rules(source, sheet_name, rules, output):
+    """
+    Adds conditional formatting rules that always apply, each filling a set of
+    cell ranges, to a worksheet of a workbook.
+
+    The worksheet part is streamed to a temporary file up to the end of its
+    cell data and the rules are inserted into the short rest of it, so cells
+    are never parsed or held in memory. The styles part gets one
+    differential style per rule; every other part is copied over unchanged.
+    Rules are added after the sheet's own, earlier ones taking priority.
+
+    Parameters:
+    - source: Path or file-like object of the workbook
+    - sheet_name: Name of the worksheet
+    - rules: List of (ranges, fill): ranges like "A1:B5 D7", fill an openpyxl PatternFill
+    - output: Path or file-like object to save to
+    """
+    temp_dir = tempfile.mkdtemp()
+    try:
+        with OpcPackage(source) as package:
+            workbook_part = _workbook_part(package)
+            part = _sheet_parts(package, workbook_part).get(sheet_name)
+            if part is None:
+                raise ValueError(f"Workbook has no worksheet '{sheet_name}'")
+            dxf_ids = _add_dxfs(package, workbook_part, [fill for _, fill in rules])
+            temp_path = os.path.join(temp_dir, "sheet.xml")
+            _write_fill_rules(package.open(part), temp_path, [(ranges, dxf_id) for (ranges, _), dxf_id in zip(rules, dxf_ids)])
+            package.write_file(part, temp_path)
+            package.save(output)
+        return output
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _add_dxfs(package, workbook_part, fills):
+    """
+    Appends a differential style for each fill to the workbook's styles and returns their ids.
+    """
+    styles_part = next((rel.target for rel in package.relationships(workbook_part) if rel.type == RT_STYLES), None)
+    if styles_part is None:
+        raise ValueError("Workbook has no styles part")
+    styles = package.xml(styles_part)
+    dxfs = styles.find(_ss("dxfs"))
+    if dxfs is None:
+        dxfs = etree.Element(_ss("dxfs"))
+        previous = [child for child in styles if etree.QName(child).localname in BEFORE_DXFS]
+        if previous:
+            previous[-1].addnext(dxfs)
+        else:
+            styles.insert(0, dxfs)
+    first_id = len(dxfs.findall(_ss("dxf")))
+    for fill in fills:
+        dxf = tostring(DifferentialStyle(fill=fill).to_tree())
+        dxf = dxf.decode("utf-8") if isinstance(dxf, bytes) else dxf
+        dxfs.append(etree.fromstring(f'<dxfs xmlns="{SS}">{dxf}</dxfs>')[0])
+    dxfs.set("count", str(first_id + len(fills)))
+    return list(range(first_id, first_id + len(fills)))
+
+
+def _write_fill_rules(old_part, path, rules):
+    """
+    Copies a worksheet part to path with conditionalFormatting elements for
+    (ranges, dxf id) rules inserted after its cell data.
+    """
+    with old_part, open(path, "wb") as out:
+        buffer = old_part.read(COPY_CHUNK)
+        root = ROOT_TAG.search(buffer)
+        prefix = (root.group(1) + b":") if root and root.group(1) else b""
+        data_end = re.compile(rb"</" + re.escape(prefix) + rb"sheetData\s*>|<" + re.escape(prefix) + rb"sheetData\s*/>")
+        while True:
+            match = data_end.search(buffer)
+            if match is not None:
+                break
+            data = old_part.read(COPY_CHUNK)
+            if not data:
+                raise ValueError("Worksheet has no cell data element")
+            keep = min(len(buffer), 32)  # the end tag may be split between reads
+            out.write(buffer[:len(buffer) - keep])
+            buffer = buffer[len(buffer) - keep:] + data
+        out.write(buffer[:match.end()])
+        rest = buffer[match.end():] + old_part.read()
+
+        priority = max((int(value) for value in re.findall(rb'priority="(\d+)"', rest)), default=0)
+        tag = prefix.decode("utf-8")
+        elements = "".join(
+            f'<{tag}conditionalFormatting sqref="{ranges}">'
+            f'<{tag}cfRule type="expression" dxfId="{dxf_id}" priority="{priority + number}">'
+            f'<{tag}formula>TRUE</{tag}formula></{tag}cfRule></{tag}conditionalFormatting>'
+            for number, (ranges, dxf_id) in enumerate(rules, start=1)
+        ).encode("utf-8")
+        following = re.compile(
+            rb"<" + re.escape(prefix) + rb"(?:" + b"|".join(name.encode() for name in AFTER_CONDITIONAL_FORMATTING)
+            + rb")[\s/>]|</" + re.escape(prefix) + rb"worksheet\s*>"
+        ).search(rest)
+        if following is None:
+            raise ValueError("Worksheet XML is incomplete")
+        out.write(rest[:following.start()] + elements + rest[following.start():])
+
+
+def _drop_calc_chain(package, workbook_part):
+    """
+    Removes the calculation chain and asks Excel to recalculate everything on open.
+    """
+    for rel in package.relationships(workbook_part):
+        if rel.type == RT_CALC_CHAIN:
+            package.drop_relationship(workbook_part, rel.rId)
+            if package.exists(rel.target):
+                package.remove(rel.target)
+    workbook = package.xml(workbook_part)
+    calc_pr = workbook.find(_ss("calcPr"))
+    if calc_pr is None:
+        calc_pr = etree.SubElement(workbook, _ss("calcPr"))
+        # calcPr goes before the elements that may follow it in the schema
+        following = [child for child in workbook if etree.QName(child).localname in ("oleSize", "customWorkbookViews", "pivotCaches", "smartTagPr", "smartTagTypes", "webPublishing", "fileRecoveryPr", "webPublishObjects", "extLst")]
+        if following:
+            following[0].addprevious(calc_pr)
+    calc_pr.set("fullCalcOnLoad", "1")
@@ -0,0 +1,157 @@
+import os
+import json
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from converterpool import get_pool
+from pdfcache import deck_key
+from ppttopdf import count_slides, slice_deck
+
+try:
+    import pymupdf
+except ImportError:  # optional PDF rasterizer; poppler's pdftoppm is used otherwise
+    pymupdf = None
+
+logger = logging.getLogger(__name__)
+
+THUMB_DIR = os.environ.get("THUMBNAIL_DIR", os.path.join(tempfile.gettempdir(), "automation_hub_thumbnails"))
+THUMB_WIDTH = 320  # pixels
+THUMB_CHUNK_SLIDES = 10  # slides converted per job, so thumbnails appear a few at a time
+RENDER_VERSION = "1"
+DONE_MARKER = "done.json"
+
+
+class ThumbnailError(Exception):
+    """Raised when thumbnails cannot be rendered."""
+
+
+class ThumbnailJob:
+    """
+    Thumbnails of one deck, rendered in the background into a cache directory
+    named after the deck's content hash.
+
+    Thumbnails become available one chunk of slides at a time; paths()
+    returns None for the slides still being rendered.
+    """
+
+    def __init__(self, key, slide_count, directory):
+        self.key = key
+        self.slide_count = slide_count
+        self.directory = directory
+        self.error = None
+        self.future = None
+
+    def path(self, number):
+        return os.path.join(self.directory, f"slide{number:04d}.png")
+
+    def paths(self):
+        """
+        Returns the thumbnail path of every slide, or None where it is not rendered yet.
+        """
+        return [path if os.path.exists(path) else None for path in map(self.path, range(1, self.slide_count + 1))]
+
+    @property
+    def done(self):
+        return self.error is not None or os.path.exists(os.path.join(self.directory, DONE_MARKER))
+
+
+_executor = None
+_jobs = {}
+_lock = threading.Lock()
+
+
+def request_thumbnails(pptx_path, width=THUMB_WIDTH):
+    """
+    Returns the ThumbnailJob of a deck, starting to render it in the background if needed.
+
+    Jobs are keyed by the deck's normalized content hash (see pdfcache.deck_key),
+    so the same deck uploaded again, even under another name, is served from
+    the cache. A job that failed is started again on the next request.
+    """
+    key = deck_key(pptx_path, {"thumbnails": width, "version": RENDER_VERSION})
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None and job.error is None:
+            return job
+        job = ThumbnailJob(key, count_slides(pptx_path), os.path.join(THUMB_DIR, key))
+        _jobs[key] = job
+        if not job.done:
+            os.makedirs(job.directory, exist_ok=True)
+            job.future = _get_executor().submit(_render, job, pptx_path, width)
+        return job
+
+
+def _get_executor():
+    # One background thread: thumbnails use one converter worker at a time and leave the rest for conversions
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+    return _executor
+
+
+def _render(job, pptx_path, width):
+    try:
+        pool = get_pool()
+        for first in range(1, job.slide_count + 1, THUMB_CHUNK_SLIDES):
+            numbers = list(range(first, min(first + THUMB_CHUNK_SLIDES - 1, job.slide_count) + 1))
+            if all(os.path.exists(job.path(number)) for number in numbers):
+                continue  # rendered by an earlier, interrupted run
+            chunk_deck = slice_deck(pptx_path, numbers, show_hidden=True)
+            try:
+                chunk_pdf = pool.convert(chunk_deck)
+                try:
+                    rasterize_pdf(chunk_pdf, [job.path(number) for number in numbers], width)
+                finally:
+                    os.remove(chunk_pdf)
+            finally:
+                os.remove(chunk_deck)
+        with open(os.path.join(job.directory, DONE_MARKER), "w") as f:
+            json.dump({"slides": job.slide_count, "width": width}, f)
+    except Exception as e:
+        logger.error(f"Rendering thumbnails for {pptx_path} failed: {str(e)}")
+        job.error = str(e)
+
+
+def rasterize_pdf(pdf_path, image_paths, width=THUMB_WIDTH):
+    """
+    Renders each page of a PDF to a PNG of the given width, one page per path in image_paths.
+
+    Uses PyMuPDF when it is installed and poppler's pdftoppm otherwise. Each
+    image is written under a temporary name first, so a path either does not
+    exist or holds a complete image.
+    """
+    if pymupdf is not None:
+        with pymupdf.open(pdf_path) as document:
+            _check_page_count(len(document), image_paths)
+            for page, image_path in zip(document, image_paths):
+                zoom = width / page.rect.width
+                temp_path = f"{image_path}.tmp.png"
+                page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom)).save(temp_path)
+                os.replace(temp_path, image_path)
+        return
+
+    pdftoppm = shutil.which("pdftoppm")
+    if not pdftoppm:
+        raise ThumbnailError("Rendering thumbnails needs PyMuPDF or poppler's pdftoppm")
+    temp_dir = tempfile.mkdtemp(dir=os.path.dirname(image_paths[0]) or None)
+    try:
+        subprocess.run(
+            [pdftoppm, "-png", "-scale-to-x", str(width), "-scale-to-y", "-1", pdf_path, os.path.join(temp_dir, "page")],
+            capture_output=True,
+            check=True,
+        )
+        # pdftoppm pads page numbers to the width of the page count
+        pages = sorted(os.listdir(temp_dir), key=lambda name: int(name.rsplit("-", 1)[1].split(".")[0]))
+        _check_page_count(len(pages), image_paths)
+        for page, image_path in zip(pages, image_paths):
+            os.replace(os.path.join(temp_dir, page), image_path)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def _check_page_count(page_count, image_paths):
+    if page_count != len(image_paths):
+        raise ThumbnailError(f"Expected {len(image_paths)} pages, got {page_count}")
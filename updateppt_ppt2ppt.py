@@ -1,168 +1,262 @@
-import win32com.client
-import pythoncom
+import copy
+import logging
 import tempfile
-import os
-import time
+from lxml import etree
+from opcpackage import (
+    CT_NOTES_SLIDE,
+    CT_SLIDE,
+    NS,
+    PRESENTATION,
+    RT_NOTES_SLIDE,
+    RT_SLIDE,
+    OpcPackage,
+    partname_template,
+    qn,
+    relative_target,
+    rels_name,
+    resolve_target,
+)
+
+logger = logging.getLogger(__name__)
+
+# Relationships to parts that belong to one slide, so a duplicate gets its own copies
+OWNED_RELATIONSHIPS = ("/chart", "/chartUserShapes", "/chartStyle", "/chartColorStyle", "/package", "/oleObject")
 
 def process(ppt_file, slides_to_update, new_order):
     """
-    Updates the order of specific slides in a PowerPoint file.
-    
+    Updates the order of slides in a PowerPoint file.
+
+    With slides_to_update filled in, each listed slide is moved to the
+    position at the same place in new_order and the other slides keep their
+    relative order. With slides_to_update left blank, new_order is the full
+    target order of the deck: slides left out are deleted and slides listed
+    more than once are duplicated. Ranges such as "4-7" are accepted.
+
     Parameters:
         ppt_file (BytesIO): Uploaded PowerPoint file.
-        slides_to_update (str): Comma-separated string of slide numbers to update.
+        slides_to_update (str): Comma-separated string of slide numbers to update, or blank.
         new_order (str): Comma-separated string representing the new order of slides.
-    
+
     Returns:
         str: Path to the updated PowerPoint file or error message.
     """
-    # Initialize PowerPoint application and presentation variables
-    pptApp = None
-    presentation = None
-    
     try:
-        # Initialize COM
-        pythoncom.CoInitialize()
-        
-        # Parse inputs
-        try:
-            slides_to_update = [int(x.strip()) for x in slides_to_update.split(',')]
-            new_order_indices = [int(x.strip()) for x in new_order.split(',')]
-            
-            # Validate that both lists have the same length
-            if len(slides_to_update) != len(new_order_indices):
-                raise ValueError("The number of slides to update and new positions must match.")
-        except ValueError as e:
-            return f"Error parsing input: {str(e)}"
-        
         # Save uploaded PPT as a temporary file
         with tempfile.NamedTemporaryFile(delete=False, suffix=".pptx") as temp_ppt:
             temp_ppt.write(ppt_file.read())
             temp_ppt_path = temp_ppt.name
             print(f"Temporary PPT saved at: {temp_ppt_path}")  # Debugging line
 
-        # Create PowerPoint Application
-        pptApp = win32com.client.Dispatch("PowerPoint.Application")
-        pptApp.Visible = True  # Run PowerPoint in foreground for better stability
-        
-        # Allow PowerPoint to fully initialize
-        time.sleep(1)
-
-        # Open the PPT - explicitly setting ReadOnly to False to ensure we can modify it
-        presentation = pptApp.Presentations.Open(temp_ppt_path, ReadOnly=False, WithWindow=True)
-        time.sleep(0.5)  # Give PowerPoint time to fully load the presentation
-        
-        slides = presentation.Slides
-        num_slides = slides.Count
-        
-        print(f"Presentation loaded with {num_slides} slides")  # Debugging line
-        
-        # Validate slide indices
-        if max(slides_to_update) > num_slides or min(slides_to_update) < 1:
-            return f"Error: Slide indices out of range. Presentation has {num_slides} slides."
-        
-        if max(new_order_indices) > num_slides or min(new_order_indices) < 1:
-            return f"Error: New order indices out of range. Presentation has {num_slides} slides."
-        
-        # METHOD 1: Using MoveTo approach (simpler and more reliable)
-        # Create a copy of the presentation to avoid reference issues
-        temp_save_path = temp_ppt_path.replace(".pptx", "_temp.pptx")
-        presentation.SaveAs(temp_save_path)
-        presentation.Close()
-        time.sleep(0.5)
-        
-        # Reopen the presentation to ensure fresh object references
-        presentation = pptApp.Presentations.Open(temp_save_path, ReadOnly=False, WithWindow=True)
-        slides = presentation.Slides
-        
-        # Check if we have a valid window reference
-        if presentation.Windows.Count > 0:
-            presentation.Windows(1).Activate()
-        
-        # Process slide moves one at a time
-        # Sort by source position (reverse) if moving backward to avoid index conflicts
-        move_list = list(zip(slides_to_update, new_order_indices))
-        
-        # Different sorting strategies depending on direction of movement
-        moving_forward = [pair for pair in move_list if pair[0] < pair[1]]
-        moving_backward = [pair for pair in move_list if pair[0] > pair[1]]
-        staying_same = [pair for pair in move_list if pair[0] == pair[1]]
-        
-        # Process slides that are moving backward first (sorted by source in descending order)
-        for old_idx, new_idx in sorted(moving_backward, key=lambda x: x[0], reverse=True):
-            print(f"Moving slide {old_idx} to position {new_idx}")
-            try:
-                # Check if slide exists before attempting to move it
-                slide = slides(old_idx)
-                slide.MoveTo(new_idx)
-                time.sleep(0.2)  # Add small delay between operations
-            except Exception as e:
-                print(f"Error moving slide {old_idx} to {new_idx}: {str(e)}")
-                raise
-        
-        # Then process slides that are moving forward (sorted by source in ascending order)
-        for old_idx, new_idx in sorted(moving_forward, key=lambda x: x[0]):
-            print(f"Moving slide {old_idx} to position {new_idx}")
+        with OpcPackage(temp_ppt_path) as package:
+            sldIdLst = package.xml(PRESENTATION).find("p:sldIdLst", NS)
+            slide_count = len(sldIdLst) if sldIdLst is not None else 0
+            logger.debug(f"Presentation loaded with {slide_count} slides")
+
+            # Parse and validate inputs before touching the deck
             try:
-                # Due to previous movements, we need to recalculate the current position
-                # of the slide that was originally at old_idx
-                slide_to_move = None
-                for i in range(1, slides.Count + 1):
-                    if i not in [pair[1] for pair in moving_backward]:
-                        if i == old_idx:
-                            slide_to_move = i
-                            break
-                
-                if slide_to_move is not None:
-                    slides(slide_to_move).MoveTo(new_idx)
-                    time.sleep(0.2)  # Add small delay between operations
-            except Exception as e:
-                print(f"Error moving slide {old_idx} to {new_idx}: {str(e)}")
-                raise
-        
-        # Save the updated file
-        updated_ppt_path = temp_ppt_path.replace(".pptx", "_updated.pptx")
-        presentation.SaveAs(updated_ppt_path)
-        time.sleep(0.5)  # Give time to save
-        
-        # Close and clean up
-        presentation.Close()
-        pptApp.Quit()
-        
-        # Clean up temporary files
-        try:
-            os.remove(temp_save_path)
-        except:
-            pass
-            
-        # Always clean up COM resources
-        pythoncom.CoUninitialize()
-        
-        # Return the path to the updated PowerPoint file
+                if slides_to_update and str(slides_to_update).strip():
+                    order = moves_to_order(slide_count, parse_slide_list(slides_to_update), parse_slide_list(new_order))
+                else:
+                    order = parse_slide_list(new_order)
+                validate_order(order, slide_count)
+            except ValueError as e:
+                return f"Error parsing input: {str(e)}"
+
+            logger.debug(f"Applying slide order {order}")
+            apply_order(package, order)
+            updated_ppt_path = temp_ppt_path.replace(".pptx", "_updated.pptx")
+            package.save(updated_ppt_path)
+
         return updated_ppt_path
 
     except Exception as e:
-        # Log the detailed error
         error_msg = f"Error: {str(e)}"
         print(error_msg)
-        
-        # Clean up resources
-        try:
-            if presentation is not None:
-                presentation.Close()
-        except:
-            pass
-            
-        try:
-            if pptApp is not None:
-                pptApp.Quit()
-        except:
-            pass
-            
-        # Make sure to uninitialize COM even if there's an error
-        try:
-            pythoncom.CoUninitialize()
-        except:
-            pass
-            
-        return error_msg
\ No newline at end of file
+        return error_msg
+
+def parse_slide_list(text):
+    """
+    Parses "3, 1, 4-6" into [3, 1, 4, 5, 6]; descending ranges like "6-4" are allowed.
+    """
+    if isinstance(text, (list, tuple)):
+        return [int(x) for x in text]
+    numbers = []
+    for item in str(text).split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if "-" in item[1:]:
+            start, end = (int(x) for x in item.split("-", 1))
+            step = 1 if end >= start else -1
+            numbers.extend(range(start, end + step, step))
+        else:
+            numbers.append(int(item))
+    return numbers
+
+def moves_to_order(slide_count, slides_to_update, new_positions):
+    """
+    Turns "move slide X to position Y" pairs into the full target order of the deck.
+
+    Moved slides land exactly at their target positions; the remaining
+    slides fill the other positions in their original relative order.
+    """
+    if len(slides_to_update) != len(new_positions):
+        raise ValueError("The number of slides to update and new positions must match.")
+    if len(set(slides_to_update)) != len(slides_to_update):
+        raise ValueError("Each slide can only be moved once.")
+    if len(set(new_positions)) != len(new_positions):
+        raise ValueError("Two slides cannot be moved to the same position.")
+    for number in list(slides_to_update) + list(new_positions):
+        if number < 1 or number > slide_count:
+            raise ValueError(f"Slide {number} is out of range. Presentation has {slide_count} slides.")
+
+    order = [None] * slide_count
+    for slide, position in zip(slides_to_update, new_positions):
+        order[position - 1] = slide
+    moved = set(slides_to_update)
+    remaining = iter(number for number in range(1, slide_count + 1) if number not in moved)
+    return [slide if slide is not None else next(remaining) for slide in order]
+
+def validate_order(order, slide_count):
+    """
+    Checks a full target order: it must not be empty and may only name existing slides.
+    """
+    if not order:
+        raise ValueError("The new order must keep at least one slide.")
+    out_of_range = sorted({number for number in order if number < 1 or number > slide_count})
+    if out_of_range:
+        raise ValueError(f"Slides {out_of_range} are out of range. Presentation has {slide_count} slides.")
+
+def apply_order(package, order):
+    """
+    Rewrites the slide list of an open package in one pass to the given order.
+
+    The first occurrence of a slide number keeps the original slide, later
+    occurrences become copies (with their own notes), and slides not listed
+    are deleted along with any parts only they used. Sections are kept in
+    step with the new order.
+    """
+    presentation = package.xml(PRESENTATION)
+    sldIdLst = presentation.find("p:sldIdLst", NS)
+    entries = list(sldIdLst)
+    next_id = max([int(entry.get("id")) for entry in entries] + [255]) + 1
+
+    placed = []
+    used = set()
+    for number in order:
+        entry = entries[number - 1]
+        if number not in used:
+            used.add(number)
+        else:
+            entry = duplicate_slide(package, entry, next_id)
+            next_id += 1
+        placed.append((entry, entries[number - 1].get("id")))
+
+    for entry in entries:
+        sldIdLst.remove(entry)
+    for entry, _ in placed:
+        sldIdLst.append(entry)
+
+    for number, entry in enumerate(entries, start=1):
+        if number not in used:
+            package.drop_relationship(PRESENTATION, entry.get(qn("r:id")))
+    if len(used) < len(entries):
+        removed = package.prune()
+        logger.debug(f"Removed {len(removed)} unused parts")
+
+    update_sections(presentation, placed)
+
+def duplicate_slide(package, entry, new_id):
+    """
+    Copies the slide of a p:sldId entry (and its notes) and returns the p:sldId entry of the copy.
+    Charts and embedded objects are copied too, so editing one slide's chart leaves the other alone.
+    """
+    slide_part = package.related(PRESENTATION, entry.get(qn("r:id")))
+    new_part = package.next_partname("ppt/slides/slide%d.xml")
+    package.copy_part(slide_part, new_part, CT_SLIDE)
+    copy_owned_parts(package, new_part)
+
+    for rel in list(package.rels_xml(new_part)):
+        if rel.get("Type") == RT_NOTES_SLIDE:
+            notes_part = package.related(slide_part, rel.get("Id"))
+            new_notes = package.next_partname("ppt/notesSlides/notesSlide%d.xml")
+            package.copy_part(notes_part, new_notes, CT_NOTES_SLIDE)
+            rel.set("Target", relative_target(new_part, new_notes))
+            # The copied notes must point back at the copied slide
+            for notes_rel in package.rels_xml(new_notes):
+                if notes_rel.get("Type") == RT_SLIDE:
+                    notes_rel.set("Target", relative_target(new_notes, new_part))
+        elif rel.get("Type").endswith("/comments"):
+            # Comments belong to the original slide only
+            rel.getparent().remove(rel)
+
+    new_entry = copy.deepcopy(entry)
+    new_entry.set("id", str(new_id))
+    new_entry.set(qn("r:id"), package.add_relationship(PRESENTATION, RT_SLIDE, new_part))
+    return new_entry
+
+def copy_owned_parts(package, part, copied=None):
+    """
+    Points a copied part's chart, embedding and OLE object relationships at new
+    copies of their targets, and does the same for the copies' own relationships.
+    """
+    copied = {} if copied is None else copied  # original part -> its copy
+    if not package.exists(rels_name(part)):
+        return
+    for rel in package.rels_xml(part):
+        if rel.get("TargetMode") == "External" or not rel.get("Type", "").endswith(OWNED_RELATIONSHIPS):
+            continue
+        target = resolve_target(part, rel.get("Target"))
+        if target not in copied:
+            copied[target] = package.next_partname(partname_template(target))
+            package.copy_part(target, copied[target], package.content_type(target))
+            copy_owned_parts(package, copied[target], copied)
+        rel.set("Target", relative_target(part, copied[target]))
+
+def update_sections(presentation, placed):
+    """
+    Rebuilds the PowerPoint 2010 section list for the new slide order.
+
+    Each slide stays in the section of the slide it came from. Sections must
+    be contiguous, so a slide whose section already ended earlier in the new
+    order joins the section of the slide before it instead. Sections left
+    without slides are kept, empty, at the end.
+
+    Parameters:
+    - presentation: Root element of ppt/presentation.xml
+    - placed: (p:sldId entry, id of the slide it came from) in the new order
+    """
+    section_list = presentation.find(".//p14:sectionLst", NS)
+    if section_list is None:
+        return
+    sections = section_list.findall("p14:section", NS)
+    if not sections:
+        return
+    section_of = {}
+    for section in sections:
+        for sldId in section.findall("p14:sldIdLst/p14:sldId", NS):
+            section_of[sldId.get("id")] = section
+
+    members = {section: [] for section in sections}
+    appearance = []
+    current = None
+    for entry, source_id in placed:
+        section = section_of.get(source_id, current if current is not None else sections[0])
+        if section is not current and section in appearance:
+            section = current
+        if section not in appearance:
+            appearance.append(section)
+        current = section
+        members[section].append(entry.get("id"))
+
+    for section in sections:
+        section_list.remove(section)
+        sldIdLst = section.find("p14:sldIdLst", NS)
+        if sldIdLst is None:
+            sldIdLst = etree.SubElement(section, qn("p14:sldIdLst"))
+        for sldId in list(sldIdLst):
+            sldIdLst.remove(sldId)
+        for slide_id in members[section]:
+            etree.SubElement(sldIdLst, qn("p14:sldId")).set("id", slide_id)
+    for section in appearance + [section for section in sections if section not in appearance]:
+        section_list.append(section)
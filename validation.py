@@ -1,86 +1,149 @@
-import xlwings as xw
 import pandas as pd
-import tempfile
+import numpy as np
+import openpyxl
 import time
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill
+from openpyxl.utils import get_column_letter
 import logging
 import io
 import traceback
+from formulacheck import scan_sheet
+from sharding import map_blocks
+from sheettransfer import add_fill_rules
+from validationrules import (
+    GLOBAL_CHECKS, RULES_SHEET, SAMPLE_SIZE, RuleContext, compile_rules, evaluate_rules, load_rules,
+    reference_sets, violation_cells,
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def process(validation_file):
+ERROR_FILL = PatternFill(start_color="FFFF0000", end_color="FFFF0000", fill_type="solid")
+RULE_FILL = PatternFill(start_color="FFFFC000", end_color="FFFFC000", fill_type="solid")
+FORMULA_FILL = PatternFill(start_color="FFB4A7D6", end_color="FFB4A7D6", fill_type="solid")
+
+def process(validation_file, rules_file=None):
     """
     Performs validation checks on the given Excel file.
-    Identifies missing values, formula inconsistencies, and generates a validation report.
-    Highlights error cells in the original file.
-    Returns bytes of the report file, or an error message within bytes.
+    Identifies missing values, evaluates validation rules and generates a validation report.
+    Flags formulas that break the pattern of their column (see formulacheck.scan_sheet).
+    Highlights error cells in a copy of the original file: missing values in red, rule violations
+    in orange and formula issues in purple.
+    Rules come from rules_file (YAML, JSON or a workbook) or from a "Rules" sheet in the file itself;
+    see validationrules.load_rules. The data is the first sheet that is not the rules sheet.
+    The data sheet is checked in blocks of rows across worker processes (see validate_sheet), and
+    the workbook is never loaded whole.
+    Returns a (report bytes, highlighted workbook bytes) tuple, or an error message within bytes.
     """
     output = io.BytesIO()  # Initialize output as BytesIO
 
     try:
         start_time = time.time()
+        data = validation_file.read()
+
+        # Cached values are validated; the formula check reads the formulas
+        values_wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+        try:
+            sheet_name = next(name for name in values_wb.sheetnames if name != RULES_SHEET)
+            sheet = values_wb[sheet_name]
+            origin = (sheet.min_row or 1, sheet.min_column or 1)
+            columns = list(next(sheet.iter_rows(
+                min_row=origin[0], max_row=origin[0], min_col=origin[1], max_col=sheet.max_column, values_only=True,
+            ), ()))
+
+            if rules_file is not None:
+                rules = load_rules(rules_file)
+            elif RULES_SHEET in values_wb.sheetnames:
+                rules = load_rules(values_wb[RULES_SHEET])
+            else:
+                rules = []
+            compiled = compile_rules(rules, columns)
 
-        # Save uploaded file to a temporary location
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx") as temp_file:
-            temp_file.write(validation_file.read())
-            temp_file_path = temp_file.name
+            def load_sheet(name):
+                if name not in values_wb.sheetnames:
+                    raise ValueError(f"Referenced sheet '{name}' not found")
+                return read_sheet(values_wb[name])[0]
 
-        # Open the workbook
-        wb = xw.Book(temp_file_path)
-        sheet = wb.sheets[0]
+            result = validate_sheet(sheet, columns, rules, reference_sets(compiled, load_sheet), origin)
+        finally:
+            values_wb.close()
 
-        # Read data into DataFrame
-        data = sheet.used_range.value
-        df = pd.DataFrame(data[1:], columns=data[0])
+        missing_values = int(result["missing"].sum())
+        invalid_rows = result["invalid_rows"]
+        rule_results = result["rule_results"]
+        rectangles = result["rectangles"]
+        rule_rectangles = result["rule_rectangles"]
 
-        # Identify missing values
-        missing_values = df.isnull().sum().sum()
-        invalid_rows = df[df.isnull().any(axis=1)]
+        formula_wb = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=False)
+        try:
+            formula_findings = scan_sheet(formula_wb[sheet_name])
+        finally:
+            formula_wb.close()
+        formula_rectangles = [
+            (finding["row"] - origin[0] - 1, finding["column"] - origin[1]) * 2 for finding in formula_findings
+        ]
 
         # Highlight error cells
-        red_fill = xw.utils.rgb_to_int((255, 0, 0))
-        for index, row in invalid_rows.iterrows():
-            for col_name, value in row.items():
-                if pd.isnull(value):
-                    col_index = df.columns.get_loc(col_name) + 1
-                    row_index = index + 2
-                    sheet.range(row_index, col_index).color = red_fill
+        highlighted_bytes = highlight_rectangles(
+            data,
+            [(rectangles, ERROR_FILL), (rule_rectangles, RULE_FILL), (formula_rectangles, FORMULA_FILL)],
+            (origin[0] + 1, origin[1]),
+            sheet_name,
+        )
+
+        execution_time = round(time.time() - start_time, 2)
 
         # Create validation report
-        report_wb = Workbook()
-        report_ws = report_wb.active
-        report_ws.title = "Validation Report"
+        report_wb = Workbook(write_only=True)
+        report_ws = report_wb.create_sheet("Validation Report")
 
         report_ws.append(["Validation Summary"])
-        report_ws.append(["File Name", "Uploaded File"])
-        report_ws.append(["Total Rows", df.shape[0]])
+        report_ws.append(["File Name", getattr(validation_file, "name", "Uploaded File")])
+        report_ws.append(["Total Rows", result["rows"]])
         report_ws.append(["Missing Values", missing_values])
         report_ws.append(["Invalid Rows", len(invalid_rows)])
+        report_ws.append(["Rules Checked", len(rule_results)])
+        report_ws.append(["Rule Violations", sum(result["violations"] for result in rule_results)])
+        report_ws.append(["Formula Issues", len(formula_findings)])
+        report_ws.append(["Highlighted Ranges", len(rectangles) + len(rule_rectangles) + len(formula_rectangles)])
+        report_ws.append(["Execution Time (s)", execution_time])
         report_ws.append([])
 
-        if not invalid_rows.empty:
+        if missing_values:
+            report_ws.append(["Missing Values by Column"])
+            for column, count in zip(columns, result["missing"]):
+                if count:
+                    report_ws.append([column, int(count)])
+            report_ws.append([])
+
+        if invalid_rows:
             report_ws.append(["Invalid Rows Data"])
-            for row in invalid_rows.itertuples(index=False, name=None):
-                report_ws.append(row)
+            report_ws.append(["Row"] + columns)
+            for position, values in invalid_rows:
+                report_ws.append([origin[0] + 1 + position] + list(values))
+
+        if rule_results:
+            write_rule_results(report_wb, rule_results, origin[0] + 1)
+
+        if formula_findings:
+            formula_ws = report_wb.create_sheet("Formula Check")
+            formula_ws.append(["Cell", "Issue", "Content", "Expected", "Expected As In", "Run"])
+            for finding in formula_findings:
+                formula_ws.append([
+                    finding["cell"], finding["issue"], str(finding["content"]),
+                    finding["expected"], finding["expected_cell"], finding["run"],
+                ])
 
         # Save the report to BytesIO
         report_wb.save(output)
         output.seek(0)
         report_bytes = output.read()
 
-        wb.save(temp_file_path)
-        wb.close()
-
-        end_time = time.time()
-        execution_time = round(end_time - start_time, 2)
-
         file_size = len(report_bytes)
-        logging.info(f"Report file size: {file_size} bytes")
+        logging.info(f"Report file size: {file_size} bytes; {len(rectangles)} ranges highlighted in {execution_time}s")
 
-        return report_bytes  # Return report bytes
+        return report_bytes, highlighted_bytes  # Return report and highlighted workbook bytes
 
     except Exception as e:
         error_message = f"Error in validation automation: {str(e)}\n{traceback.format_exc()}"
@@ -91,4 +154,210 @@ def process(validation_file):
         with pd.ExcelWriter(error_output, engine='openpyxl') as writer:
             error_df.to_excel(writer, index=False, sheet_name='Error')
         error_output.seek(0)
-        return error_output.read()
\ No newline at end of file
+        return error_output.read()
+
+def validate_sheet(sheet, columns, rules, references, origin, workers=None):
+    """
+    Finds missing values and rule violations in the rows below a worksheet's header.
+
+    The rows are read in blocks (see sharding.map_blocks), each checked in a
+    worker process by validate_block, and the partial results are merged in
+    sheet order, so counts, samples and ranges are the same for any number of
+    workers. Checks that compare rows with each other (GLOBAL_CHECKS) come
+    back from the blocks as value codes and are decided here over all rows.
+
+    Parameters:
+    - sheet: openpyxl worksheet opened with read_only=True and data_only=True
+    - columns: Header of the table
+    - rules: Rule dicts (see validationrules.load_rules), compiled again in each worker
+    - references: Reference values as returned by validationrules.reference_sets
+    - origin: 1-based (row, column) of the header's first cell
+    - workers: Maximum number of worker processes
+
+    Returns:
+    - dict with rows, missing (count per column), invalid_rows ((position, values) of the
+      rows with missing values), rectangles and rule_rectangles (see mask_rectangles) and
+      rule_results (see validationrules.evaluate_rules, without masks)
+    """
+    compiled = compile_rules(rules, columns)
+    local = [index for index, rule in enumerate(compiled) if rule.check not in GLOBAL_CHECKS]
+    keys = {index: ({}, []) for index, rule in enumerate(compiled) if rule.check in GLOBAL_CHECKS}  # value ids, codes per block
+    result = {
+        "rows": 0,
+        "missing": np.zeros(len(columns), dtype=np.int64),
+        "invalid_rows": [],
+        "rectangles": [],
+        "rule_rectangles": [],
+        "rule_results": [
+            {"name": rule.name, "check": rule.check, "column": rule.column, "columns": rule.columns,
+             "violations": 0, "samples": [], "values": []}
+            for rule in compiled
+        ],
+    }
+    if not columns:
+        return result
+
+    blocks = map_blocks(
+        sheet, validate_block, (columns, rules, references, origin[0] + 1),
+        min_row=origin[0] + 1, min_col=origin[1], max_col=origin[1] + len(columns) - 1, workers=workers,
+    )
+    for part in blocks:
+        offset = part["offset"]
+        result["rows"] += part["rows"]
+        result["missing"] += part["missing"]
+        result["invalid_rows"] += part["invalid_rows"]
+        result["rectangles"] += part["rectangles"]
+        result["rule_rectangles"] += part["rule_rectangles"]
+        for index, partial in zip(local, part["rule_results"]):
+            merged = result["rule_results"][index]
+            merged["violations"] += partial["violations"]
+            room = SAMPLE_SIZE - len(merged["samples"])
+            merged["samples"] += [offset + position for position in partial["samples"][:room]]
+            merged["values"] += partial["values"][:room]
+        for index, (codes, values) in zip(keys, part["keys"]):
+            ids, block_codes = keys[index]
+            lookup = np.array([ids.setdefault(value, len(ids)) for value in values] + [-1], dtype=np.int64)
+            block_codes.append(lookup[codes])
+
+    positions = {column: position for position, column in enumerate(columns)}
+    for index, (ids, block_codes) in keys.items():
+        codes = np.concatenate(block_codes) if block_codes else np.zeros(0, dtype=np.int64)
+        counts = np.bincount(codes[codes >= 0], minlength=len(ids) + 1)
+        mask = (codes >= 0) & (counts[np.maximum(codes, 0)] > 1)
+        violations = np.flatnonzero(mask)
+        texts = list(ids)
+        merged = result["rule_results"][index]
+        merged["violations"] = len(violations)
+        merged["samples"] = violations[:SAMPLE_SIZE].tolist()
+        merged["values"] = [(texts[codes[position]],) for position in merged["samples"]]
+        column = positions[compiled[index].column]
+        result["rule_rectangles"] += [
+            (first_row, column, last_row, column) for first_row, _, last_row, _ in mask_rectangles(mask[:, None])
+        ]
+    return result
+
+def validate_block(block, columns, rules, references, first_row):
+    """
+    Checks one block of rows (a sharding.Block) for missing values and rule violations.
+    Positions in the result count from first_row, the sheet row of the first data row.
+    """
+    df = pd.DataFrame(block.rows, columns=columns)
+    offset = block.first_row - first_row
+    mask = df.isna().to_numpy()
+    invalid = np.flatnonzero(mask.any(axis=1))
+
+    compiled = compile_rules(rules, columns)
+    rule_results = evaluate_rules([rule for rule in compiled if rule.check not in GLOBAL_CHECKS], df, references=references)
+    context = RuleContext(df)
+
+    def shift(rectangles):
+        return [(first + offset, first_col, last + offset, last_col) for first, first_col, last, last_col in rectangles]
+
+    return {
+        "offset": offset,
+        "rows": len(df),
+        "missing": mask.sum(axis=0),
+        "invalid_rows": [
+            (offset + int(position), tuple(None if pd.isna(value) else value for value in row))
+            for position, row in zip(invalid, df.iloc[invalid].itertuples(index=False, name=None))
+        ],
+        "rectangles": shift(mask_rectangles(mask)),
+        "rule_rectangles": shift(mask_rectangles(violation_cells(rule_results, columns))),
+        "rule_results": [
+            {"violations": partial["violations"], "samples": partial["samples"], "values": partial["values"]}
+            for partial in rule_results
+        ],
+        "keys": [context.present_text(rule.column) for rule in compiled if rule.check in GLOBAL_CHECKS],
+    }
+
+def write_rule_results(report_wb, rule_results, first_row):
+    """
+    Adds a Rule Results sheet (violations per rule) and a Rule Samples sheet
+    (the first violating rows of each rule with the values it checked).
+    """
+    results_ws = report_wb.create_sheet("Rule Results")
+    results_ws.append(["Rule", "Check", "Column", "Violations", "Sample Rows"])
+    for result in rule_results:
+        sample_rows = ", ".join(str(first_row + position) for position in result["samples"])
+        results_ws.append([result["name"], result["check"], result["column"], result["violations"], sample_rows])
+
+    samples_ws = report_wb.create_sheet("Rule Samples")
+    samples_ws.append(["Rule", "Row", "Values"])
+    for result in rule_results:
+        for position, values in zip(result["samples"], result["values"]):
+            samples_ws.append([result["name"], first_row + position] + [f"{column} = {value}" for column, value in zip(result["columns"], values)])
+
+def read_sheet(sheet):
+    """
+    Reads the used range of a worksheet into a DataFrame, with its first row as header.
+
+    Returns:
+    - (DataFrame, (row, column)) with the 1-based sheet position of the header's first cell
+    """
+    origin = (sheet.min_row or 1, sheet.min_column or 1)
+    rows = sheet.iter_rows(min_row=origin[0], min_col=origin[1], values_only=True)
+    header = next(rows, ())
+    df = pd.DataFrame(list(rows), columns=header)
+    return df, origin
+
+def mask_rectangles(mask):
+    """
+    Coalesces a 2D boolean mask into rectangles covering exactly its True cells.
+
+    Runs of consecutive True rows are found per column with one diff over the
+    whole mask; runs with the same rows in adjacent columns are then merged.
+
+    Returns:
+    - List of (first_row, first_col, last_row, last_col) tuples, 0-based and inclusive
+    """
+    if not mask.size or not mask.any():
+        return []
+    padded = np.zeros((mask.shape[1], mask.shape[0] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T
+    edges = np.diff(padded, axis=1)
+    start_cols, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)  # same column order as the starts
+    ends = ends - 1
+
+    # Order runs by their row span, then column, so mergeable runs are neighbours
+    order = np.lexsort((start_cols, ends, starts))
+    starts, ends, cols = starts[order], ends[order], start_cols[order]
+    new_rectangle = np.ones(len(cols), dtype=bool)
+    new_rectangle[1:] = (starts[1:] != starts[:-1]) | (ends[1:] != ends[:-1]) | (cols[1:] != cols[:-1] + 1)
+    firsts = np.flatnonzero(new_rectangle)
+    lasts = np.append(firsts[1:], len(cols)) - 1
+    return [
+        (int(starts[first]), int(cols[first]), int(ends[first]), int(cols[last]))
+        for first, last in zip(firsts, lasts)
+    ]
+
+def highlight_rectangles(data, layers, origin, sheet_name):
+    """
+    Returns the bytes of a workbook with cell rectangles filled.
+
+    Each layer's rectangles go into a single conditional formatting rule that
+    always applies, so no cell is styled one by one and the workbook's cell
+    styles are left as they are. Earlier layers take priority where they overlap.
+    The rules are written into the worksheet part as it is streamed (see
+    sheettransfer.add_fill_rules), so the workbook is never loaded whole.
+
+    Parameters:
+    - data: Bytes of the workbook
+    - layers: List of (rectangles, fill); rectangles as returned by mask_rectangles, relative to origin
+    - origin: 1-based (row, column) of the sheet cell at mask position (0, 0)
+    - sheet_name: Name of the sheet to highlight
+    """
+    rules = [
+        (" ".join(
+            f"{get_column_letter(origin[1] + first_col)}{origin[0] + first_row}:"
+            f"{get_column_letter(origin[1] + last_col)}{origin[0] + last_row}"
+            for first_row, first_col, last_row, last_col in rectangles
+        ), fill)
+        for rectangles, fill in layers
+        if rectangles
+    ]
+    if not rules:
+        return data
+    output = io.BytesIO()
+    add_fill_rules(io.BytesIO(data), sheet_name, rules, output)
+    return output.getvalue()
@@ -0,0 +1,484 @@
+import os
+import re
+import json
+import datetime
+import numpy as np
+import pandas as pd
+import openpyxl
+
+try:
+    import yaml
+except ImportError:  # optional; JSON rule files and rules sheets work without it
+    yaml = None
+
+# Python types of cell values by kind, for classifying mixed columns
+KINDS = {
+    "number": [int, float, np.int64, np.float64],
+    "text": [str],
+    "date": [datetime.datetime, datetime.date, pd.Timestamp],
+    "boolean": [bool, np.bool_],
+}
+
+RULES_SHEET = "Rules"
+SAMPLE_SIZE = 10  # violating rows listed per rule in the report
+# Checks that compare rows with each other, so a block of rows cannot decide them alone
+GLOBAL_CHECKS = {"unique"}
+
+TYPE_NAMES = {
+    "number": "number", "numeric": "number", "float": "number", "decimal": "number",
+    "int": "integer", "integer": "integer",
+    "str": "text", "string": "text", "text": "text",
+    "date": "date", "datetime": "date",
+    "bool": "boolean", "boolean": "boolean",
+}
+
+# Spellings accepted for each check, in rule files and rules sheets alike
+CHECK_ALIASES = {
+    "type": "type",
+    "not_null": "not_null", "required": "not_null",
+    "min": "min", "minimum": "min",
+    "max": "max", "maximum": "max",
+    "regex": "regex", "pattern": "regex",
+    "allowed": "allowed", "allowed_values": "allowed", "in": "allowed",
+    "unique": "unique",
+    "references": "references", "reference": "references", "lookup": "references",
+    "expr": "expr", "expression": "expr",
+}
+
+
+class RuleError(Exception):
+    """Raised when a rule set is invalid."""
+
+
+def load_rules(source):
+    """
+    Reads a rule set.
+
+    Rules can be given as a YAML or JSON file, one entry per column with any
+    of its checks, or per cross-column expression:
+
+        rules:
+          - column: Amount
+            type: number
+            not_null: true
+            min: 0
+          - column: Region
+            allowed: [EU, US, APAC]
+          - column: Entity
+            references: Entities!Entity
+          - name: Balanced
+            expr: Debit == Credit
+
+    or as a "Rules" sheet (or workbook) with columns Column, Check, Value and
+    an optional Name, one check per row. In a sheet, allowed values are
+    comma separated and a reference is written Sheet!Column.
+
+    Parameters:
+    - source: Path or file-like object of a .yaml/.yml/.json file or a workbook,
+      or an openpyxl worksheet holding the rules
+
+    Returns:
+    - List of rule dicts with name, column, check and value
+    """
+    if hasattr(source, "iter_rows"):
+        return _rules_from_sheet(source)
+    name = source if isinstance(source, str) else getattr(source, "name", "")
+    extension = os.path.splitext(name)[1].lower()
+    if extension in (".json", ".yaml", ".yml"):
+        text = open(source, "rb").read() if isinstance(source, str) else source.read()
+        if extension == ".json":
+            spec = json.loads(text)
+        elif yaml is None:
+            raise RuleError("Reading YAML rules needs PyYAML")
+        else:
+            spec = yaml.safe_load(text)
+        entries = spec.get("rules") if isinstance(spec, dict) else spec
+        if not isinstance(entries, list):
+            raise RuleError("Rule file must have a list of rules")
+        return _rules_from_entries(entries)
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook[RULES_SHEET] if RULES_SHEET in workbook.sheetnames else workbook.worksheets[0]
+        return _rules_from_sheet(sheet)
+    finally:
+        workbook.close()
+
+
+def _check_name(check):
+    key = str(check or "").strip().lower().replace(" ", "_").replace("-", "_")
+    if key not in CHECK_ALIASES:
+        raise RuleError(f"Unknown check: {check}")
+    return CHECK_ALIASES[key]
+
+
+def _rules_from_entries(entries):
+    rules = []
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise RuleError(f"Rule {number} must be a mapping")
+        column = entry.get("column")
+        name = entry.get("name")
+        checks = {key: value for key, value in entry.items() if key not in ("column", "name")}
+        if not checks:
+            raise RuleError(f"Rule {number} has no checks")
+        for check, value in checks.items():
+            check = _check_name(check)
+            if check in ("not_null", "unique") and value is False:
+                continue
+            rules.append({"name": name if name and len(checks) == 1 else _rule_name(name or column, check), "column": column, "check": check, "value": value})
+    return rules
+
+
+def _rules_from_sheet(sheet):
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(value).strip().lower() if value is not None else "" for value in next(rows, ())]
+    if "check" not in header:
+        raise RuleError(f"{sheet.title} sheet is missing column: Check")
+    rules = []
+    for row in rows:
+        row = dict(zip(header, row))
+        if row.get("check") in (None, ""):
+            continue
+        check = _check_name(row["check"])
+        column = row.get("column")
+        column = str(column).strip() if column not in (None, "") else None
+        value = row.get("value")
+        if check == "allowed" and isinstance(value, str):
+            value = [item.strip() for item in value.split(",")]
+        elif check in ("not_null", "unique") and value in (None, ""):
+            value = True
+        if check in ("not_null", "unique") and str(value).strip().lower() in ("false", "no", "0"):
+            continue
+        rules.append({"name": row.get("name") or _rule_name(column, check), "column": column, "check": check, "value": value})
+    return rules
+
+
+def _rule_name(column, check):
+    return f"{column} {check.replace('_', ' ')}" if column else check
+
+
+class Rule:
+    """
+    A rule compiled against a table's columns: a vectorized function of the
+    table returning a boolean mask of the violating rows.
+    """
+
+    def __init__(self, name, check, column, columns, function, references=()):
+        self.name = name
+        self.check = check
+        self.column = column
+        self.columns = columns  # columns highlighted for a violation
+        self.function = function
+        self.references = references  # (sheet, column) pairs whose values the rule looks up
+
+    def evaluate(self, context):
+        return np.asarray(self.function(context), dtype=bool)
+
+
+class RuleContext:
+    """
+    The table rules are evaluated against, with per-column conversions
+    (numbers, dates, text) computed once and shared by every rule.
+    references holds reference values already loaded (see reference_sets).
+    """
+
+    def __init__(self, df, load_sheet=None, references=None):
+        self.df = df
+        self.load_sheet = load_sheet
+        self._cache = {("reference", sheet, column): values for (sheet, column), values in (references or {}).items()}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def kinds(self, column):
+        """
+        Returns an array with the kind of each value: "number", "text",
+        "date", "boolean" or "" (missing or other). Columns of one dtype are
+        classified at once; mixed (object) columns are classified by type.
+        """
+        def compute():
+            series = self.df[column]
+            kinds = np.full(len(series), "", dtype=object)
+            present = series.notna().to_numpy()
+            if pd.api.types.is_bool_dtype(series):
+                kinds[present] = "boolean"
+            elif pd.api.types.is_numeric_dtype(series):
+                kinds[present] = "number"
+            elif pd.api.types.is_datetime64_any_dtype(series):
+                kinds[present] = "date"
+            elif pd.api.types.is_string_dtype(series) and not pd.api.types.is_object_dtype(series):
+                kinds[present] = "text"
+            else:
+                types = series.map(type)
+                for kind, classes in KINDS.items():
+                    kinds[types.isin(classes).to_numpy() & present] = kind
+            return kinds
+        return self._cached(("kinds", column), compute)
+
+    def present(self, column):
+        # Blank strings count as missing, like empty cells
+        def compute():
+            missing = self.df[column].isna().to_numpy().copy()
+            text = self.kinds(column) == "text"
+            if text.any():
+                blank = self.df[column][text].str.strip() == ""
+                missing[np.flatnonzero(text)[blank.to_numpy(dtype=bool)]] = True
+            return ~missing
+        return self._cached(("present", column), compute)
+
+    def numbers(self, column):
+        # Text that reads as a number counts; True/False cells do not, although Python treats them as 1/0
+        def compute():
+            series = self.df[column]
+            return pd.to_numeric(series.where(self.kinds(column) != "boolean"), errors="coerce").to_numpy(dtype=float)
+        return self._cached(("numbers", column), compute)
+
+    def dates(self, column):
+        # Only dates and text are read as dates; a plain number is not a date
+        def compute():
+            kinds = self.kinds(column)
+            series = self.df[column].where((kinds == "date") | (kinds == "text"))
+            return pd.to_datetime(series, errors="coerce").to_numpy(dtype="datetime64[ns]")
+        return self._cached(("dates", column), compute)
+
+    def text(self, column):
+        """
+        Returns (codes, values): the column factorized into an array of codes
+        (-1 for missing) and a Series of its distinct values as text, whole
+        floats without their ".0" so 1.0 in a cell matches "1" in a rule.
+
+        Text checks run on the distinct values only and are mapped back
+        through the codes, so a column of a few categories costs one lookup
+        per row whatever the check.
+        """
+        def compute():
+            codes, uniques = pd.factorize(self.df[column], use_na_sentinel=True)
+            values = pd.Series(pd.Index(uniques).map(_as_text), dtype=object)
+            if len(values) and values.duplicated().any():
+                # Different values with the same text (1 and 1.0) share a code
+                text_codes, values = pd.factorize(values)
+                codes = np.where(codes >= 0, text_codes[codes], -1)
+                values = pd.Series(values, dtype=object)
+            return codes, values
+        return self._cached(("text", column), compute)
+
+    def present_text(self, column):
+        """
+        Returns (codes, values) as text does, with -1 for blank values as well as missing ones.
+        """
+        def compute():
+            codes, values = self.text(column)
+            return np.where(self.present(column), codes, -1), values
+        return self._cached(("present_text", column), compute)
+
+    def text_check(self, column, check):
+        """
+        Applies a check to a column's distinct text values (see text) and returns its per-row result.
+        Missing values give False.
+        """
+        codes, values = self.text(column)
+        results = np.append(np.asarray(check(values), dtype=bool), False)
+        return results[codes]
+
+    def reference_values(self, sheet, column):
+        def compute():
+            if self.load_sheet is None:
+                raise RuleError("Reference checks need the workbook's other sheets")
+            reference = self.load_sheet(sheet)
+            if column not in reference.columns:
+                raise RuleError(f"Sheet '{sheet}' has no column '{column}'")
+            return set(reference[column].dropna().map(_as_text))
+        return self._cached(("reference", sheet, column), compute)
+
+
+def _as_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return str(value).strip()
+
+
+def _bound(value):
+    """
+    Returns a rule bound as a float, or as a datetime64 when it is a date.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        return pd.Timestamp(value).to_datetime64()
+    except (TypeError, ValueError):
+        raise RuleError(f"Invalid bound: {value}")
+
+
+def compile_rules(rules, columns):
+    """
+    Compiles rule dicts (see load_rules) into Rules for a table with the given columns.
+
+    Every rule is checked here (column names, types, patterns, bounds and
+    expressions), so a bad rule set fails before any data is evaluated.
+    """
+    compiled = []
+    for rule in rules:
+        name, check, column, value = rule["name"], rule["check"], rule.get("column"), rule.get("value")
+        if check != "expr":
+            if column is None:
+                raise RuleError(f"Rule '{name}' needs a column")
+            if column not in columns:
+                raise RuleError(f"Rule '{name}' refers to missing column: {column}")
+        function = _compile_check(name, check, column, value, columns)
+        if check == "expr":
+            # An expression's violations are shown on every column it names
+            names = {quoted or bare for quoted, bare in re.findall(r"`([^`]*)`|([A-Za-z_]\w*)", str(value))}
+            highlighted = [col for col in columns if str(col) in names]
+        else:
+            highlighted = [column]
+        references = [_reference_target(name, column, value)] if check == "references" else []
+        compiled.append(Rule(name, check, column, highlighted, function, references))
+    return compiled
+
+
+def reference_sets(compiled, load_sheet):
+    """
+    Loads the values the references checks of compiled rules look up, keyed by
+    (sheet, column), so they can be handed to RuleContext instead of loaded again.
+    """
+    context = RuleContext(None, load_sheet)
+    return {key: context.reference_values(*key) for rule in compiled for key in rule.references}
+
+
+def _reference_target(name, column, value):
+    if isinstance(value, dict):
+        sheet, target = value.get("sheet"), value.get("column", column)
+    else:
+        sheet, _, target = str(value).partition("!")
+        target = target or column
+    if not sheet:
+        raise RuleError(f"Rule '{name}' needs a reference like Sheet!Column")
+    return sheet, target
+
+
+def _compile_check(name, check, column, value, columns):
+    if check == "type":
+        type_name = TYPE_NAMES.get(str(value).strip().lower())
+        if type_name is None:
+            raise RuleError(f"Rule '{name}' has an unknown type: {value}")
+        if type_name == "number":
+            return lambda context: context.present(column) & np.isnan(context.numbers(column))
+        if type_name == "integer":
+            return lambda context: context.present(column) & ~(np.mod(context.numbers(column), 1) == 0)
+        if type_name == "date":
+            return lambda context: context.present(column) & np.isnat(context.dates(column))
+        if type_name == "boolean":
+            return lambda context: context.present(column) & (context.kinds(column) != "boolean") & ~context.text_check(
+                column, lambda values: values.str.lower().isin(["true", "false"])
+            )
+        return lambda context: context.present(column) & (context.kinds(column) != "text")
+
+    if check == "not_null":
+        return lambda context: ~context.present(column)
+
+    if check in ("min", "max"):
+        bound = _bound(value)
+        compare = np.less if check == "min" else np.greater
+        if isinstance(bound, float):
+            # Values that are not numbers are left to type checks
+            return lambda context: compare(context.numbers(column), bound)
+        return lambda context: ~np.isnat(context.dates(column)) & compare(context.dates(column), bound)
+
+    if check == "regex":
+        try:
+            pattern = re.compile(str(value))
+        except re.error as e:
+            raise RuleError(f"Rule '{name}' has an invalid pattern: {str(e)}")
+        return lambda context: context.present(column) & ~context.text_check(
+            column, lambda values: values.map(lambda value: pattern.fullmatch(value) is not None)
+        )
+
+    if check == "allowed":
+        allowed = {_as_text(item) for item in (value if isinstance(value, (list, tuple, set)) else [value])}
+        return lambda context: context.present(column) & ~context.text_check(column, lambda values: values.isin(allowed))
+
+    if check == "unique":
+        def duplicated(context):
+            codes, values = context.present_text(column)
+            counts = np.bincount(codes[codes >= 0], minlength=len(values))
+            return (codes >= 0) & (counts[np.maximum(codes, 0)] > 1)
+        return duplicated
+
+    if check == "references":
+        sheet, target = _reference_target(name, column, value)
+        return lambda context: context.present(column) & ~context.text_check(
+            column, lambda values: values.isin(context.reference_values(sheet, target))
+        )
+
+    if check == "expr":
+        expression = str(value)
+        try:
+            pd.DataFrame(columns=list(columns)).eval(expression, engine="python")
+        except Exception as e:
+            raise RuleError(f"Rule '{name}' has an invalid expression: {str(e)}")
+        # Rows the expression cannot decide (missing values) are not violations
+        return lambda context: ~pd.Series(context.df.eval(expression, engine="python"), index=context.df.index).fillna(True).astype(bool).to_numpy()
+
+    raise RuleError(f"Rule '{name}' has an unknown check: {check}")
+
+
+def evaluate_rules(compiled, df, load_sheet=None, sample_size=SAMPLE_SIZE, references=None):
+    """
+    Evaluates compiled rules over a table in one pass.
+
+    Parameters:
+    - compiled: Output of compile_rules
+    - df: The table
+    - load_sheet: Function returning another sheet of the workbook as a DataFrame, for reference checks
+    - sample_size: Number of violating rows kept per rule
+    - references: Reference values already loaded, as returned by reference_sets
+
+    Returns:
+    - List of dicts per rule: name, check, column, columns, violations, samples
+      (positions of the first violating rows), values (their values in the rule's
+      columns, missing as None) and mask (all violating rows)
+    """
+    context = RuleContext(df, load_sheet, references)
+    results = []
+    for rule in compiled:
+        mask = rule.evaluate(context)
+        if mask.shape != (len(df),):
+            raise RuleError(f"Rule '{rule.name}' did not give one result per row")
+        violations = np.flatnonzero(mask)
+        samples = df.iloc[violations[:sample_size]][rule.columns]
+        results.append({
+            "name": rule.name,
+            "check": rule.check,
+            "column": rule.column,
+            "columns": rule.columns,
+            "violations": len(violations),
+            "samples": violations[:sample_size].tolist(),
+            "values": [
+                tuple(None if pd.isna(value) else value for value in row)
+                for row in samples.itertuples(index=False, name=None)
+            ],
+            "mask": mask,
+        })
+    return results
+
+
+def violation_cells(results, columns):
+    """
+    Combines rule results into one (rows, columns) boolean mask of the cells to highlight.
+    """
+    positions = {column: position for position, column in enumerate(columns)}
+    rows = len(results[0]["mask"]) if results else 0
+    mask = np.zeros((rows, len(columns)), dtype=bool)
+    for result in results:
+        for column in result["columns"]:
+            mask[:, positions[column]] |= result["mask"]
+    return mask